@@ -0,0 +1,515 @@
+"""
+Almacén de productos en memoria por columnas
+Guarda los productos cargados por la aplicación web en columnas en lugar de
+una lista de diccionarios: los campos categóricos (marca, talla, estado,
+ubicación...) se codifican con un diccionario de valores y los numéricos
+(precio, fecha) van en arrays compactos. Los filtros se resuelven con los
+índices de indice_facetas, empezando por el más selectivo, y solo se construyen
+diccionarios para los productos que se devuelven
+"""
+
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from almacenamiento import ENRICHED_FIELDS, ProductStorage, decode_cursor, encode_cursor
+from extraccion import product_key
+from indice_facetas import DENSE_RATIO, FacetIndex, PriceIndex, bitmap_rows
+from indice_texto import TokenIndex
+from productos import Condition, Product, parse_size
+
+# Marcadores de valor desconocido en las columnas numéricas
+NO_PRICE = -1
+NO_DATE = 0
+
+EPOCH = datetime(1970, 1, 1)
+
+# Campos categóricos (codificados con diccionario) y de texto libre
+CATEGORICAL_FIELDS = ("brand", "size", "size_label", "condition", "location", "currency", "seller")
+# Columnas categóricas por las que filtra /api/products (además de condition_code)
+FACET_FIELDS = ("brand", "size_label", "condition")
+TEXT_FIELDS = ("title", "price", "product_url", "image_url", "description")
+
+
+def _timestamp(value) -> int:
+    """Microsegundos desde 1970 de una fecha ISO (NO_DATE si no hay fecha)"""
+    if not value:
+        return NO_DATE
+    try:
+        date = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return NO_DATE
+    if date.tzinfo is not None:
+        date = date.astimezone().replace(tzinfo=None)
+    return (date - EPOCH) // timedelta(microseconds=1)
+
+
+def _isoformat(timestamp: int) -> Optional[str]:
+    return (EPOCH + timedelta(microseconds=timestamp)).isoformat() if timestamp != NO_DATE else None
+
+
+class DictionaryColumn:
+    """Columna categórica: cada fila guarda el código de su valor"""
+
+    __slots__ = ("values", "codes", "counts", "_codes_by_value")
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self.codes = array("I")
+        # Filas con cada código (un valor sin filas no se ofrece en los filtros)
+        self.counts: List[int] = []
+        self._codes_by_value: Dict[Optional[str], int] = {}
+
+    def _code(self, value: Optional[str]) -> int:
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes_by_value[value] = code
+            self.values.append(value)
+            self.counts.append(0)
+        self.counts[code] += 1
+        return code
+
+    def append(self, value: Optional[str]) -> None:
+        self.codes.append(self._code(value))
+
+    def set(self, row: int, value: Optional[str]) -> None:
+        self.counts[self.codes[row]] -= 1
+        self.codes[row] = self._code(value)
+
+    def present(self) -> List[str]:
+        """Valores (no vacíos) que tiene alguna fila"""
+        return [value for value, count in zip(self.values, self.counts) if value and count]
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        return self.values[self.codes[row]]
+
+    def matching(self, predicate: Callable[[str], bool]) -> Set[int]:
+        """Códigos de los valores que cumplen la condición (se evalúa una vez por valor)"""
+        return {code for code, value in enumerate(self.values) if value and predicate(value)}
+
+    def ranks(self) -> array:
+        """Posición de cada código en el orden alfabético de los valores"""
+        order = sorted(range(len(self.values)), key=lambda code: self.values[code] or "")
+        ranks = array("I", bytes(4 * len(order)))
+        for rank, code in enumerate(order):
+            ranks[code] = rank
+        return ranks
+
+
+class ProductStore(ProductStorage):
+    """Productos en columnas con filtros y ordenación para la API"""
+
+    def __init__(self, products: Iterable[Dict] = ()):
+        """
+        Construye el almacén
+
+        Args:
+            products: Diccionarios de producto (los antiguos se normalizan)
+        """
+        self.item_ids = array("q")
+        self.price_cents = array("q")
+        self.condition_codes = array("B")
+        self.scraped_at = array("q")
+        self.columns: Dict[str, DictionaryColumn] = {name: DictionaryColumn() for name in CATEGORICAL_FIELDS}
+        self.texts: Dict[str, List[Optional[str]]] = {name: [] for name in TEXT_FIELDS}
+        self._rows_by_key: Dict = {}
+        # upsert() puede llegar mientras se atienden consultas: las
+        # operaciones públicas se serializan
+        self._lock = threading.Lock()
+        # Búsqueda de texto sobre el título y la marca
+        self.text_index = TokenIndex()
+        # Índices de los filtros; se construyen de una vez tras la carga y
+        # después se mantienen fila a fila
+        self.facets: Dict[str, FacetIndex] = {}
+        self.price_index: Optional[PriceIndex] = None
+
+        for product in products:
+            self.append(Product.from_dict(product))
+        self.text_index.sort_vocabulary()
+        self._build_indexes()
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def _build_indexes(self) -> None:
+        """Construye los índices de los filtros sobre las filas actuales"""
+        self.facets = {name: FacetIndex(self.columns[name].codes) for name in FACET_FIELDS}
+        self.facets["condition_code"] = FacetIndex(self.condition_codes)
+        self.price_index = PriceIndex(self.price_cents, NO_PRICE)
+
+    def _facet_codes(self, name: str) -> array:
+        return self.condition_codes if name == "condition_code" else self.columns[name].codes
+
+    def append(self, product: Product) -> int:
+        """Añade un producto y devuelve su número de fila"""
+        row = len(self.item_ids)
+        key = product.item_id or product.product_url
+        if key:
+            self._rows_by_key[key] = row
+        self.text_index.add(row, product.title, product.brand)
+        self.item_ids.append(product.item_id or 0)
+        self.price_cents.append(NO_PRICE if product.price_cents is None else product.price_cents)
+        self.condition_codes.append(int(product.condition_code or 0))
+        self.scraped_at.append(_timestamp(product.scraped_at))
+        for name, column in self.columns.items():
+            column.append(getattr(product, name))
+        for name, values in self.texts.items():
+            values.append(getattr(product, name))
+        for name, facet in self.facets.items():
+            facet.add(row, self._facet_codes(name)[row])
+        if self.price_index is not None:
+            self.price_index.add(row, self.price_cents[row])
+        return row
+
+    def _replace(self, row: int, product: Product) -> None:
+        """Sustituye los datos de una fila por los de un producto"""
+        self.text_index.replace(
+            row,
+            (self.texts["title"][row], self.columns["brand"][row]),
+            (product.title, product.brand)
+        )
+        old_codes = {name: self._facet_codes(name)[row] for name in self.facets}
+        old_price = self.price_cents[row]
+
+        self.price_cents[row] = NO_PRICE if product.price_cents is None else product.price_cents
+        self.condition_codes[row] = int(product.condition_code or 0)
+        self.scraped_at[row] = _timestamp(product.scraped_at)
+        for name, column in self.columns.items():
+            column.set(row, getattr(product, name))
+        for name, values in self.texts.items():
+            values[row] = getattr(product, name)
+
+        for name, facet in self.facets.items():
+            facet.move(row, old_codes[name], self._facet_codes(name)[row])
+        if self.price_index is not None and old_price != self.price_cents[row]:
+            self.price_index.remove(row, old_price)
+            self.price_index.add(row, self.price_cents[row])
+
+    def _keep_enriched(self, row: int, product: Product) -> None:
+        """
+        Conserva los campos de la fila que el producto nuevo no trae
+
+        Como el upsert de SQLite: un producto visto de nuevo en el grid (sin
+        enriquecer) no borra con "N/A" lo completado desde su página de detalle.
+        """
+        for name in ENRICHED_FIELDS:
+            if getattr(product, name) in (None, "N/A"):
+                values = self.columns[name] if name in self.columns else self.texts[name]
+                setattr(product, name, values[row])
+        if product.size_label is None:
+            product.size_label = self.columns["size_label"][row]
+
+    def upsert(self, products: Iterable[Dict]) -> int:
+        count = 0
+        with self._lock:
+            for data in products:
+                product = Product.from_dict(data)
+                row = self._rows_by_key.get(product_key(data))
+                if row is None:
+                    self.append(product)
+                else:
+                    self._keep_enriched(row, product)
+                    self._replace(row, product)
+                count += 1
+            self.text_index.sort_vocabulary()
+        return count
+
+    def row(self, row: int) -> Dict:
+        """Diccionario de producto (forma de Product.to_dict) de una fila"""
+        price_cents = self.price_cents[row]
+        return {
+            "item_id": self.item_ids[row] or None,
+            "title": self.texts["title"][row],
+            "price": self.texts["price"][row],
+            "price_cents": None if price_cents == NO_PRICE else price_cents,
+            "currency": self.columns["currency"][row],
+            "brand": self.columns["brand"][row],
+            "size": self.columns["size"][row],
+            "size_label": self.columns["size_label"][row],
+            "condition": self.columns["condition"][row],
+            "condition_code": self.condition_codes[row],
+            "product_url": self.texts["product_url"][row],
+            "image_url": self.texts["image_url"][row],
+            "location": self.columns["location"][row],
+            "seller": self.columns["seller"][row],
+            "description": self.texts["description"][row],
+            "scraped_at": _isoformat(self.scraped_at[row]),
+        }
+
+    def _plan(
+        self,
+        search: str,
+        brand: str,
+        size: str,
+        condition: str,
+        min_price: Optional[float],
+        max_price: Optional[float]
+    ) -> List[Tuple[int, str, Tuple]]:
+        """
+        Filtros de la consulta con el número de filas que deja pasar cada uno
+
+        Returns:
+            Lista de (filas, tipo, datos) ordenada de más a menos selectivo;
+            tipo es "rows" (conjunto de filas de la búsqueda de texto), "facet"
+            (índice y códigos admitidos) o "price" (rango en céntimos)
+        """
+        plan: List[Tuple[int, str, Tuple]] = []
+
+        if search:
+            found = self.text_index.matches(search)
+            if found is None:
+                # Sin palabras ("--", "!!"): texto contenido en el título o la
+                # marca, como el LIKE del almacenamiento SQLite
+                text = search.lower()
+                titles, brands = self.texts["title"], self.columns["brand"]
+                found = {
+                    i for i in range(len(self))
+                    if text in (titles[i] or "").lower() or text in (brands[i] or "").lower()
+                }
+            plan.append((len(found), "rows", (found,)))
+
+        def add_facet(name: str, codes: Set[int]) -> None:
+            plan.append((self.facets[name].count(codes), "facet", (name, codes)))
+
+        if brand:
+            brand = brand.lower()
+            add_facet("brand", self.columns["brand"].matching(lambda value: brand in value.lower()))
+
+        if size:
+            label = parse_size(size)
+            add_facet("size_label", self.columns["size_label"].matching(lambda value: value == label))
+
+        if condition:
+            condition_code = Condition.parse(condition)
+            if condition_code:
+                add_facet("condition_code", {int(condition_code)})
+            else:
+                condition = condition.lower()
+                add_facet("condition", self.columns["condition"].matching(lambda value: condition in value.lower()))
+
+        if min_price is not None or max_price is not None:
+            low = (min_price or 0) * 100
+            high = max_price * 100 if max_price is not None else float("inf")
+            plan.append((self.price_index.count(low, high), "price", (low, high)))
+
+        plan.sort(key=lambda step: step[0])
+        return plan
+
+    def _rows(self, kind: str, data: Tuple) -> List[int]:
+        """Filas (ordenadas) que deja pasar un filtro del plan"""
+        if kind == "rows":
+            return sorted(data[0])
+        if kind == "facet":
+            name, codes = data
+            return self.facets[name].rows(codes)
+        return self.price_index.rows(*data)
+
+    def _filter(self, rows: List[int], kind: str, data: Tuple) -> List[int]:
+        """Filas candidatas que además cumplen un filtro del plan"""
+        if kind == "rows":
+            found = data[0]
+            return [i for i in rows if i in found]
+        if kind == "facet":
+            name, allowed = data
+            codes = self._facet_codes(name)
+            return [i for i in rows if codes[i] in allowed]
+        low, high = data
+        prices = self.price_cents
+        return [i for i in rows if prices[i] == NO_PRICE or low <= prices[i] <= high]
+
+    def select(
+        self,
+        search: str = "",
+        brand: str = "",
+        size: str = "",
+        condition: str = "",
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> List[int]:
+        """
+        Filas que cumplen los filtros de /api/products
+
+        Cada filtro sabe por su índice cuántas filas deja pasar. Se empieza
+        por el más selectivo y los demás solo comprueban esas filas; si los
+        más selectivos son valores frecuentes (guardados como bitmap) se
+        intersectan primero sus bitmaps.
+
+        Args:
+            search: Palabras (o principios de palabra) del título o la
+                    marca; deben aparecer todas, sin distinguir acentos
+            brand: Texto contenido en la marca
+            size: Talla (se compara la normalizada)
+            condition: Estado (por código si se reconoce, si no por texto)
+            min_price: Precio mínimo en euros (los productos sin precio se
+                       incluyen, como en el filtro original)
+            max_price: Precio máximo en euros
+
+        Returns:
+            Números de fila en el orden del almacén
+        """
+        plan = self._plan(search, brand, size, condition, min_price, max_price)
+        if not plan:
+            return list(range(len(self)))
+        if plan[0][0] == 0:
+            return []
+
+        # Filtros por valores frecuentes: AND de bitmaps (una operación sobre
+        # enteros) antes de pasar a filas
+        dense = [
+            step for step in plan
+            if step[1] == "facet" and step[0] * DENSE_RATIO >= len(self)
+            and self.facets[step[2][0]].is_dense(step[2][1])
+        ]
+        if len(dense) > 1 and dense[0] is plan[0]:
+            bitmap = -1
+            for _, _, (name, codes) in dense:
+                bitmap &= self.facets[name].bitmap(codes)
+                if not bitmap:
+                    return []
+            rows = bitmap_rows(bitmap)
+            remaining = [step for step in plan if not any(step is d for d in dense)]
+        else:
+            rows = self._rows(plan[0][1], plan[0][2])
+            remaining = plan[1:]
+
+        for _, kind, data in remaining:
+            if not rows:
+                break
+            rows = self._filter(rows, kind, data)
+        return rows
+
+    def _sort_key(self, sort_by: str, descending: bool) -> Callable[[int], Tuple]:
+        """
+        Clave de ordenación ascendente de una fila
+
+        El orden descendente se consigue cambiando el signo (la marca se
+        compara por su posición alfabética), así que la misma clave sirve
+        para ordenar, para la selección parcial con heapq y para comparar con
+        un cursor. Los empates se deshacen por item_id y por fila, y los
+        productos sin precio van siempre al final.
+        """
+        sign = -1 if descending else 1
+        item_ids = self.item_ids
+        if sort_by == "price":
+            prices = self.price_cents
+            return lambda i: (prices[i] == NO_PRICE, sign * prices[i], sign * item_ids[i], sign * i)
+        if sort_by == "brand":
+            ranks = self.columns["brand"].ranks()
+            codes = self.columns["brand"].codes
+            return lambda i: (False, sign * ranks[codes[i]], sign * item_ids[i], sign * i)
+        dates = self.scraped_at
+        return lambda i: (False, sign * dates[i], sign * item_ids[i], sign * i)
+
+    def _cursor_values(self, row: int, sort_by: str) -> List:
+        """Valores de una fila que se guardan en el cursor"""
+        if sort_by == "price":
+            value = None if self.price_cents[row] == NO_PRICE else self.price_cents[row]
+        elif sort_by == "brand":
+            value = self.columns["brand"][row] or ""
+        else:
+            value = self.scraped_at[row]
+        return [value, self.item_ids[row], row]
+
+    def _cursor_key(self, values: List, sort_by: str, descending: bool) -> Tuple:
+        """Clave de _sort_key correspondiente a los valores de un cursor"""
+        value, item_id, row = values
+        sign = -1 if descending else 1
+        if sort_by == "price":
+            return (value is None, sign * (NO_PRICE if value is None else value), sign * item_id, sign * row)
+        if sort_by == "brand":
+            # Posición de la marca entre las actuales (si ya no existe, entre
+            # las dos que la rodean)
+            column = self.columns["brand"]
+            names = sorted(v or "" for v in column.values)
+            position = bisect_left(names, value)
+            rank = position if position < len(names) and names[position] == value else position - 0.5
+            return (False, sign * rank, sign * item_id, sign * row)
+        return (False, sign * value, sign * item_id, sign * row)
+
+    def sort(self, rows: List[int], sort_by: str = "date", descending: bool = True) -> List[int]:
+        """
+        Ordena filas por precio, marca o fecha
+
+        Args:
+            rows: Filas a ordenar (se ordena la propia lista)
+            sort_by: price, brand o date
+            descending: Orden descendente
+
+        Returns:
+            La lista ordenada; los productos sin precio van siempre al final
+        """
+        rows.sort(key=self._sort_key(sort_by, descending))
+        return rows
+
+    def query(
+        self,
+        sort_by: str = "date",
+        sort_order: str = "desc",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        **filters
+    ) -> Dict:
+        with self._lock:
+            return self._query(sort_by, sort_order, limit, offset, cursor, **filters)
+
+    def _query(
+        self,
+        sort_by: str,
+        sort_order: str,
+        limit: Optional[int],
+        offset: int,
+        cursor: Optional[str],
+        **filters
+    ) -> Dict:
+        descending = sort_order == "desc"
+        rows = self.select(**filters)
+        total = len(rows)
+        key = self._sort_key(sort_by, descending)
+
+        if cursor:
+            after = self._cursor_key(decode_cursor(cursor, sort_by, sort_order), sort_by, descending)
+            rows = [i for i in rows if key(i) > after]
+
+        if limit is None:
+            page = self.sort(rows, sort_by, descending)[offset:]
+        else:
+            # Solo hace falta ordenar los offset + limit primeros
+            page = heapq.nsmallest(offset + limit, rows, key=key)[offset:]
+
+        next_cursor = None
+        if limit is not None and page and offset + limit < len(rows):
+            next_cursor = encode_cursor(sort_by, sort_order, self._cursor_values(page[-1], sort_by))
+
+        return {
+            "products": [self.row(i) for i in page],
+            "total": total,
+            "next_cursor": next_cursor,
+        }
+
+    def stats(self) -> Dict:
+        """Valores disponibles para los filtros y rango de precios"""
+        with self._lock:
+            total = len(self)
+            conditions = self.columns["condition"].present()
+            brands = self.columns["brand"].present()
+            sizes = self.columns["size_label"].present()
+            prices = [price for price in self.price_cents if price != NO_PRICE]
+        return {
+            "total_products": total,
+            "brands": sorted(v for v in brands if v != "N/A"),
+            "sizes": sorted(sizes),
+            # Estados de mejor a peor
+            "conditions": sorted(
+                (v for v in conditions if v != "N/A"),
+                key=lambda c: (Condition.parse(c) or len(Condition), c)
+            ),
+            "price_range": {
+                "min": min(prices) / 100 if prices else 0,
+                "max": max(prices) / 100 if prices else 0
+            },
+        }
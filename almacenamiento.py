@@ -0,0 +1,503 @@
+"""
+Almacenamiento de productos para la API
+Interfaz común de los almacenes que consulta la aplicación web y backend
+SQLite (modo WAL) que acumula los productos de todas las ejecuciones con
+upsert por ID y resuelve los filtros de /api/products con índices y FTS5
+"""
+
+import base64
+import json
+import logging
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from extraccion import product_key
+from productos import Condition, Product, fold, normalize_product, parse_size
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la tabla (mismo orden que Product)
+FIELDS = Product.__slots__
+
+# Campos que completa el enriquecimiento: un producto visto de nuevo en el
+# grid no debe sobrescribirlos con "N/A"
+ENRICHED_FIELDS = ("brand", "size", "location", "description", "seller")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    item_id INTEGER,
+    item_key INTEGER NOT NULL DEFAULT 0,
+    price_asc_key INTEGER NOT NULL DEFAULT 4611686018427387904,
+    price_desc_key INTEGER NOT NULL DEFAULT -1,
+    brand_key TEXT NOT NULL DEFAULT '',
+    date_key TEXT NOT NULL DEFAULT '',
+    title TEXT,
+    price TEXT,
+    price_cents INTEGER,
+    currency TEXT,
+    brand TEXT,
+    size TEXT,
+    size_label TEXT,
+    condition TEXT,
+    condition_code INTEGER NOT NULL DEFAULT 0,
+    product_url TEXT,
+    image_url TEXT,
+    location TEXT,
+    seller TEXT,
+    description TEXT,
+    scraped_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_brand ON products (brand COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_products_size ON products (size_label);
+CREATE INDEX IF NOT EXISTS idx_products_condition ON products (condition_code);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (price_cents);
+CREATE INDEX IF NOT EXISTS idx_products_scraped_at ON products (scraped_at);
+
+-- Total de productos mantenido por triggers (COUNT(*) recorre la tabla)
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO counters (name, value) SELECT 'products', COUNT(*) FROM products;
+CREATE TRIGGER IF NOT EXISTS products_count_insert AFTER INSERT ON products BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'products';
+END;
+CREATE TRIGGER IF NOT EXISTS products_count_delete AFTER DELETE ON products BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'products';
+END;
+"""
+
+# Índice de texto del título y la marca, sincronizado con triggers. El
+# marcador "N/A" no se indexa (tampoco lo hace indice_texto.tokenize)
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    title, brand, content='products', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, title, brand)
+    VALUES (new.id, NULLIF(new.title, 'N/A'), NULLIF(new.brand, 'N/A'));
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, title, brand)
+    VALUES ('delete', old.id, NULLIF(old.title, 'N/A'), NULLIF(old.brand, 'N/A'));
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF title, brand ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, title, brand)
+    VALUES ('delete', old.id, NULLIF(old.title, 'N/A'), NULLIF(old.brand, 'N/A'));
+    INSERT INTO products_fts (rowid, title, brand)
+    VALUES (new.id, NULLIF(new.title, 'N/A'), NULLIF(new.brand, 'N/A'));
+END;
+"""
+
+# Reconstrucción del índice de texto de bases de datos que indexaban "N/A"
+# (el 'rebuild' de FTS5 leería las columnas tal cual)
+FTS_REINDEX = """
+DROP TRIGGER IF EXISTS products_fts_insert;
+DROP TRIGGER IF EXISTS products_fts_delete;
+DROP TRIGGER IF EXISTS products_fts_update;
+INSERT INTO products_fts (products_fts) VALUES ('delete-all');
+INSERT INTO products_fts (rowid, title, brand)
+SELECT id, NULLIF(title, 'N/A'), NULLIF(brand, 'N/A') FROM products;
+"""
+
+# Claves de ordenación: columnas NOT NULL que se rellenan al escribir, para
+# que ORDER BY y el keyset del cursor recorran un índice en lugar de ordenar
+# la tabla. Los productos sin precio van al final en los dos sentidos, por
+# eso el precio tiene una clave por sentido
+MISSING_PRICE_ASC = 2 ** 62
+MISSING_PRICE_DESC = -1
+SORT_KEY_COLUMNS = {
+    "item_key": "INTEGER NOT NULL DEFAULT 0",
+    "price_asc_key": f"INTEGER NOT NULL DEFAULT {MISSING_PRICE_ASC}",
+    "price_desc_key": f"INTEGER NOT NULL DEFAULT {MISSING_PRICE_DESC}",
+    "brand_key": "TEXT NOT NULL DEFAULT ''",
+    "date_key": "TEXT NOT NULL DEFAULT ''",
+}
+
+# Índices de los órdenes, con los desempates (item_id y id) incluidos
+SORT_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_products_order_price_asc ON products (price_asc_key, item_key, id);
+CREATE INDEX IF NOT EXISTS idx_products_order_price_desc ON products (price_desc_key, item_key, id);
+CREATE INDEX IF NOT EXISTS idx_products_order_brand ON products (brand_key, item_key, id);
+CREATE INDEX IF NOT EXISTS idx_products_order_date ON products (date_key, item_key, id);
+"""
+
+
+def _sort_column(sort_by: str, descending: bool) -> str:
+    """Columna de clave del orden (los empates se deshacen por item_key e id)"""
+    if sort_by == "price":
+        return "price_desc_key" if descending else "price_asc_key"
+    return "brand_key" if sort_by == "brand" else "date_key"
+
+
+def _sort_keys(product: Dict) -> Tuple:
+    """Valores de SORT_KEY_COLUMNS de un producto"""
+    price = product.get("price_cents")
+    return (
+        product.get("item_id") or 0,
+        MISSING_PRICE_ASC if price is None else price,
+        MISSING_PRICE_DESC if price is None else price,
+        product.get("brand") or "",
+        product.get("scraped_at") or "",
+    )
+
+# Máximo de productos por página de /api/products
+MAX_PAGE_SIZE = 500
+
+
+def _escape_like(text: str) -> str:
+    """Texto literal para un patrón LIKE (con ESCAPE '\\')"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def encode_cursor(sort_by: str, sort_order: str, values: List[Any]) -> str:
+    """
+    Cursor opaco con la posición del último producto de una página
+
+    Args:
+        sort_by: Orden de la consulta
+        sort_order: asc o desc
+        values: Valor de ordenación, item_id y desempate del último producto
+
+    Returns:
+        Texto en base64 para el parámetro cursor
+    """
+    data = json.dumps([sort_by, sort_order, values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> List[Any]:
+    """
+    Lee un cursor de encode_cursor
+
+    Raises:
+        ValueError: Si el cursor no es válido o es de otro orden
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, cursor_sort_order, values = json.loads(data)
+    except Exception:
+        raise ValueError("Cursor no válido")
+    if (cursor_sort_by, cursor_sort_order) != (sort_by, sort_order) or len(values) != 3:
+        raise ValueError("El cursor corresponde a otro orden")
+    return values
+
+
+class ProductStorage(ABC):
+    """Almacén de productos que consulta la API"""
+
+    @abstractmethod
+    def upsert(self, products: Iterable[Dict]) -> int:
+        """
+        Inserta los productos o actualiza los que ya existen (por ID)
+
+        Args:
+            products: Diccionarios de producto
+
+        Returns:
+            Número de productos escritos
+        """
+
+    @abstractmethod
+    def query(
+        self,
+        sort_by: str = "date",
+        sort_order: str = "desc",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        **filters
+    ) -> Dict:
+        """
+        Filtra y ordena los productos, opcionalmente por páginas
+
+        Args:
+            sort_by: price, brand o date (empates deshechos por item_id)
+            sort_order: asc o desc
+            limit: Productos por página (None para todos)
+            offset: Productos a saltar (tras el cursor, si lo hay)
+            cursor: next_cursor de la página anterior
+            **filters: search, brand, size, condition, min_price, max_price
+
+        Returns:
+            Diccionario con products, total (productos que cumplen los
+            filtros) y next_cursor (None si no hay más páginas)
+
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Valores disponibles para los filtros y rango de precios"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Número de productos"""
+
+
+class SQLiteProductStorage(ProductStorage):
+    """Productos en SQLite, acumulados entre ejecuciones"""
+
+    def __init__(self, path="data/productos.sqlite"):
+        """
+        Abre (o crea) la base de datos
+
+        Args:
+            path: Archivo SQLite
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._add_sort_keys(conn)
+        conn.executescript(SORT_SCHEMA)
+        try:
+            self._upgrade_fts(conn)
+            conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite sin FTS5, la búsqueda de texto usará LIKE: {e}")
+            self.fts = False
+
+    def _add_sort_keys(self, conn: sqlite3.Connection) -> None:
+        """Añade y rellena las claves de ordenación en bases de datos anteriores"""
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(products)")}
+        missing = [name for name in SORT_KEY_COLUMNS if name not in existing]
+        if not missing:
+            return
+        logger.info(f"Añadiendo claves de ordenación a {self.path}...")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name in missing:
+                conn.execute(f"ALTER TABLE products ADD COLUMN {name} {SORT_KEY_COLUMNS[name]}")
+            conn.execute(
+                "UPDATE products SET item_key = COALESCE(item_id, 0), "
+                "price_asc_key = COALESCE(price_cents, ?), price_desc_key = COALESCE(price_cents, ?), "
+                "brand_key = COALESCE(brand, ''), date_key = COALESCE(scraped_at, '')",
+                (MISSING_PRICE_ASC, MISSING_PRICE_DESC)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _upgrade_fts(self, conn: sqlite3.Connection) -> None:
+        """Vuelve a indexar el texto si los triggers son de una versión anterior"""
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'products_fts_insert'"
+        ).fetchone()
+        if row is None or "NULLIF" in row["sql"]:
+            return
+        logger.info(f"Reconstruyendo el índice de texto de {self.path}...")
+        # executescript confirma la transacción pendiente: va entera en el script
+        try:
+            conn.executescript(f"BEGIN IMMEDIATE;{FTS_REINDEX}{FTS_SCHEMA}COMMIT;")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (sqlite3 no comparte conexiones entre hilos)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, products: Iterable[Dict]) -> int:
+        columns = ", ".join(FIELDS + tuple(SORT_KEY_COLUMNS))
+        placeholders = ", ".join("?" for _ in range(len(FIELDS) + len(SORT_KEY_COLUMNS) + 1))
+        updates = ", ".join(
+            f"{name} = COALESCE(NULLIF(excluded.{name}, 'N/A'), products.{name})" if name in ENRICHED_FIELDS
+            else f"{name} = COALESCE(excluded.{name}, products.{name})" if name == "size_label"
+            else f"{name} = excluded.{name}"
+            for name in FIELDS
+        )
+        # La marca puede conservarse de la versión anterior: su clave también
+        updates += ", " + ", ".join(
+            "brand_key = COALESCE(NULLIF(NULLIF(excluded.brand_key, ''), 'N/A'), products.brand_key)"
+            if name == "brand_key" else f"{name} = excluded.{name}"
+            for name in SORT_KEY_COLUMNS
+        )
+        sql = (
+            f"INSERT INTO products (key, {columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT (key) DO UPDATE SET {updates}"
+        )
+
+        rows = []
+        for product in products:
+            key = product_key(product)
+            if not key:
+                continue
+            if "size_label" not in product:
+                product = normalize_product(dict(product))
+            rows.append((str(key), *(product.get(name) for name in FIELDS), *_sort_keys(product)))
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(sql, rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def _where(
+        self,
+        search: str = "",
+        brand: str = "",
+        size: str = "",
+        condition: str = "",
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Tuple[str, List]:
+        """Cláusula WHERE y parámetros de los filtros de /api/products"""
+        clauses, params = [], []
+
+        if search:
+            tokens = re.findall(r"\w+", fold(search))
+            if self.fts and tokens:
+                # Cada palabra como prefijo, todas obligatorias
+                clauses.append("id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)")
+                params.append(" AND ".join(f'"{token}"*' for token in tokens))
+            else:
+                clauses.append("(title LIKE ? ESCAPE '\\' OR brand LIKE ? ESCAPE '\\')")
+                params.extend([f"%{_escape_like(search)}%"] * 2)
+
+        if brand:
+            # Texto contenido en la marca, como en el almacén en memoria
+            clauses.append("brand LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escape_like(brand)}%")
+
+        if size:
+            clauses.append("size_label = ?")
+            params.append(parse_size(size))
+
+        if condition:
+            condition_code = Condition.parse(condition)
+            if condition_code:
+                clauses.append("condition_code = ?")
+                params.append(int(condition_code))
+            else:
+                clauses.append("condition LIKE ? ESCAPE '\\'")
+                params.append(f"%{_escape_like(condition)}%")
+
+        # Los productos sin precio se incluyen, como en el almacén en memoria
+        if min_price is not None:
+            clauses.append("(price_cents IS NULL OR price_cents >= ?)")
+            params.append(min_price * 100)
+        if max_price is not None:
+            clauses.append("(price_cents IS NULL OR price_cents <= ?)")
+            params.append(max_price * 100)
+
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(
+        self,
+        sort_by: str = "date",
+        sort_order: str = "desc",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        **filters
+    ) -> Dict:
+        sort_by = sort_by if sort_by in ("price", "brand", "date") else "date"
+        descending = sort_order == "desc"
+        column = _sort_column(sort_by, descending)
+        order = "DESC" if descending else "ASC"
+        where, params = self._where(**filters)
+        conn = self._connect()
+
+        # Total: el contador mantenido por triggers si no hay filtros
+        if where:
+            total = conn.execute(f"SELECT COUNT(*) FROM products{where}", params).fetchone()[0]
+        else:
+            total = conn.execute("SELECT value FROM counters WHERE name = 'products'").fetchone()[0]
+
+        if cursor:
+            # Keyset: solo las filas posteriores a la última de la página
+            # anterior, con las mismas columnas del índice que el ORDER BY
+            value, item_id, row_id = decode_cursor(cursor, sort_by, sort_order)
+            if sort_by == "price" and value is None:
+                value = MISSING_PRICE_DESC if descending else MISSING_PRICE_ASC
+            op = "<" if descending else ">"
+            clause = f"({column}, item_key, id) {op} (?, ?, ?)"
+            where = f"{where} AND {clause}" if where else f" WHERE {clause}"
+            params = params + [value, item_id, row_id]
+
+        sql = (
+            f"SELECT id, {column} AS sort_key, {', '.join(FIELDS)} FROM products{where} "
+            f"ORDER BY {column} {order}, item_key {order}, id {order}"
+        )
+        if limit is not None:
+            # Una fila de más para saber si hay otra página
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [limit + 1, offset]
+        elif offset:
+            sql += " LIMIT -1 OFFSET ?"
+            params = params + [offset]
+
+        rows = conn.execute(sql, params).fetchall()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            value = last["price_cents"] if sort_by == "price" else last["sort_key"]
+            next_cursor = encode_cursor(sort_by, sort_order, [value, last["item_id"] or 0, last["id"]])
+
+        products = []
+        for row in rows:
+            product = dict(row)
+            del product["id"], product["sort_key"]
+            products.append(product)
+        return {"products": products, "total": total, "next_cursor": next_cursor}
+
+    def stats(self) -> Dict:
+        conn = self._connect()
+        total = len(self)
+        min_price, max_price = conn.execute(
+            "SELECT MIN(price_cents), MAX(price_cents) FROM products"
+        ).fetchone()
+        conditions = [
+            row[0] for row in conn.execute(
+                "SELECT DISTINCT condition FROM products WHERE condition IS NOT NULL AND condition != 'N/A'"
+            )
+        ]
+        return {
+            "total_products": total,
+            "brands": [row[0] for row in conn.execute(
+                "SELECT DISTINCT brand FROM products WHERE brand IS NOT NULL AND brand != 'N/A' ORDER BY brand"
+            )],
+            "sizes": [row[0] for row in conn.execute(
+                "SELECT DISTINCT size_label FROM products WHERE size_label IS NOT NULL ORDER BY size_label"
+            )],
+            # Estados de mejor a peor
+            "conditions": sorted(conditions, key=lambda c: (Condition.parse(c) or len(Condition), c)),
+            "price_range": {
+                "min": min_price / 100 if min_price is not None else 0,
+                "max": max_price / 100 if max_price is not None else 0
+            },
+        }
+
+    def metadata(self) -> Dict:
+        """Metadatos equivalentes a los del archivo JSON"""
+        scraped_at = self._connect().execute("SELECT MAX(scraped_at) FROM products").fetchone()[0]
+        return {"total_products": len(self), "scraped_at": scraped_at}
+
+    def is_empty(self) -> bool:
+        return self._connect().execute("SELECT 1 FROM products LIMIT 1").fetchone() is None
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT value FROM counters WHERE name = 'products'").fetchone()[0]
@@ -3,14 +3,28 @@ Flask Web Application para Vinted Scraper
 Proporciona interfaz web para visualizar y filtrar productos
 """
 
-from flask import Flask, render_template, jsonify, request, Response
+from flask import Flask, render_template, jsonify, request, Response, send_file, abort
 from flask_cors import CORS
 import json
+import math
+import os
+import queue
 import threading
 from pathlib import Path
 from datetime import datetime
 import logging
 from scraper import VintedScraper
+from pool_navegadores import BrowserPool
+from crawler import run_crawl
+from config_filtros import URLS_EJEMPLO, URL_ROPA_MUJER_VALENCIA
+from puntos_control import CheckpointStore, job_id_para
+from imagenes import ImageStore
+from limitador import RateLimiter
+from sesiones import SessionStore
+from exportacion import load_products_file, merge_products
+from extraccion import product_key
+from almacen_productos import ProductStore
+from almacenamiento import MAX_PAGE_SIZE, SQLiteProductStorage
 
 # Configuración
 app = Flask(__name__)
@@ -24,23 +38,183 @@ scraping_state = {
     "progress": 0,
     "total": 0,
     "message": "",
-    "last_update": None
+    "last_update": None,
+    "job_id": None
 }
 
 DATA_FILE = Path("data/productos.json")
 
+# Trabajos de scraping pendientes. Los ejecuta un único hilo que mantiene un
+# pool de navegadores abierto entre trabajos (la API síncrona de Playwright
+# no puede compartirse entre hilos)
+scrape_jobs = queue.Queue()
+scrape_worker_thread = None
+scrape_worker_lock = threading.Lock()
+
+# Checkpoints de los trabajos: un trabajo interrumpido (error, hilo o proceso
+# caído) se reanuda al volver a lanzarse. Los del crawler van aparte porque
+# no los reanuda el hilo de trabajos
+CHECKPOINTS = CheckpointStore("data/checkpoints")
+CRAWL_CHECKPOINTS = CheckpointStore("data/checkpoints/crawler")
+queued_jobs = set()
+
+# Ritmo de peticiones a Vinted, compartido por todos los trabajos (y por
+# otros procesos que usen el mismo archivo)
+RATE_LIMITER = RateLimiter("data/limitador.sqlite")
+
+# Sesiones por dominio (cookies aceptadas) para saltarse la visita inicial
+SESSIONS = SessionStore("data/sesiones")
+
+# Imágenes descargadas y miniaturas (se sirven desde /thumbs en lugar del CDN)
+IMAGES = ImageStore("data/imagenes")
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600
+
+
+EMPTY_METADATA = {"total_products": 0, "scraped_at": None}
+
+
+class ProductCache:
+    """
+    Productos cargados en memoria, compartidos por todas las peticiones
+
+    El archivo solo se vuelve a leer cuando cambian su mtime, tamaño o inodo
+    por otra vía: los trabajos de scraping de la app pasan directamente sus
+    productos (upsert de las novedades en modo incremental, sustitución del
+    almacén en otro caso). Los datos se cambian bajo el lock del almacén, así
+    que cada petición ve la versión anterior completa o la nueva completa.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._signature = None
+        self._entry = (ProductStore(), dict(EMPTY_METADATA))
+
+    def _file_signature(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _read(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return ProductStore(data.get("products", [])), data.get("metadata", {})
+
+    def get(self):
+        """
+        Devuelve los productos actuales
+
+        Returns:
+            Tupla (ProductStore, metadata)
+        """
+        signature = self._file_signature()
+        with self._lock:
+            if signature is not None and signature == self._signature:
+                self.hits += 1
+                return self._entry
+
+            self.misses += 1
+            if signature is None:
+                entry = (ProductStore(), dict(EMPTY_METADATA))
+            else:
+                try:
+                    entry = self._read()
+                except Exception as e:
+                    # Archivo a medio escribir o dañado: se siguen sirviendo
+                    # los datos anteriores y se reintenta en la próxima petición
+                    logger.error(f"Error cargando productos: {e}")
+                    return self._entry
+            self._entry, self._signature = entry, signature
+            return entry
+
+    def file_signature(self):
+        """Firma (mtime, tamaño, inodo) del archivo o None si no existe"""
+        return self._file_signature()
+
+    def upsert(self, products, metadata, base_signature):
+        """
+        Incorpora los productos de un trabajo incremental sin releer el archivo
+
+        Args:
+            products: Productos nuevos del trabajo (ya guardados en el archivo)
+            metadata: Metadata con la que se ha guardado el archivo
+            base_signature: Firma del archivo sobre el que se hizo la unión;
+                            si la caché tiene otra versión se recarga entera
+        """
+        signature = self._file_signature()
+        with self._lock:
+            if self._signature is None or self._signature != base_signature:
+                self._signature = None
+                return
+            store = self._entry[0]
+            store.upsert(products)
+            self._entry, self._signature = (store, metadata), signature
+
+    def replace(self, products, metadata):
+        """
+        Sustituye los productos por los que se acaban de guardar en el archivo
+
+        Args:
+            products: Productos guardados
+            metadata: Metadata con la que se ha guardado el archivo
+        """
+        store = ProductStore(products)
+        signature = self._file_signature()
+        with self._lock:
+            self._entry, self._signature = (store, metadata), signature
+
+    def invalidate(self):
+        """Fuerza la recarga en la próxima petición"""
+        with self._lock:
+            self._signature = None
+
+    def stats(self):
+        """Contadores de aciertos y fallos"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "products": len(self._entry[0]),
+            }
+
+
+PRODUCTS = ProductCache(DATA_FILE)
+
+# Backend de la API: "json" (data/productos.json en memoria, por defecto) o
+# "sqlite" (productos acumulados entre ejecuciones, consultas con índices)
+PRODUCTS_BACKEND = os.getenv("PRODUCTS_BACKEND", "json")
+STORAGE = SQLiteProductStorage("data/productos.sqlite") if PRODUCTS_BACKEND == "sqlite" else None
+
+if STORAGE is not None and STORAGE.is_empty() and DATA_FILE.exists():
+    # Primera vez con SQLite: importar los productos del archivo JSON
+    logger.info(f"Importando {DATA_FILE} en {STORAGE.path}...")
+    STORAGE.upsert(load_products_file(DATA_FILE))
+
 
 def load_products():
-    """Carga productos desde el archivo JSON"""
-    if not DATA_FILE.exists():
-        return {"metadata": {"total_products": 0, "scraped_at": None}, "products": []}
+    """
+    Productos que consulta la API
+
+    Returns:
+        Tupla (almacén con query/stats, metadata): SQLite si está configurado,
+        si no el archivo JSON en un almacén por columnas (desde la caché)
+    """
+    if STORAGE is not None:
+        return STORAGE, STORAGE.metadata()
+    return PRODUCTS.get()
+
 
+def download_images(products):
+    """Descarga las imágenes nuevas de los productos (los fallos no detienen el trabajo)"""
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        scraping_state["message"] = f"Descargando imágenes de {len(products)} productos..."
+        IMAGES.download_all(products)
     except Exception as e:
-        logger.error(f"Error cargando productos: {e}")
-        return {"metadata": {"total_products": 0, "scraped_at": None}, "products": []}
+        logger.error(f"Error descargando imágenes: {e}")
 
 
 def progress_callback(current, total, message):
@@ -54,13 +228,14 @@ def progress_callback(current, total, message):
     })
 
 
-def run_scraper(max_products, url=None):
-    """Ejecuta el scraper en un thread separado"""
+def run_scraper(max_products, url=None, browser_pool=None, job_id=None, enrich=False, incremental=False):
+    """Ejecuta el scraper (desde el hilo de trabajos)"""
     global scraping_state
 
     try:
         scraping_state["is_running"] = True
         scraping_state["message"] = "Iniciando scraper..."
+        scraping_state["job_id"] = job_id
 
         # Si no se proporciona URL, usar la de Valencia por defecto
         if url is None:
@@ -72,13 +247,76 @@ def run_scraper(max_products, url=None):
                 url = "https://www.vinted.es/catalog"
                 logger.info("Usando catalogo general")
 
-        scraper = VintedScraper(max_products=max_products, progress_callback=progress_callback)
+        # Modo incremental: solo las novedades desde el último scraping
+        base_signature = PRODUCTS.file_signature()
+        previous = load_products_file(DATA_FILE) if incremental else []
+
+        scraper = VintedScraper(
+            max_products=max_products,
+            progress_callback=progress_callback,
+            browser_pool=browser_pool,
+            checkpoint_store=CHECKPOINTS,
+            job_id=job_id,
+            enrich=enrich,
+            known_ids={product_key(p) for p in previous} if incremental else None,
+            rate_limiter=RATE_LIMITER,
+            session_store=SESSIONS,
+            storage=STORAGE
+        )
         products = scraper.scrape(url=url)
 
         if products:
-            scraper.save_to_json()
+            if previous:
+                scraper.products = merge_products(products, previous)
+            scraper.save_to_json(extra_metadata={"new_products": len(products)})
             scraper.save_to_csv()
+            # El almacén en memoria se actualiza con lo ya extraído en lugar
+            # de releer el archivo: solo las novedades en modo incremental
+            if previous:
+                PRODUCTS.upsert(products, scraper.metadata, base_signature)
+            else:
+                PRODUCTS.replace(scraper.products, scraper.metadata)
+            download_images(products)
             scraping_state["message"] = f"Completado: {len(products)} productos"
+            if previous:
+                scraping_state["message"] += f" nuevos ({len(scraper.products)} en total)"
+        elif incremental:
+            scraping_state["message"] = "Sin productos nuevos"
+        else:
+            scraping_state["message"] = "No se encontraron productos"
+
+    except Exception as e:
+        logger.error(f"Error en scraping: {e}")
+        scraping_state["message"] = f"Error: {str(e)}"
+
+    finally:
+        scraping_state["is_running"] = False
+
+
+def run_multi_scraper(max_products, busquedas, enrich=False, incremental=False):
+    """Ejecuta varias búsquedas en paralelo con el crawler asíncrono"""
+    global scraping_state
+
+    try:
+        scraping_state["is_running"] = True
+        scraping_state["message"] = f"Iniciando {len(busquedas)} búsquedas..."
+
+        products = run_crawl(
+            busquedas,
+            max_products=max_products,
+            progress_callback=progress_callback,
+            checkpoint_store=CRAWL_CHECKPOINTS,
+            enrich=enrich,
+            incremental=incremental,
+            rate_limiter=RATE_LIMITER,
+            session_store=SESSIONS,
+            storage=STORAGE
+        )
+
+        if products:
+            PRODUCTS.invalidate()
+            download_images(products)
+            scraping_state["message"] = f"Completado: {len(products)} productos de {len(busquedas)} búsquedas"
         else:
             scraping_state["message"] = "No se encontraron productos"
 
@@ -90,6 +328,77 @@ def run_scraper(max_products, url=None):
         scraping_state["is_running"] = False
 
 
+def enqueue_scrape_job(max_products, url, enrich=False, incremental=False, job_id=None):
+    """
+    Encola un trabajo de scraping para el hilo de trabajos
+
+    Args:
+        job_id: ID del trabajo (por defecto derivado de la URL); al reanudar
+                un checkpoint se pasa el suyo
+
+    Returns:
+        ID del trabajo (el mismo para la misma URL, así se reanuda su checkpoint)
+    """
+    job_id = job_id or job_id_para(url)
+    with scrape_worker_lock:
+        if job_id in queued_jobs:
+            return job_id
+        queued_jobs.add(job_id)
+    scrape_jobs.put((max_products, url, job_id, enrich, incremental))
+    return job_id
+
+
+def resume_pending_jobs():
+    """Vuelve a encolar los trabajos con checkpoint sin terminar"""
+    for state in CHECKPOINTS.pending():
+        if state.get("url"):
+            logger.info(f"Reanudando trabajo {state['job_id']} ({len(state.get('products', []))} productos guardados)")
+            enqueue_scrape_job(
+                state.get("max_products", 100),
+                state["url"],
+                enrich=state.get("enrich", False),
+                incremental=state.get("incremental", False),
+                job_id=state["job_id"]
+            )
+
+
+def scrape_worker():
+    """Hilo que ejecuta los trabajos de scraping con un pool de navegadores persistente"""
+    browser_pool = BrowserPool(size=1)
+    try:
+        browser_pool.start()
+    except Exception as e:
+        logger.error(f"No se pudo iniciar el pool de navegadores: {e}")
+
+    # Trabajos interrumpidos por una caída anterior del hilo o del proceso
+    resume_pending_jobs()
+
+    while True:
+        max_products, url, job_id, enrich, incremental = scrape_jobs.get()
+        try:
+            run_scraper(
+                max_products, url,
+                browser_pool=browser_pool,
+                job_id=job_id,
+                enrich=enrich,
+                incremental=incremental
+            )
+        finally:
+            with scrape_worker_lock:
+                queued_jobs.discard(job_id)
+            scrape_jobs.task_done()
+
+
+def ensure_scrape_worker():
+    """Arranca el hilo de trabajos si no está en marcha"""
+    global scrape_worker_thread
+
+    with scrape_worker_lock:
+        if scrape_worker_thread is None or not scrape_worker_thread.is_alive():
+            scrape_worker_thread = threading.Thread(target=scrape_worker, daemon=True)
+            scrape_worker_thread.start()
+
+
 @app.route('/')
 def index():
     """Página principal"""
@@ -110,80 +419,79 @@ def get_products():
         - condition: Filtrar por estado
         - sort_by: Ordenar por (price, brand, date)
         - sort_order: asc o desc
+        - limit: Productos por página (máximo MAX_PAGE_SIZE; sin él, todos)
+        - offset: Productos a saltar
+        - cursor: next_cursor de la respuesta anterior (página siguiente)
     """
-    data = load_products()
-    products = data.get("products", [])
-
-    # Aplicar filtros
-    search = request.args.get('search', '').lower()
-    if search:
-        products = [p for p in products if
-                   search in p.get('title', '').lower() or
-                   search in p.get('brand', '').lower()]
-
-    # Filtro de marca
-    brand = request.args.get('brand', '').lower()
-    if brand and brand != 'todas':
-        products = [p for p in products if brand in p.get('brand', '').lower()]
-
-    # Filtro de talla
-    size = request.args.get('size', '').lower()
-    if size and size != 'todas':
-        products = [p for p in products if size in p.get('size', '').lower()]
-
-    # Filtro de estado
-    condition = request.args.get('condition', '').lower()
-    if condition and condition != 'todos':
-        products = [p for p in products if condition in p.get('condition', '').lower()]
-
-    # Filtro de precio
-    try:
-        min_price = float(request.args.get('min_price', 0))
-        max_price = float(request.args.get('max_price', float('inf')))
-
-        filtered_products = []
-        for p in products:
-            price_str = p.get('price', '0').replace('€', '').replace(',', '.').strip()
-            try:
-                price = float(price_str.split()[0])
-                if min_price <= price <= max_price:
-                    filtered_products.append(p)
-            except:
-                filtered_products.append(p)  # Incluir si no se puede parsear
-
-        products = filtered_products
-
-    except ValueError:
-        pass
+    store, metadata = load_products()
+
+    # Paginación (un valor no numérico se ignora)
+    limit = request.args.get('limit', type=int)
+    offset = max(0, request.args.get('offset', 0, type=int))
+    if limit is not None:
+        limit = min(max(1, limit), MAX_PAGE_SIZE)
+
+    filters = {
+        "search": request.args.get('search', ''),
+        "brand": request.args.get('brand', ''),
+        "size": request.args.get('size', ''),
+        "condition": request.args.get('condition', ''),
+    }
+    # "Todas"/"Todos" en los desplegables equivale a no filtrar
+    for name in ("brand", "size", "condition"):
+        if filters[name].lower() in ('todas', 'todos'):
+            filters[name] = ''
 
-    # Ordenamiento
-    sort_by = request.args.get('sort_by', 'date')
-    sort_order = request.args.get('sort_order', 'desc')
+    # Filtro de precio (se incluyen los productos sin precio). Cada límite se
+    # interpreta por separado: uno no numérico se ignora sin afectar al otro
+    for name in ("min_price", "max_price"):
+        value = request.args.get(name, type=float)
+        filters[name] = value if value is not None and math.isfinite(value) else None
 
-    if sort_by == 'price':
-        products.sort(
-            key=lambda x: float(x.get('price', '0').replace('€', '').replace(',', '.').strip().split()[0] or 0),
-            reverse=(sort_order == 'desc')
+    try:
+        result = store.query(
+            sort_by=request.args.get('sort_by', 'date'),
+            sort_order=request.args.get('sort_order', 'desc'),
+            limit=limit,
+            offset=offset,
+            cursor=request.args.get('cursor') or None,
+            **filters
         )
-    elif sort_by == 'brand':
-        products.sort(key=lambda x: x.get('brand', ''), reverse=(sort_order == 'desc'))
-    elif sort_by == 'date':
-        products.sort(key=lambda x: x.get('scraped_at', ''), reverse=(sort_order == 'desc'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    # Miniatura local si la imagen ya se descargó
+    for p in result["products"]:
+        p["thumbnail_url"] = IMAGES.thumbnail_url(p.get("image_url") or "")
 
     return jsonify({
-        "products": products,
-        "metadata": data.get("metadata", {}),
-        "total": len(products)
+        "products": result["products"],
+        "metadata": metadata,
+        "total": result["total"],
+        "next_cursor": result["next_cursor"]
     })
 
 
+@app.route('/thumbs/<digest>')
+def get_thumbnail(digest):
+    """Sirve la miniatura de una imagen por el hash de su contenido"""
+    path = IMAGES.thumbnail_path(digest)
+    if path is None:
+        abort(404)
+
+    # El contenido de un hash no cambia nunca: caché de un año
+    response = send_file(path.resolve(), max_age=THUMBNAIL_MAX_AGE, etag=digest)
+    response.headers["Cache-Control"] = f"public, max-age={THUMBNAIL_MAX_AGE}, immutable"
+    return response
+
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Obtiene estadísticas de los productos"""
-    data = load_products()
-    products = data.get("products", [])
+    store, metadata = load_products()
+    stats = store.stats()
 
-    if not products:
+    if not stats["total_products"]:
         return jsonify({
             "total_products": 0,
             "brands": [],
@@ -192,34 +500,14 @@ def get_stats():
             "price_range": {"min": 0, "max": 0}
         })
 
-    # Extraer valores únicos
-    brands = sorted(list(set(p.get('brand', 'N/A') for p in products if p.get('brand', 'N/A') != 'N/A')))
-    sizes = sorted(list(set(p.get('size', 'N/A') for p in products if p.get('size', 'N/A') != 'N/A')))
-    conditions = sorted(list(set(p.get('condition', 'N/A') for p in products if p.get('condition', 'N/A') != 'N/A')))
+    stats["last_update"] = metadata.get("scraped_at")
+    return jsonify(stats)
 
-    # Calcular rango de precios
-    prices = []
-    for p in products:
-        try:
-            price_str = p.get('price', '0').replace('€', '').replace(',', '.').strip()
-            price = float(price_str.split()[0])
-            prices.append(price)
-        except:
-            pass
-
-    price_range = {
-        "min": min(prices) if prices else 0,
-        "max": max(prices) if prices else 0
-    }
 
-    return jsonify({
-        "total_products": len(products),
-        "brands": brands,
-        "sizes": sizes,
-        "conditions": conditions,
-        "price_range": price_range,
-        "last_update": data.get("metadata", {}).get("scraped_at")
-    })
+@app.route('/api/cache', methods=['GET'])
+def get_cache_stats():
+    """Aciertos y fallos de la caché de productos"""
+    return jsonify(PRODUCTS.stats())
 
 
 @app.route('/api/scrape', methods=['POST'])
@@ -234,11 +522,41 @@ def start_scraping():
         }), 400
 
     max_products = request.json.get('max_products', 100)
+    presets = request.json.get('presets') or []
+    # Visitar la página de cada producto para completar marca, talla y ubicación
+    enrich = bool(request.json.get('enrich', False))
+    # Solo las novedades desde el último scraping, unidas a los productos guardados
+    incremental = bool(request.json.get('incremental', False))
+
+    unknown = [name for name in presets if name not in URLS_EJEMPLO]
+    if unknown:
+        return jsonify({
+            "success": False,
+            "message": f"Búsquedas desconocidas: {', '.join(unknown)}"
+        }), 400
 
-    # Iniciar scraping en thread separado
-    thread = threading.Thread(target=run_scraper, args=(max_products,))
-    thread.daemon = True
-    thread.start()
+    scraping_state["is_running"] = True
+    scraping_state["message"] = "En cola..."
+
+    if len(presets) > 1:
+        # Varias búsquedas: crawler asíncrono en su propio hilo (no puede
+        # compartir hilo con la API síncrona de Playwright del pool)
+        busquedas = {name: URLS_EJEMPLO[name] for name in presets}
+        thread = threading.Thread(target=run_multi_scraper, args=(max_products, busquedas, enrich, incremental))
+        thread.daemon = True
+        thread.start()
+    else:
+        # Encolar el trabajo para el hilo de scraping
+        url = URLS_EJEMPLO[presets[0]] if presets else URL_ROPA_MUJER_VALENCIA
+        ensure_scrape_worker()
+        job_id = enqueue_scrape_job(max_products, url, enrich, incremental)
+        scraping_state["job_id"] = job_id
+
+        return jsonify({
+            "success": True,
+            "message": "Scraping iniciado",
+            "job_id": job_id
+        })
 
     return jsonify({
         "success": True,
@@ -273,7 +591,6 @@ if __name__ == '__main__':
     Path("data").mkdir(exist_ok=True)
 
     # Detectar si estamos en producción
-    import os
     is_production = os.getenv('FLASK_ENV') == 'production'
     debug_mode = not is_production
 
@@ -285,4 +602,10 @@ if __name__ == '__main__':
     print(f"🔧 Modo: {'Producción' if is_production else 'Desarrollo'}")
     print("="*60 + "\n")
 
+    # Reanudar los trabajos que quedaron a medias en la ejecución anterior
+    # (con el recargador de Flask, solo en el proceso que sirve la app)
+    serving = not debug_mode or os.getenv('WERKZEUG_RUN_MAIN') == 'true'
+    if serving and CHECKPOINTS.pending():
+        ensure_scrape_worker()
+
     app.run(debug=debug_mode, host='0.0.0.0', port=5000, threaded=True)
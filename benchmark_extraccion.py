@@ -0,0 +1,83 @@
+"""
+Benchmark de extracción de productos
+Compara la extracción por elemento con la extracción en lote (un page.evaluate)
+usando las tarjetas guardadas en data/item_html.txt y data/producto_ejemplo.html
+
+Uso: python benchmark_extraccion.py [num_tarjetas]
+"""
+
+import sys
+import time
+from pathlib import Path
+from playwright.sync_api import sync_playwright
+from scraper import VintedScraper
+
+FIXTURES = [Path("data/item_html.txt"), Path("data/producto_ejemplo.html")]
+
+
+def construir_pagina(num_tarjetas):
+    """Construye un grid HTML repitiendo las tarjetas de ejemplo"""
+    tarjetas = [f.read_text(encoding="utf-8") for f in FIXTURES]
+    items = "".join(
+        f'<div class="feed-grid__item">{tarjetas[i % len(tarjetas)]}</div>'
+        for i in range(num_tarjetas)
+    )
+    return f'<html><body><div class="feed-grid">{items}</div></body></html>'
+
+
+def sin_fecha(productos):
+    """Elimina scraped_at para poder comparar resultados"""
+    return [{k: v for k, v in p.items() if k != "scraped_at"} for p in productos]
+
+
+def medir(nombre, preparar, funcion, repeticiones=3):
+    """Ejecuta la funcion varias veces y devuelve el mejor tiempo y el resultado"""
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        preparar()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    print(f"  {nombre:<10} {mejor * 1000:9.1f} ms  ({len(resultado)} productos)")
+    return mejor, resultado
+
+
+def main():
+    num_tarjetas = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    print("=" * 60)
+    print(f"BENCHMARK DE EXTRACCION - {num_tarjetas} tarjetas")
+    print("=" * 60)
+
+    scraper = VintedScraper(max_products=num_tarjetas)
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        html = construir_pagina(num_tarjetas)
+
+        # Cada repeticion parte de un grid sin tarjetas marcadas como vistas
+        def preparar():
+            page.set_content(html)
+
+        def por_elemento():
+            elementos = scraper._query_unseen_elements(page)
+            return [scraper._extract_product_data(e) for e in elementos]
+
+        def en_lote():
+            return scraper._extract_products_batch(page)
+
+        t_elemento, r_elemento = medir("elemento", preparar, por_elemento)
+        t_lote, r_lote = medir("lote", preparar, en_lote)
+
+        browser.close()
+
+    print("-" * 60)
+    print(f"  Aceleracion: x{t_elemento / t_lote:.1f}")
+    print(f"  Resultados identicos: {'SI' if sin_fecha(r_elemento) == sin_fecha(r_lote) else 'NO'}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark del parser offline (sin navegador)
+Mide páginas y tarjetas por segundo de cada backend disponible con las
+tarjetas guardadas en data/item_html.txt y data/producto_ejemplo.html
+
+Uso: python benchmark_parser.py [tarjetas_por_pagina] [segundos_por_backend]
+"""
+
+import sys
+import time
+
+from benchmark_extraccion import FIXTURES, construir_pagina, sin_fecha
+from parser_html import HTMLProductParser, BACKENDS
+
+
+def medir(parser, documentos, segundos):
+    """Parsea los documentos en bucle durante `segundos` y devuelve (páginas/s, tarjetas/s)"""
+    paginas = 0
+    tarjetas = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        for html in documentos:
+            tarjetas += len(parser.parse(html))
+            paginas += 1
+    transcurrido = time.perf_counter() - inicio
+    return paginas / transcurrido, tarjetas / transcurrido
+
+
+def main():
+    tarjetas_por_pagina = int(sys.argv[1]) if len(sys.argv) > 1 else 96
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    fragmentos = [f.read_text(encoding="utf-8") for f in FIXTURES]
+    pagina = construir_pagina(tarjetas_por_pagina)
+
+    print("=" * 70)
+    print(f"BENCHMARK DEL PARSER OFFLINE - 1 núcleo, {segundos:.0f} s por prueba")
+    print("=" * 70)
+    print(f"  {'backend':<12}{'fixtures (pág/s)':>20}{f'catálogo {tarjetas_por_pagina} (pág/s)':>24}{'tarjetas/s':>14}")
+
+    resultados = {}
+    for nombre in BACKENDS:
+        parser = HTMLProductParser(nombre)
+        pags_fragmento, _ = medir(parser, fragmentos, segundos)
+        pags_catalogo, tarjetas = medir(parser, [pagina], segundos)
+        resultados[nombre] = sin_fecha(parser.parse(pagina))
+        print(f"  {nombre:<12}{pags_fragmento:>20,.0f}{pags_catalogo:>24,.0f}{tarjetas:>14,.0f}")
+
+    print("-" * 70)
+    iguales = len({str(r) for r in resultados.values()}) == 1
+    print(f"  Resultados identicos entre backends: {'SI' if iguales else 'NO'}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Parser de las respuestas JSON del catalogo de Vinted
+Convierte los items de /api/v2/catalog/items en los mismos diccionarios
+que produce el scraper a partir del DOM
+"""
+
+import json
+import sys
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+from productos import CONDITION_STATUS_IDS, CURRENCY_SYMBOLS, Condition, normalize_product
+
+# Fragmento de URL de los endpoints que devuelven items del catalogo
+CATALOG_ENDPOINTS = ("/api/v2/catalog/items",)
+
+
+def is_catalog_response(url: str) -> bool:
+    """Indica si la URL corresponde a un endpoint de items del catalogo"""
+    return any(endpoint in url for endpoint in CATALOG_ENDPOINTS)
+
+
+def format_price(amount, currency: str = "EUR") -> str:
+    """
+    Formatea un importe como lo muestra Vinted en el grid (ej: "12,50 €")
+
+    Args:
+        amount: Importe como numero o texto ("12.5")
+        currency: Codigo ISO de la moneda
+
+    Returns:
+        Precio formateado o "N/A" si no se puede interpretar
+    """
+    try:
+        value = float(amount)
+    except (TypeError, ValueError):
+        return "N/A"
+
+    symbol = CURRENCY_SYMBOLS.get(currency, currency)
+    return f"{value:.2f}".replace(".", ",") + f" {symbol}"
+
+
+def _text(value) -> str:
+    """Devuelve el texto limpio o "N/A" si esta vacio"""
+    if value is None:
+        return "N/A"
+    value = str(value).strip()
+    return value if value else "N/A"
+
+
+def _price(item: Dict) -> Tuple[str, Optional[int], str]:
+    """
+    Obtiene el precio del item (formato nuevo con objeto o antiguo con texto)
+
+    Returns:
+        Tupla (precio formateado, importe en céntimos o None, moneda)
+    """
+    price = item.get("price")
+    if isinstance(price, dict):
+        amount, currency = price.get("amount"), price.get("currency_code", "EUR")
+    else:
+        amount, currency = price, item.get("currency", "EUR")
+
+    try:
+        cents = round(float(amount) * 100)
+    except (TypeError, ValueError):
+        cents = None
+    return format_price(amount, currency), cents, currency
+
+
+def _image_url(item: Dict) -> str:
+    """Obtiene la URL de la foto principal del item"""
+    photo = item.get("photo") or {}
+    if photo.get("url"):
+        return photo["url"]
+    for thumbnail in photo.get("thumbnails") or []:
+        if thumbnail.get("url"):
+            return thumbnail["url"]
+    return "N/A"
+
+
+def _location(item: Dict) -> str:
+    """Obtiene la ubicacion del vendedor si la respuesta la incluye"""
+    user = item.get("user") or {}
+    for source in (item, user):
+        city = source.get("city")
+        country = source.get("country_title")
+        if city and country:
+            return f"{city}, {country}"
+        if city:
+            return _text(city)
+    return "N/A"
+
+
+def parse_catalog_item(item: Dict, base_url: str = "https://www.vinted.es") -> Optional[Dict]:
+    """
+    Convierte un item del JSON del catalogo en un diccionario de producto
+
+    Args:
+        item: Item tal y como lo devuelve la API
+        base_url: Dominio usado para completar rutas relativas
+
+    Returns:
+        Diccionario con los datos del producto o None si el item no es valido
+    """
+    item_id = item.get("id")
+    if not item_id:
+        return None
+
+    product_url = item.get("url") or item.get("path") or f"/items/{item_id}"
+    if not product_url.startswith("http"):
+        product_url = f"{base_url}{product_url}"
+
+    user = item.get("user") or {}
+    price, price_cents, currency = _price(item)
+
+    return normalize_product({
+        "item_id": int(item_id),
+        "title": _text(item.get("title")),
+        "price": price,
+        "price_cents": price_cents,
+        "currency": currency if price_cents is not None else None,
+        "brand": _text(item.get("brand_title")),
+        "size": _text(item.get("size_title")),
+        "condition": _text(item.get("status")),
+        "condition_code": int(CONDITION_STATUS_IDS.get(item.get("status_id"), Condition.UNKNOWN)),
+        "product_url": product_url,
+        "image_url": _image_url(item),
+        "location": _location(item),
+        "seller": _text(user.get("login")),
+        "description": "N/A",
+        "scraped_at": datetime.now().isoformat()
+    })
+
+
+def parse_catalog_response(payload: Dict, base_url: str = "https://www.vinted.es") -> List[Dict]:
+    """
+    Extrae los productos de una respuesta completa del catalogo
+
+    Args:
+        payload: JSON de la respuesta ({"items": [...], "pagination": {...}})
+        base_url: Dominio usado para completar rutas relativas
+
+    Returns:
+        Lista de diccionarios de producto
+    """
+    products = []
+    for item in payload.get("items") or []:
+        product = parse_catalog_item(item, base_url)
+        if product:
+            products.append(product)
+    return products
+
+
+def is_last_page(payload: Dict) -> bool:
+    """Indica si la respuesta es la ultima pagina del catalogo"""
+    if not payload.get("items"):
+        return True
+
+    pagination = payload.get("pagination") or {}
+    current_page = pagination.get("current_page")
+    total_pages = pagination.get("total_pages")
+    if current_page and total_pages:
+        return current_page >= total_pages
+    return False
+
+
+if __name__ == "__main__":
+    # Parsear una respuesta grabada: python catalogo_api.py data/catalogo_api_ejemplo.json
+    ruta = sys.argv[1] if len(sys.argv) > 1 else "data/catalogo_api_ejemplo.json"
+
+    with open(ruta, "r", encoding="utf-8") as f:
+        respuesta = json.load(f)
+
+    productos = parse_catalog_response(respuesta)
+    print(json.dumps(productos, indent=2, ensure_ascii=False))
+    print(f"\n{len(productos)} productos (ultima pagina: {'si' if is_last_page(respuesta) else 'no'})")
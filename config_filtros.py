@@ -3,6 +3,9 @@ Configuracion de filtros para Vinted Scraper
 Define URLs pre-configuradas con filtros especificos
 """
 
+from itertools import product
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 # URLs base de Vinted por pais
 VINTED_BASE_URLS = {
     "es": "https://www.vinted.es/catalog",
@@ -127,6 +130,92 @@ def construir_url_vinted(
     return url
 
 
+def _con_parametros(url, **nuevos):
+    """Devuelve la URL con los parametros indicados (sustituyendo los que ya tenga)"""
+    partes = urlsplit(url)
+    parametros = [
+        (clave, valor) for clave, valor in parse_qsl(partes.query, keep_blank_values=True)
+        if clave not in nuevos
+    ]
+    parametros.extend((clave, str(valor)) for clave, valor in nuevos.items() if valor is not None)
+
+    return urlunsplit(partes._replace(query=urlencode(parametros, safe="[]")))
+
+
+def url_pagina(url, pagina, por_pagina=None):
+    """
+    Devuelve la URL de una pagina concreta del catalogo
+
+    Args:
+        url: URL del catalogo (por ejemplo de construir_url_vinted)
+        pagina: Numero de pagina (empezando en 1)
+        por_pagina: Productos por pagina (None para usar el de Vinted)
+
+    Returns:
+        URL con los parametros page y per_page
+    """
+    return _con_parametros(url, page=pagina, per_page=por_pagina)
+
+
+def url_mas_recientes(url):
+    """
+    Devuelve la URL del catalogo ordenada de mas reciente a mas antiguo
+
+    Args:
+        url: URL del catalogo
+
+    Returns:
+        URL con order=newest_first
+    """
+    return _con_parametros(url, order="newest_first")
+
+
+def combinaciones_filtros(
+    paises=("es",),
+    categorias=("ropa_mujer",),
+    ubicaciones=("valencia",),
+    rangos_precio=("sin_limite",),
+    estados=("todos",),
+    busquedas=(None,)
+):
+    """
+    Genera las URLs de todas las combinaciones de filtros (producto cartesiano)
+
+    Args:
+        paises: Codigos de pais (ver VINTED_BASE_URLS)
+        categorias: Categorias (ver CATEGORIAS)
+        ubicaciones: Ubicaciones (ver UBICACIONES)
+        rangos_precio: Rangos de precio (ver RANGOS_PRECIO)
+        estados: Estados (ver ESTADOS)
+        busquedas: Terminos de busqueda (None para no filtrar por texto)
+
+    Returns:
+        Diccionario nombre de la combinacion -> URL
+    """
+    combinaciones = {}
+
+    for pais, categoria, ubicacion, rango, estado, busqueda in product(
+        paises, categorias, ubicaciones, rangos_precio, estados, busquedas
+    ):
+        precio = RANGOS_PRECIO.get(rango, RANGOS_PRECIO["sin_limite"])
+        url = construir_url_vinted(
+            pais=pais,
+            categoria=categoria,
+            ubicacion=ubicacion,
+            precio_min=precio["min"],
+            precio_max=precio["max"],
+            busqueda=busqueda,
+            estado=estado
+        )
+
+        partes = [pais, categoria, ubicacion, rango, estado]
+        if busqueda:
+            partes.append(busqueda.replace(" ", "_"))
+        combinaciones["-".join(partes)] = url
+
+    return combinaciones
+
+
 # URLs PRE-CONFIGURADAS COMUNES
 
 # Ropa de mujer en Valencia
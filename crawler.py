@@ -0,0 +1,203 @@
+"""
+Crawler de varias busquedas de Vinted en paralelo
+Ejecuta una lista de busquedas (o todas las combinaciones de filtros de
+config_filtros.combinaciones_filtros) con AsyncVintedScraper, con limite de
+concurrencia global y por dominio, y une los resultados sin duplicados
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from config_filtros import URLS_EJEMPLO, combinaciones_filtros
+from exportacion import JsonlSink, iter_jsonl, load_products_file, merge_products
+from extraccion import product_key
+from productos import normalize_product
+from puntos_control import job_id_para
+from scraper import logger
+from scraper_async import AsyncVintedScraper
+
+
+async def crawl(
+    busquedas: Dict[str, str],
+    max_products: int = 50,
+    concurrency: int = 4,
+    per_domain_concurrency: int = 2,
+    progress_callback: Callable = None,
+    **scraper_options
+) -> Tuple[AsyncVintedScraper, List[Dict]]:
+    """
+    Ejecuta varias busquedas en paralelo y une sus productos
+
+    Args:
+        busquedas: Diccionario nombre de la busqueda -> URL
+        max_products: Productos maximos por busqueda
+        concurrency: Paginas simultaneas en total
+        per_domain_concurrency: Paginas simultaneas por dominio de Vinted
+        progress_callback: Funcion callback para reportar progreso
+        **scraper_options: Opciones adicionales de AsyncVintedScraper
+
+    Returns:
+        Tupla (scraper con los productos unidos en .products, resumen de
+        cada busqueda)
+    """
+    # Busquedas distintas pueden generar la misma URL
+    urls: List[str] = list(dict.fromkeys(busquedas.values()))
+
+    scraper = AsyncVintedScraper(
+        max_products=max_products,
+        concurrency=concurrency,
+        per_domain_concurrency=per_domain_concurrency,
+        progress_callback=progress_callback,
+        **scraper_options
+    )
+
+    logger.info(f"Crawl de {len(urls)} busquedas (concurrencia {concurrency}, {per_domain_concurrency} por dominio)")
+    results = await scraper.scrape_many(urls)
+
+    # Resumen por busqueda: productos extraidos y cuantos no aparecian en
+    # busquedas anteriores
+    seen = set()
+    summary = []
+    for nombre, url in busquedas.items():
+        products = results.get(url, [])
+        nuevos = 0
+        for p in products:
+            key = product_key(p)
+            if key not in seen:
+                seen.add(key)
+                nuevos += 1
+        summary.append({"nombre": nombre, "url": url, "productos": len(products), "nuevos": nuevos})
+
+    return scraper, summary
+
+
+def run_crawl(
+    busquedas: Dict[str, str],
+    filename: str = "productos.json",
+    stream: bool = False,
+    incremental: bool = False,
+    **options
+) -> List[Dict]:
+    """
+    Ejecuta el crawl y guarda el dataset combinado en JSON y CSV
+
+    Args:
+        busquedas: Diccionario nombre de la busqueda -> URL
+        filename: Nombre del archivo JSON de salida (en data/)
+        stream: Escribir los productos en JSONL y CSV segun llegan, sin
+                acumularlos en memoria (no se genera el JSON)
+        incremental: Extraer solo los productos publicados desde la ultima
+                     ejecucion y unirlos con los ya guardados en el archivo
+        **options: Opciones de crawl()
+
+    Returns:
+        Lista de productos unicos (vacia con stream=True; con incremental,
+        nuevos y anteriores)
+    """
+    started = datetime.now()
+    base = "data/" + filename.rsplit(".", 1)[0]
+
+    if stream:
+        previous_path = Path(base + ".jsonl")
+        if incremental and previous_path.exists():
+            options["known_ids"] = {product_key(p) for p in iter_jsonl(previous_path)}
+
+        # Si alguna busqueda tiene un checkpoint pendiente se continua el
+        # .part de la ejecucion interrumpida (el sink descarta lo repetido)
+        checkpoints = options.get("checkpoint_store")
+        resume = checkpoints is not None and any(
+            checkpoints.load(job_id_para(url)) for url in busquedas.values()
+        )
+        with JsonlSink(previous_path, csv_path=base + ".csv", resume=resume) as sink:
+            scraper, summary = asyncio.run(crawl(busquedas, sink=sink, keep_products=False, **options))
+            new_count = sink.count
+            # Los anteriores van detras de los nuevos, leidos del archivo
+            # publicado mientras se escribe el .part
+            if "known_ids" in options:
+                for product in iter_jsonl(previous_path):
+                    if product_key(product) not in scraper._seen_ids:
+                        sink.write(product if "size_label" in product else normalize_product(product))
+        logger.info(
+            f"Crawl completado en {(datetime.now() - started).total_seconds():.0f} s: "
+            f"{new_count} productos nuevos, {sink.count} en total"
+        )
+        return scraper.products
+
+    previous = []
+    if incremental:
+        previous = load_products_file("data/" + filename)
+        options["known_ids"] = {product_key(p) for p in previous}
+
+    scraper, summary = asyncio.run(crawl(busquedas, **options))
+    new_count = len(scraper.products)
+    if previous:
+        scraper.products = merge_products(scraper.products, previous)
+
+    if new_count:
+        scraper.save_to_json(filename, extra_metadata={
+            "searches": summary,
+            "new_products": new_count,
+            "duration_seconds": round((datetime.now() - started).total_seconds(), 1)
+        })
+        scraper.save_to_csv(filename.rsplit(".", 1)[0] + ".csv")
+
+    return scraper.products
+
+
+def main():
+    """Funcion principal"""
+    parser = argparse.ArgumentParser(description="Ejecuta varias busquedas de Vinted en paralelo")
+    parser.add_argument("presets", nargs="*", help=f"Busquedas predefinidas ({', '.join(URLS_EJEMPLO)})")
+    parser.add_argument("--paises", default="es", help="Paises separados por comas")
+    parser.add_argument("--categorias", help="Categorias separadas por comas (genera combinaciones)")
+    parser.add_argument("--ubicaciones", default="valencia", help="Ubicaciones separadas por comas")
+    parser.add_argument("--precios", default="sin_limite", help="Rangos de precio separados por comas")
+    parser.add_argument("--estados", default="todos", help="Estados separados por comas")
+    parser.add_argument("--max-productos", type=int, default=50, help="Productos por busqueda")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Paginas simultaneas")
+    parser.add_argument("--por-dominio", type=int, default=2, help="Paginas simultaneas por dominio")
+    parser.add_argument("--paginas", action="store_true", help="Recorrer el catalogo por ?page=N en lugar de con scroll")
+    parser.add_argument("--por-pagina", type=int, default=96, help="Productos por pagina con --paginas")
+    parser.add_argument("--jsonl", action="store_true", help="Escribir en data/productos.jsonl segun se extrae")
+    parser.add_argument("--incremental", action="store_true", help="Solo productos nuevos desde la ultima ejecucion")
+    parser.add_argument("--detalles", action="store_true", help="Completar marca, talla y ubicacion desde la pagina de cada producto")
+    args = parser.parse_args()
+
+    if args.categorias:
+        busquedas = combinaciones_filtros(
+            paises=args.paises.split(","),
+            categorias=args.categorias.split(","),
+            ubicaciones=args.ubicaciones.split(","),
+            rangos_precio=args.precios.split(","),
+            estados=args.estados.split(",")
+        )
+    elif args.presets:
+        busquedas = {nombre: URLS_EJEMPLO[nombre] for nombre in args.presets}
+    else:
+        busquedas = dict(URLS_EJEMPLO)
+
+    def progreso(current, total, message):
+        print(f"[{current}/{total}] {message[:60]}")
+
+    print(f"\nEjecutando {len(busquedas)} busquedas...\n")
+    products = run_crawl(
+        busquedas,
+        max_products=args.max_productos,
+        concurrency=args.concurrencia,
+        per_domain_concurrency=args.por_dominio,
+        progress_callback=progreso,
+        pagination="pages" if args.paginas else "scroll",
+        per_page=args.por_pagina,
+        stream=args.jsonl,
+        incremental=args.incremental,
+        enrich=args.detalles
+    )
+    if not args.jsonl:
+        print(f"\n✓ Total de productos unicos: {len(products)}")
+
+
+if __name__ == "__main__":
+    main()
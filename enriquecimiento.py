@@ -0,0 +1,370 @@
+"""
+Enriquecimiento de productos desde su página de detalle
+El grid del catálogo casi nunca muestra marca, talla ni ubicación. Esta etapa
+opcional visita la página de cada producto con un número limitado de
+pestañas simultáneas y completa esos campos, guardando el resultado en una
+caché por ID de Vinted para no repetir visitas en ejecuciones posteriores
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from playwright.async_api import async_playwright, Browser, Page
+
+from politica_recursos import ResourcePolicy
+from pool_navegadores import BrowserPool
+from productos import normalize_product
+from puntos_control import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Serializa las escrituras de las cachés de detalles del proceso (varios
+# scrapers pueden compartir el mismo archivo)
+_SAVE_LOCK = threading.Lock()
+
+# Campos que se completan desde la página de detalle
+ENRICHED_FIELDS = ("brand", "size", "location", "description", "seller")
+
+# Selectores de la página de detalle (alternativas separadas por comas)
+DETAIL_SELECTORS = {
+    "brand": '[itemprop="brand"] [itemprop="name"], [data-testid="item-attributes-brand"] .details-list__item-value',
+    "size": '[data-testid="item-attributes-size"] .details-list__item-value, [itemprop="size"]',
+    "location": '[data-testid="item-attributes-location"] .details-list__item-value',
+    "description": '[itemprop="description"], [data-testid="item-description"]',
+    "seller": '[data-testid="profile-username"]',
+}
+
+# Lee los datos estructurados (JSON-LD de schema.org/Product) y completa con
+# los selectores lo que no aparezca en ellos
+EXTRACT_DETAILS_JS = """
+(selectors) => {
+    const result = {};
+    for (const script of document.querySelectorAll('script[type="application/ld+json"]')) {
+        let data;
+        try { data = JSON.parse(script.textContent); } catch (e) { continue; }
+        for (const node of [].concat(data['@graph'] || data)) {
+            if (!node || node['@type'] !== 'Product') continue;
+            const brand = node.brand && (node.brand.name || node.brand);
+            if (typeof brand === 'string') result.brand = brand;
+            if (typeof node.description === 'string') result.description = node.description;
+            if (typeof node.size === 'string') result.size = node.size;
+            const seller = node.offers && node.offers.seller;
+            if (seller && seller.name) result.seller = seller.name;
+        }
+    }
+    for (const [key, selector] of Object.entries(selectors)) {
+        if (result[key]) continue;
+        const el = document.querySelector(selector);
+        const text = el ? (el.innerText || el.textContent || '').trim() : '';
+        if (text) result[key] = text;
+    }
+    return result;
+}
+"""
+
+
+class DetailCache:
+    """Caché en disco de los detalles de producto, por ID de Vinted y con caducidad"""
+
+    def __init__(self, path="data/detalles_cache.json", ttl_hours: float = 168):
+        """
+        Carga la caché
+
+        Args:
+            path: Archivo JSON de la caché
+            ttl_hours: Horas tras las que un detalle se vuelve a visitar
+        """
+        self.path = Path(path)
+        self.ttl = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Dict] = self._load_entries()
+
+    def get(self, item_id) -> Optional[Dict]:
+        """Devuelve los detalles guardados de un producto si no han caducado"""
+        entry = self._entries.get(str(item_id))
+        if entry and time.time() - entry["fetched_at"] < self.ttl:
+            self.hits += 1
+            return entry["details"]
+        self.misses += 1
+        return None
+
+    def put(self, item_id, details: Dict) -> None:
+        """Guarda los detalles de un producto"""
+        self._entries[str(item_id)] = {"details": details, "fetched_at": time.time()}
+
+    def _load_entries(self) -> Dict[str, Dict]:
+        """Entradas del archivo que no han caducado"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"Caché de detalles no válida, se ignora: {e}")
+            return {}
+        now = time.time()
+        return {
+            key: entry for key, entry in entries.items()
+            if now - entry.get("fetched_at", 0) < self.ttl
+        }
+
+    def save(self) -> None:
+        """
+        Escribe la caché en disco
+
+        Se combina con lo que ya hay en el archivo (otros scrapers pueden
+        haberlo escrito desde que se cargó); si un producto está en los dos,
+        gana el detalle más reciente.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _SAVE_LOCK:
+            entries = self._load_entries()
+            for key, entry in self._entries.items():
+                current = entries.get(key)
+                if current is None or current.get("fetched_at", 0) <= entry["fetched_at"]:
+                    entries[key] = entry
+            self._entries = entries
+            write_json_atomic(self.path, entries)
+
+
+def needs_enrichment(product: Dict) -> bool:
+    """Comprueba si a un producto le falta alguno de los campos de detalle"""
+    return bool(product.get("product_url")) and any(
+        product.get(field) in (None, "", "N/A") for field in ENRICHED_FIELDS
+    )
+
+
+def apply_details(product: Dict, details: Dict) -> None:
+    """Completa los campos vacíos de un producto con los detalles obtenidos"""
+    for field in ENRICHED_FIELDS:
+        value = details.get(field)
+        if value and product.get(field) in (None, "", "N/A"):
+            product[field] = value
+    normalize_product(product)
+
+
+def _pending_products(products: List[Dict], cache: Optional[DetailCache]) -> List[Dict]:
+    """Aplica los detalles en caché y devuelve los productos que hay que visitar"""
+    pending = []
+    for product in products:
+        if not needs_enrichment(product):
+            continue
+        details = cache.get(product.get("item_id")) if cache and product.get("item_id") else None
+        if details is not None:
+            apply_details(product, details)
+        else:
+            pending.append(product)
+    return pending
+
+
+async def _fetch_details(page: Page, url: str, timeout: float, rate_limiter=None) -> Optional[Dict]:
+    """Carga la página de detalle de un producto y lee sus campos"""
+    try:
+        if rate_limiter:
+            await rate_limiter.wait_async(url)
+        await page.goto(url, wait_until="domcontentloaded", timeout=timeout * 1000)
+        return await page.evaluate(EXTRACT_DETAILS_JS, DETAIL_SELECTORS)
+    except Exception as e:
+        logger.warning(f"Error leyendo el detalle de {url}: {e}")
+        return None
+
+
+async def enrich_products(
+    products: List[Dict],
+    concurrency: int = 4,
+    cache: Optional[DetailCache] = None,
+    browser: Optional[Browser] = None,
+    block_resources: bool = True,
+    timeout: float = 30,
+    progress_callback: Callable = None,
+    rate_limiter=None
+) -> int:
+    """
+    Completa los productos con los datos de su página de detalle
+
+    Los productos se modifican en el sitio. Los que ya están en la caché no
+    se visitan.
+
+    Args:
+        products: Productos a enriquecer
+        concurrency: Páginas de detalle abiertas a la vez
+        cache: Caché de detalles (se guarda al terminar)
+        browser: Navegador asíncrono compartido; si no se indica se lanza uno
+        block_resources: Bloquear imágenes, fuentes, vídeo y trackers
+        timeout: Segundos máximos por página
+        progress_callback: Función callback para reportar progreso
+        rate_limiter: Limitador de peticiones compartido (limitador.RateLimiter)
+
+    Returns:
+        Número de productos visitados
+    """
+    pending = _pending_products(products, cache)
+    if not pending:
+        return 0
+
+    total = len(pending)
+    queue = list(reversed(pending))
+    visited = 0
+    logger.info(f"Enriqueciendo {total} productos ({concurrency} páginas simultáneas)...")
+
+    async def worker(context) -> None:
+        nonlocal visited
+        page = await context.new_page()
+        if rate_limiter:
+            page.on("response", rate_limiter.on_response)
+        while queue:
+            product = queue.pop()
+            details = await _fetch_details(page, product["product_url"], timeout, rate_limiter)
+            visited += 1
+            if details is not None:
+                apply_details(product, details)
+                if cache and product.get("item_id"):
+                    cache.put(product["item_id"], details)
+            if progress_callback:
+                progress_callback(visited, total, f"Detalle: {product.get('title', '')[:50]}")
+
+    async def run(shared: Browser) -> None:
+        context = await shared.new_context()
+        try:
+            if block_resources:
+                await context.route("**/*", ResourcePolicy().handle_route_async)
+            await asyncio.gather(*(worker(context) for _ in range(min(concurrency, total))))
+        finally:
+            await context.close()
+
+    try:
+        if browser:
+            await run(browser)
+        else:
+            async with async_playwright() as p:
+                own_browser = await p.chromium.launch(headless=True)
+                try:
+                    await run(own_browser)
+                finally:
+                    await own_browser.close()
+    finally:
+        if cache:
+            cache.save()
+
+    logger.info(f"Enriquecimiento completado: {visited} páginas de detalle visitadas")
+    return visited
+
+
+def enrich_products_pooled(
+    products: List[Dict],
+    browser_pool: BrowserPool,
+    concurrency: int = 4,
+    cache: Optional[DetailCache] = None,
+    block_resources: bool = True,
+    timeout: float = 30,
+    progress_callback: Callable = None,
+    rate_limiter=None
+) -> int:
+    """
+    Como enrich_products, pero con un contexto del pool de navegadores
+
+    Usa la API síncrona desde el hilo dueño del pool, así que no se lanza
+    otro Chromium y se respetan el reciclado y el límite de memoria del pool.
+    Las páginas se visitan por tandas de `concurrency` pestañas: se inician
+    todas las navegaciones y después se lee cada una, de modo que las cargas
+    se solapan.
+
+    Args:
+        products: Productos a enriquecer (se modifican en el sitio)
+        browser_pool: Pool de navegadores (ya iniciado en este hilo)
+        concurrency: Pestañas por tanda
+
+    Returns:
+        Número de productos visitados
+    """
+    pending = _pending_products(products, cache)
+    if not pending:
+        return 0
+
+    total = len(pending)
+    visited = 0
+    logger.info(f"Enriqueciendo {total} productos con el pool ({concurrency} páginas por tanda)...")
+
+    try:
+        with browser_pool.context() as context:
+            if block_resources:
+                context.route("**/*", ResourcePolicy().handle_route)
+            pages = [context.new_page() for _ in range(min(concurrency, total))]
+            if rate_limiter:
+                for page in pages:
+                    page.on("response", rate_limiter.on_response)
+
+            for start in range(0, total, len(pages)):
+                batch = list(zip(pages, pending[start:start + len(pages)]))
+                started = []
+                for page, product in batch:
+                    try:
+                        if rate_limiter:
+                            rate_limiter.wait(product["product_url"])
+                        page.goto(product["product_url"], wait_until="commit", timeout=timeout * 1000)
+                        started.append((page, product))
+                    except Exception as e:
+                        logger.warning(f"Error leyendo el detalle de {product['product_url']}: {e}")
+                        visited += 1
+
+                for page, product in started:
+                    visited += 1
+                    try:
+                        page.wait_for_load_state("domcontentloaded", timeout=timeout * 1000)
+                        details = page.evaluate(EXTRACT_DETAILS_JS, DETAIL_SELECTORS)
+                    except Exception as e:
+                        logger.warning(f"Error leyendo el detalle de {product['product_url']}: {e}")
+                        details = None
+                    if details is not None:
+                        apply_details(product, details)
+                        if cache and product.get("item_id"):
+                            cache.put(product["item_id"], details)
+                    if progress_callback:
+                        progress_callback(visited, total, f"Detalle: {product.get('title', '')[:50]}")
+    finally:
+        if cache:
+            cache.save()
+
+    logger.info(f"Enriquecimiento completado: {visited} páginas de detalle visitadas")
+    return visited
+
+
+def run_enrichment(products: List[Dict], browser_pool: Optional[BrowserPool] = None, **options) -> int:
+    """
+    Versión síncrona de enrich_products
+
+    Con un pool de navegadores se usa enrich_products_pooled en el hilo
+    actual. Sin pool se ejecuta enrich_products en un hilo propio, porque la
+    API síncrona de Playwright ocupa el bucle de eventos del hilo que la usa.
+
+    Args:
+        products: Productos a enriquecer
+        browser_pool: Pool de navegadores del hilo actual (opcional)
+        **options: Opciones de enrich_products (salvo browser)
+
+    Returns:
+        Número de productos visitados
+    """
+    if browser_pool is not None:
+        return enrich_products_pooled(products, browser_pool, **options)
+
+    result = {}
+
+    def target():
+        try:
+            result["visited"] = asyncio.run(enrich_products(products, **options))
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join()
+
+    if "error" in result:
+        raise result["error"]
+    return result["visited"]
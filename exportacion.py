@@ -0,0 +1,241 @@
+"""
+Exportación en streaming de productos
+Escribe cada producto en un archivo JSONL (y opcionalmente CSV) en cuanto se
+extrae, en lugar de acumularlos en memoria y volcarlos al final
+"""
+
+import csv
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+from extraccion import product_key
+from productos import normalize_product
+
+logger = logging.getLogger(__name__)
+
+
+def _part_path(path: Path) -> Path:
+    """Ruta del archivo en curso (se renombra a la definitiva al cerrar)"""
+    return path.with_name(path.name + ".part")
+
+
+def _truncate_partial_line(path: Path) -> None:
+    """Quita una última línea incompleta (escritura cortada por una caída)"""
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            end = start
+        f.truncate(0)
+
+
+def iter_jsonl(path) -> Iterator[Dict]:
+    """
+    Lee los productos de un archivo JSONL línea a línea
+
+    Args:
+        path: Ruta del archivo (terminado o .part en curso)
+
+    Yields:
+        Diccionarios de producto; se ignora una última línea incompleta
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_products_file(path) -> List[Dict]:
+    """
+    Carga los productos de una ejecución anterior
+
+    Args:
+        path: Archivo JSON (formato de save_to_json) o JSONL
+
+    Returns:
+        Lista de productos ([] si el archivo no existe o no se puede leer);
+        los guardados antes de los campos normalizados se completan
+    """
+    path = Path(path)
+    if not path.exists():
+        return []
+
+    try:
+        if path.suffix == ".jsonl":
+            products = list(iter_jsonl(path))
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                products = json.load(f).get("products", [])
+    except Exception as e:
+        logger.error(f"Error cargando {path}: {e}")
+        return []
+
+    return [p if "size_label" in p else normalize_product(p) for p in products]
+
+
+def merge_products(new: Iterable[Dict], previous: Iterable[Dict]) -> List[Dict]:
+    """
+    Une los productos nuevos con los de ejecuciones anteriores
+
+    Args:
+        new: Productos de esta ejecución (van primero)
+        previous: Productos ya guardados
+
+    Returns:
+        Lista sin duplicados; si un producto está en ambas, gana el nuevo
+    """
+    merged = []
+    seen = set()
+    for product in (*new, *previous):
+        key = product_key(product)
+        if key:
+            if key in seen:
+                continue
+            seen.add(key)
+        merged.append(product)
+    return merged
+
+
+class JsonlSink:
+    """
+    Destino de productos en streaming
+
+    Mientras el scraping está en marcha se escribe en `<archivo>.part`, que
+    puede seguirse en vivo (tail -f). Los datos se sincronizan a disco cada
+    `fsync_every` productos o `fsync_interval` segundos, de modo que tras una
+    caída se conserva casi todo lo extraído. close() hace un último fsync y
+    renombra el archivo a su nombre definitivo de forma atómica.
+
+    Al reanudar un .part, los productos que ya contiene no se vuelven a
+    escribir: el scraper puede volver a enviar todo lo que restaura de su
+    checkpoint sin duplicar la salida.
+    """
+
+    def __init__(
+        self,
+        path,
+        csv_path=None,
+        fsync_every: int = 100,
+        fsync_interval: float = 5.0,
+        resume: bool = False
+    ):
+        """
+        Abre el destino
+
+        Args:
+            path: Archivo JSONL de salida
+            csv_path: Archivo CSV de salida adicional (opcional)
+            fsync_every: Productos entre sincronizaciones a disco
+            fsync_interval: Segundos máximos entre sincronizaciones a disco
+            resume: Continuar un .part existente (trabajo reanudado) en lugar
+                    de empezar de cero
+        """
+        self.path = Path(path)
+        self.csv_path = Path(csv_path) if csv_path else None
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        # Claves de los productos que ya estaban en el .part reanudado
+        self._resumed_keys: set = set()
+
+        mode = "a" if resume else "w"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        part = _part_path(self.path)
+        if resume and part.exists():
+            _truncate_partial_line(part)
+            for product in iter_jsonl(part):
+                self._resumed_keys.add(product_key(product))
+                self.count += 1
+            self._resumed_keys.discard(None)
+        self._file = open(part, mode, encoding="utf-8")
+
+        self._csv_file = None
+        self._csv_writer = None
+        self._csv_fields = None
+        if self.csv_path:
+            csv_part = _part_path(self.csv_path)
+            if resume and csv_part.exists() and csv_part.stat().st_size:
+                _truncate_partial_line(csv_part)
+                with open(csv_part, "r", newline="", encoding="utf-8") as f:
+                    self._csv_fields = next(csv.reader(f), None)
+            self._csv_file = open(csv_part, mode, newline="", encoding="utf-8")
+
+    def write(self, product: Dict) -> None:
+        """Añade un producto a la salida (si no estaba ya en el .part reanudado)"""
+        if self._resumed_keys and product_key(product) in self._resumed_keys:
+            return
+        self._file.write(json.dumps(product, ensure_ascii=False) + "\n")
+
+        if self._csv_file:
+            if self._csv_writer is None:
+                fields = self._csv_fields or list(product.keys())
+                self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=fields, extrasaction="ignore")
+                if not self._csv_fields:
+                    self._csv_writer.writeheader()
+            self._csv_writer.writerow(product)
+
+        self.count += 1
+        self._pending += 1
+        if (self._pending >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.flush(sync=True)
+
+    def flush(self, sync: bool = False) -> None:
+        """
+        Vacía los buffers al archivo
+
+        Args:
+            sync: Forzar además la escritura a disco (fsync)
+        """
+        for f in (self._file, self._csv_file):
+            if f and not f.closed:
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+        if sync:
+            self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """Sincroniza y publica los archivos con su nombre definitivo"""
+        if self._file.closed:
+            return
+        self.flush(sync=True)
+        self._file.close()
+        os.replace(_part_path(self.path), self.path)
+        if self._csv_file:
+            self._csv_file.close()
+            os.replace(_part_path(self.csv_path), self.csv_path)
+        logger.info(f"{self.count} productos guardados en {self.path}")
+
+    def abort(self) -> None:
+        """Cierra sin publicar: el .part queda en disco para reanudar"""
+        if self._file.closed:
+            return
+        self.flush(sync=True)
+        self._file.close()
+        if self._csv_file:
+            self._csv_file.close()
+        logger.warning(f"Exportación interrumpida, datos parciales en {_part_path(self.path)}")
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,118 @@
+"""
+Extracción de productos independiente del navegador
+Selectores de las tarjetas de Vinted y construcción de los diccionarios de
+producto, compartidos por el scraper de Playwright y el parser offline
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, Optional
+
+from productos import normalize_product
+
+# Dominio por defecto para completar URLs relativas
+DEFAULT_BASE_URL = "https://www.vinted.es"
+
+# Selector de las tarjetas de producto del grid
+PRODUCT_SELECTOR = '.feed-grid__item, [data-testid="item-box"]'
+
+# Aviso de catálogo sin resultados (página posterior a la última)
+EMPTY_CATALOG_SELECTOR = '[data-testid*="empty-state"], .empty-state'
+
+# Selectores de los campos dentro de cada tarjeta
+CARD_SELECTORS = {
+    "title": 'p[data-testid*="description-title"]',
+    "condition": 'p[data-testid*="description-subtitle"]',
+    "price": 'p[data-testid*="price-text"]',
+    "location": '[class*="location"], [class*="user-location"]',
+    "link": 'a[data-testid*="overlay-link"]',
+    "image": 'img[data-testid*="image--img"]',
+}
+
+# Campos de texto de la tarjeta (el resto son atributos del enlace y la imagen)
+TEXT_FIELDS = ("title", "condition", "price", "location")
+
+# ID numérico del artículo en URLs como https://www.vinted.es/items/7594674076-libro
+ITEM_ID_PATTERN = re.compile(r"/items/(\d+)")
+
+
+def extract_item_id(product_url: str) -> Optional[int]:
+    """
+    Obtiene el ID numérico de Vinted a partir de la URL del producto
+
+    Args:
+        product_url: URL del producto
+
+    Returns:
+        ID del artículo o None si la URL no lo contiene
+    """
+    if not product_url:
+        return None
+    match = ITEM_ID_PATTERN.search(product_url)
+    return int(match.group(1)) if match else None
+
+
+def product_key(product: Dict):
+    """Clave de deduplicación de un producto: su ID de Vinted o, si no tiene, su URL"""
+    return product.get("item_id") or product.get("product_url")
+
+
+def build_product(raw: Dict, base_url: str = DEFAULT_BASE_URL) -> Dict:
+    """
+    Construye el diccionario final del producto a partir de los valores en bruto
+
+    Args:
+        raw: Diccionario con los textos/atributos leídos de la tarjeta
+             (claves de CARD_SELECTORS más href, image_src e image_alt)
+        base_url: Dominio usado para completar rutas relativas
+
+    Returns:
+        Diccionario con los datos del producto (incluye los campos
+        normalizados de productos.normalize_product)
+    """
+    def text(key: str, default: str = "N/A") -> str:
+        value = raw.get(key)
+        if value is None:
+            return default
+        return value.strip()
+
+    # Extraer URL del producto
+    product_url = ""
+    href = raw.get("href")
+    if href:
+        product_url = href if href.startswith('http') else f"{base_url}{href}"
+
+    # Extraer URL de la imagen
+    image_url = raw.get("image_src") or "N/A"
+
+    # Marca y talla: Vinted no siempre muestra estos datos en el grid
+    # Intentar extraer del texto alt de la imagen
+    brand = "N/A"
+    size = "N/A"
+
+    alt_text = raw.get("image_alt")
+    if alt_text:
+        # El alt puede contener info adicional
+        # Ejemplo: "Producto marca, talla M, estado: Nuevo, 10€"
+        parts = alt_text.split(',')
+        if len(parts) > 2:
+            # Intentar extraer talla
+            for part in parts:
+                if 'talla' in part.lower() or 'size' in part.lower():
+                    size = part.strip()
+                    break
+
+    return normalize_product({
+        "item_id": extract_item_id(product_url),
+        "title": text("title"),
+        "price": text("price"),
+        "brand": brand,
+        "size": size,
+        "condition": text("condition"),
+        "product_url": product_url,
+        "image_url": image_url,
+        "location": text("location"),
+        "seller": "N/A",
+        "description": "N/A",
+        "scraped_at": datetime.now().isoformat()
+    })
@@ -0,0 +1,247 @@
+"""
+Descarga de imágenes y caché de miniaturas
+Descarga las imágenes de los productos en paralelo reutilizando conexiones,
+las guarda por hash de contenido (una imagen repetida se guarda una vez) y
+genera miniaturas que la aplicación web sirve sin depender del CDN de Vinted
+
+Estructura en disco (data/imagenes):
+    originales/ab/abcdef....jpg   imagen descargada
+    miniaturas/ab/abcdef....jpg   miniatura (requiere Pillow)
+    indice.json                   URL de la imagen -> hash del contenido
+"""
+
+import hashlib
+import http.client
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from puntos_control import write_json_atomic
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class _ConnectionPool(threading.local):
+    """Conexiones HTTP keep-alive por host, una por hilo"""
+
+    def __init__(self):
+        self.connections: Dict[Tuple[str, str], http.client.HTTPConnection] = {}
+
+    def get(self, scheme: str, netloc: str, timeout: float) -> http.client.HTTPConnection:
+        key = (scheme, netloc)
+        conn = self.connections.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(netloc, timeout=timeout)
+            self.connections[key] = conn
+        return conn
+
+    def drop(self, scheme: str, netloc: str) -> None:
+        conn = self.connections.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+
+class ImageStore:
+    """Almacén de imágenes direccionado por contenido"""
+
+    def __init__(
+        self,
+        directory="data/imagenes",
+        thumbnail_size: Tuple[int, int] = (200, 200),
+        timeout: float = 20
+    ):
+        """
+        Inicializa el almacén
+
+        Args:
+            directory: Carpeta raíz de las imágenes
+            thumbnail_size: Tamaño máximo de las miniaturas (ancho, alto)
+            timeout: Segundos máximos por descarga
+        """
+        self.directory = Path(directory)
+        self.thumbnail_size = thumbnail_size
+        self.timeout = timeout
+        self._index_path = self.directory / "indice.json"
+        self._lock = threading.Lock()
+        self._pool = _ConnectionPool()
+        self._index: Dict[str, str] = {}
+
+        (self.directory / "originales").mkdir(parents=True, exist_ok=True)
+        (self.directory / "miniaturas").mkdir(parents=True, exist_ok=True)
+        if self._index_path.exists():
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except Exception as e:
+                logger.warning(f"Índice de imágenes no válido, se reconstruye: {e}")
+
+    def _original_path(self, digest: str, extension: str = ".jpg") -> Path:
+        return self.directory / "originales" / digest[:2] / f"{digest}{extension}"
+
+    def thumbnail_path(self, digest: str) -> Optional[Path]:
+        """
+        Ruta de la miniatura de una imagen
+
+        Args:
+            digest: Hash SHA-256 del contenido
+
+        Returns:
+            Ruta de la miniatura o, sin Pillow, del original; None si no existe
+        """
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        thumb = self.directory / "miniaturas" / digest[:2] / f"{digest}.jpg"
+        if thumb.exists():
+            return thumb
+        originals = [
+            path for path in (self.directory / "originales" / digest[:2]).glob(f"{digest}.*")
+            if path.suffix != ".tmp"
+        ]
+        return originals[0] if originals else None
+
+    def digest_for(self, image_url: str) -> Optional[str]:
+        """Hash del contenido de una imagen ya descargada (None si no lo está)"""
+        return self._index.get(image_url)
+
+    def thumbnail_url(self, image_url: str) -> Optional[str]:
+        """Ruta de la aplicación web que sirve la miniatura de una imagen"""
+        digest = self._index.get(image_url)
+        return f"/thumbs/{digest}" if digest else None
+
+    def _fetch(self, url: str, redirects: int = 3) -> Tuple[int, str, bytes]:
+        """Descarga una URL con la conexión keep-alive del hilo"""
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        # Un reintento por si el servidor cerró la conexión reutilizada
+        for attempt in range(2):
+            conn = self._pool.get(parts.scheme, parts.netloc, self.timeout)
+            try:
+                conn.request("GET", path, headers={"User-Agent": USER_AGENT, "Accept": "image/*"})
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                self._pool.drop(parts.scheme, parts.netloc)
+                if attempt:
+                    raise
+                continue
+
+            if response.will_close:
+                self._pool.drop(parts.scheme, parts.netloc)
+            if response.status in (301, 302, 303, 307, 308) and redirects:
+                location = response.getheader("Location")
+                if location:
+                    return self._fetch(urljoin(url, location), redirects - 1)
+            return response.status, response.getheader("Content-Type", ""), data
+
+    def _write_thumbnail(self, digest: str, data: bytes) -> None:
+        """Genera la miniatura JPEG de una imagen (si Pillow está instalado)"""
+        if Image is None:
+            return
+        thumb = self.directory / "miniaturas" / digest[:2] / f"{digest}.jpg"
+        if thumb.exists():
+            return
+        try:
+            with Image.open(BytesIO(data)) as img:
+                img.thumbnail(self.thumbnail_size)
+                thumb.parent.mkdir(exist_ok=True)
+                tmp = thumb.with_suffix(f".{threading.get_ident()}.tmp")
+                img.convert("RGB").save(tmp, "JPEG", quality=80, optimize=True)
+                os.replace(tmp, thumb)
+        except Exception as e:
+            logger.warning(f"No se pudo generar la miniatura {digest}: {e}")
+
+    def _download(self, image_url: str) -> Optional[str]:
+        """Descarga y guarda una imagen; devuelve el hash de su contenido"""
+        try:
+            status, content_type, data = self._fetch(image_url)
+        except Exception as e:
+            logger.warning(f"Error descargando {image_url}: {e}")
+            return None
+        if status != 200 or not data:
+            logger.warning(f"Error descargando {image_url}: HTTP {status}")
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        extension = mimetypes.guess_extension(content_type.split(";")[0].strip()) or ".jpg"
+        original = self._original_path(digest, extension)
+        if not original.exists():
+            original.parent.mkdir(exist_ok=True)
+            tmp = original.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, original)
+        self._write_thumbnail(digest, data)
+
+        with self._lock:
+            self._index[image_url] = digest
+        return digest
+
+    def download_all(self, products: Iterable[Dict], workers: int = 8) -> Dict:
+        """
+        Descarga las imágenes de los productos que aún no estén en el almacén
+
+        Args:
+            products: Productos con image_url
+            workers: Descargas simultáneas
+
+        Returns:
+            Diccionario con el resumen (nuevas, ya descargadas, errores)
+        """
+        urls = {
+            p.get("image_url") for p in products
+            if p.get("image_url", "N/A").startswith("http")
+        }
+        pending = [url for url in urls if url not in self._index]
+        if not pending:
+            return {"downloaded": 0, "cached": len(urls), "failed": 0}
+
+        logger.info(f"Descargando {len(pending)} imágenes ({workers} en paralelo)...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self._download, pending))
+
+        with self._lock:
+            write_json_atomic(self._index_path, self._index)
+
+        downloaded = sum(1 for digest in results if digest)
+        stats = {
+            "downloaded": downloaded,
+            "cached": len(urls) - len(pending),
+            "failed": len(pending) - downloaded,
+        }
+        logger.info(f"Imágenes: {stats}")
+        return stats
+
+
+def main():
+    """Descarga las imágenes de data/productos.json"""
+    with open("data/productos.json", "r", encoding="utf-8") as f:
+        products = json.load(f).get("products", [])
+
+    stats = ImageStore().download_all(products)
+    print(f"{stats['downloaded']} descargadas, {stats['cached']} ya en caché, {stats['failed']} errores")
+    if Image is None:
+        print("Pillow no está instalado: se servirán las imágenes originales")
+
+
+if __name__ == "__main__":
+    main()
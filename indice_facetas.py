@@ -0,0 +1,181 @@
+"""
+Índices de los filtros de /api/products
+Para cada valor de un campo categórico (marca, talla, estado) se guardan sus
+filas: como array ordenado si el valor es poco frecuente o como bitmap (un int
+de Python con un bit por fila) si aparece en muchas filas, al estilo de los
+roaring bitmaps. El precio tiene un índice ordenado para resolver rangos con
+bisect. Con estos índices se sabe cuántas filas deja pasar cada filtro sin
+recorrer el almacén, y la consulta empieza por el más selectivo
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import compress
+from typing import Dict, Iterable, List, Union
+
+# Un valor presente en al menos 1 de cada DENSE_RATIO filas se guarda como bitmap
+DENSE_RATIO = 32
+
+# Dígitos de bin() -> bytes 0/1, para recorrer los bitmaps con compress
+BINARY_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+
+Posting = Union[array, int]
+
+
+def to_bitmap(rows: Iterable[int]) -> int:
+    """Bitmap (int) con los bits de las filas a 1"""
+    rows = list(rows)
+    if not rows:
+        return 0
+    data = bytearray(max(rows) // 8 + 1)
+    for row in rows:
+        data[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(data, "little")
+
+
+def bitmap_rows(bitmap: int) -> List[int]:
+    """Filas (ordenadas) con el bit a 1 en el bitmap"""
+    # Un byte por fila (el bit 0 primero); compress recorre en C
+    bits = bin(bitmap)[:1:-1].encode("ascii").translate(BINARY_DIGITS)
+    return list(compress(range(len(bits)), bits))
+
+
+class FacetIndex:
+    """Filas de cada código de una columna categórica"""
+
+    def __init__(self, codes: array):
+        """
+        Construye el índice
+
+        Args:
+            codes: Código de cada fila (DictionaryColumn.codes o similar)
+        """
+        groups: Dict[int, array] = {}
+        for row, code in enumerate(codes):
+            rows = groups.get(code)
+            if rows is None:
+                rows = groups[code] = array("I")
+            rows.append(row)
+
+        self.counts: Dict[int, int] = {code: len(rows) for code, rows in groups.items()}
+        self.postings: Dict[int, Posting] = {
+            code: to_bitmap(rows) if len(rows) * DENSE_RATIO >= len(codes) else rows
+            for code, rows in groups.items()
+        }
+
+    def count(self, codes: Iterable[int]) -> int:
+        """Filas con alguno de los códigos"""
+        return sum(self.counts.get(code, 0) for code in codes)
+
+    def rows(self, codes: Iterable[int]) -> List[int]:
+        """Filas (ordenadas) con alguno de los códigos"""
+        result: List[int] = []
+        parts = 0
+        for code in codes:
+            posting = self.postings.get(code)
+            if posting is None:
+                continue
+            result.extend(bitmap_rows(posting) if isinstance(posting, int) else posting)
+            parts += 1
+        if parts > 1:
+            result.sort()
+        return result
+
+    def bitmap(self, codes: Iterable[int]) -> int:
+        """Bitmap de las filas con alguno de los códigos"""
+        bitmap = 0
+        for code in codes:
+            posting = self.postings.get(code)
+            if posting is not None:
+                bitmap |= posting if isinstance(posting, int) else to_bitmap(posting)
+        return bitmap
+
+    def is_dense(self, codes: Iterable[int]) -> bool:
+        """Si todos los códigos están guardados como bitmap"""
+        return all(isinstance(self.postings.get(code), int) for code in codes)
+
+    def add(self, row: int, code: int) -> None:
+        """Añade una fila nueva (mayor que todas las indexadas)"""
+        posting = self.postings.get(code)
+        if posting is None:
+            self.postings[code] = array("I", [row])
+        elif isinstance(posting, int):
+            self.postings[code] = posting | (1 << row)
+        else:
+            posting.append(row)
+        self.counts[code] = self.counts.get(code, 0) + 1
+
+    def move(self, row: int, old_code: int, new_code: int) -> None:
+        """Cambia el código de una fila ya indexada"""
+        if old_code == new_code:
+            return
+        posting = self.postings[old_code]
+        if isinstance(posting, int):
+            self.postings[old_code] = posting & ~(1 << row)
+        else:
+            del posting[bisect_left(posting, row)]
+        self.counts[old_code] -= 1
+
+        posting = self.postings.get(new_code)
+        if posting is None:
+            self.postings[new_code] = array("I", [row])
+        elif isinstance(posting, int):
+            self.postings[new_code] = posting | (1 << row)
+        else:
+            insort(posting, row)
+        self.counts[new_code] = self.counts.get(new_code, 0) + 1
+
+
+class PriceIndex:
+    """Filas ordenadas por precio para filtrar por rango"""
+
+    def __init__(self, prices: array, missing: int):
+        """
+        Construye el índice
+
+        Args:
+            prices: Precio en céntimos de cada fila
+            missing: Valor de las filas sin precio (menor que cualquier precio)
+        """
+        order = sorted(range(len(prices)), key=prices.__getitem__)
+        # Filas ordenadas por precio y el precio de cada una, en paralelo
+        self.order = array("I", order)
+        self.prices = array("q", (prices[row] for row in order))
+        self.missing = missing
+
+    def _spans(self, low: float, high: float):
+        """Tramos del índice: filas sin precio y filas dentro del rango"""
+        unknown = bisect_right(self.prices, self.missing)
+        start = max(unknown, bisect_left(self.prices, low))
+        end = max(start, bisect_right(self.prices, high))
+        return unknown, start, end
+
+    def count(self, low: float, high: float) -> int:
+        """Filas con precio en [low, high] o sin precio"""
+        unknown, start, end = self._spans(low, high)
+        return unknown + end - start
+
+    def rows(self, low: float, high: float) -> List[int]:
+        """Filas (ordenadas) con precio en [low, high] o sin precio"""
+        unknown, start, end = self._spans(low, high)
+        size = len(self.order)
+        if (unknown + end - start) * 2 <= size:
+            return sorted(self.order[:unknown] + self.order[start:end])
+        # Pasan la mayoría: se desmarcan las que quedan fuera del rango
+        mask = bytearray(b"\x01") * size
+        for row in self.order[unknown:start]:
+            mask[row] = 0
+        for row in self.order[end:]:
+            mask[row] = 0
+        return list(compress(range(size), mask))
+
+    def add(self, row: int, price: int) -> None:
+        position = bisect_right(self.prices, price)
+        self.prices.insert(position, price)
+        self.order.insert(position, row)
+
+    def remove(self, row: int, price: int) -> None:
+        start, end = bisect_left(self.prices, price), bisect_right(self.prices, price)
+        position = start + self.order[start:end].index(row)
+        del self.prices[position]
+        del self.order[position]
@@ -0,0 +1,136 @@
+"""
+Índice invertido de texto para la búsqueda de productos
+Cada palabra (en minúsculas y sin acentos) del título y la marca apunta a la
+lista ordenada de filas que la contienen. Una búsqueda de varias palabras
+intersecta sus listas empezando por la más corta, y cada palabra se busca como
+prefijo en el vocabulario ordenado (búsqueda mientras se escribe), así que el
+coste depende de los resultados y no del tamaño del catálogo
+"""
+
+import re
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set
+
+from productos import fold
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(*texts: Optional[str]) -> Set[str]:
+    """
+    Palabras normalizadas de uno o varios textos
+
+    Args:
+        *texts: Textos (los None y "N/A" se ignoran)
+
+    Returns:
+        Conjunto de palabras ("Camisón Zara" -> {"camison", "zara"})
+    """
+    tokens = set()
+    for text in texts:
+        if text and text != "N/A":
+            tokens.update(TOKEN_PATTERN.findall(fold(text)))
+    return tokens
+
+
+class TokenIndex:
+    """Índice palabra -> filas, actualizable fila a fila"""
+
+    def __init__(self):
+        self.postings: Dict[str, array] = {}
+        # Vocabulario ordenado para buscar por prefijo con bisect
+        self._vocabulary: List[str] = []
+        self._sorted = True
+
+    def add(self, row: int, *texts: Optional[str]) -> None:
+        """
+        Indexa una fila nueva
+
+        Args:
+            row: Número de fila (mayor que las ya indexadas)
+            *texts: Textos de la fila (título, marca)
+        """
+        for token in tokenize(*texts):
+            rows = self.postings.get(token)
+            if rows is None:
+                self.postings[token] = array("I", [row])
+                self._vocabulary.append(token)
+                self._sorted = False
+            else:
+                rows.append(row)
+
+    def replace(self, row: int, old_texts: Iterable[Optional[str]], new_texts: Iterable[Optional[str]]) -> None:
+        """
+        Actualiza una fila ya indexada cuyo texto ha cambiado
+
+        Args:
+            row: Número de fila
+            old_texts: Textos anteriores
+            new_texts: Textos nuevos
+        """
+        old_tokens, new_tokens = tokenize(*old_texts), tokenize(*new_texts)
+        for token in old_tokens - new_tokens:
+            rows = self.postings[token]
+            del rows[bisect_left(rows, row)]
+            if not rows:
+                del self.postings[token]
+                self._vocabulary.remove(token)
+        for token in new_tokens - old_tokens:
+            rows = self.postings.get(token)
+            if rows is None:
+                self.postings[token] = array("I", [row])
+                self._vocabulary.append(token)
+                self._sorted = False
+            else:
+                insort(rows, row)
+
+    def sort_vocabulary(self) -> None:
+        """
+        Ordena el vocabulario tras añadir palabras nuevas
+
+        Lo llama quien escribe en el índice al terminar una tanda de add() o
+        replace(), para que las búsquedas no tengan que reordenarlo.
+        """
+        if not self._sorted:
+            self._vocabulary.sort()
+            self._sorted = True
+
+    def _prefix_rows(self, prefix: str) -> Set[int]:
+        """Filas con alguna palabra que empieza por el prefijo"""
+        self.sort_vocabulary()
+        vocabulary = self._vocabulary
+        rows: Set[int] = set()
+        position = bisect_left(vocabulary, prefix)
+        while position < len(vocabulary) and vocabulary[position].startswith(prefix):
+            rows.update(self.postings[vocabulary[position]])
+            position += 1
+        return rows
+
+    def matches(self, query: str) -> Optional[Set[int]]:
+        """
+        Filas que contienen todas las palabras de la consulta (como prefijo)
+
+        Args:
+            query: Texto de búsqueda ("camis zara")
+
+        Returns:
+            Conjunto de filas, o None si la consulta no tiene palabras
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+
+        # Intersección empezando por la palabra con menos filas
+        matches = sorted((self._prefix_rows(token) for token in tokens), key=len)
+        result = matches[0]
+        for rows in matches[1:]:
+            if not result:
+                break
+            result = result & rows
+        return result
+
+    def search(self, query: str) -> Optional[List[int]]:
+        """Como matches(), pero con las filas ordenadas"""
+        result = self.matches(query)
+        return None if result is None else sorted(result)
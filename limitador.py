@@ -0,0 +1,266 @@
+"""
+Limitador de peticiones por host compartido entre hilos y procesos
+Token bucket por host guardado en SQLite, de modo que todos los trabajos de
+scraping (hilo de la app, crawler, otros procesos) respetan el mismo ritmo.
+El ritmo se adapta solo: baja a la mitad ante un 429/403 o una página de
+desafío anti-bots (una vez por pausa) y sube poco a poco mientras las
+peticiones van bien. Las respuestas correctas se cuentan en memoria y se
+aplican al pedir el siguiente turno, en la misma transacción, así que no
+añaden escrituras a la base de datos
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Códigos de respuesta que indican que el servidor nos está frenando
+THROTTLE_STATUSES = (403, 429)
+
+# Hosts de los desafíos anti-bots (DataDome, Cloudflare)
+CHALLENGE_HOSTS = ("captcha-delivery.com", "challenges.cloudflare.com")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    host TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    updated REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0,
+    throttled INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+def is_challenge_url(url: str) -> bool:
+    """Comprueba si una URL pertenece a una página de desafío anti-bots"""
+    host = urlparse(url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in CHALLENGE_HOSTS)
+
+
+class RateLimiter:
+    """Token bucket adaptativo (AIMD) por host"""
+
+    def __init__(
+        self,
+        path="data/limitador.sqlite",
+        rate: float = 1.0,
+        min_rate: float = 0.1,
+        max_rate: float = 5.0,
+        burst: float = 3.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        cooldown: float = 30.0
+    ):
+        """
+        Inicializa el limitador
+
+        Args:
+            path: Base de datos SQLite compartida
+            rate: Peticiones por segundo iniciales de un host nuevo
+            min_rate: Ritmo mínimo al que se puede bajar
+            max_rate: Ritmo máximo al que se puede subir
+            burst: Peticiones que se pueden hacer seguidas sin esperar
+            increase: Peticiones/s que se suman por cada respuesta correcta
+                      (se aplican al pedir el siguiente turno)
+            decrease: Factor por el que se multiplica el ritmo al ser frenados
+                      (una vez por pausa)
+            cooldown: Segundos de pausa tras un 429/403 sin Retry-After
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._local = threading.local()
+        # Respuestas correctas pendientes de aplicar por host (solo de los
+        # hosts a los que este proceso ha pedido turno) y fin de la pausa
+        # conocido de cada uno
+        self._lock = threading.Lock()
+        self._successes: Dict[str, int] = {}
+        self._blocked_until: Dict[str, float] = {}
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (sqlite3 no comparte conexiones entre hilos)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _bucket(self, conn: sqlite3.Connection, host: str, now: float):
+        """Lee (o crea) el bucket de un host dentro de la transacción actual"""
+        row = conn.execute(
+            "SELECT tokens, rate, updated, blocked_until FROM buckets WHERE host = ?", (host,)
+        ).fetchone()
+        if row is None:
+            row = (self.burst, self.initial_rate, now, 0.0)
+            conn.execute(
+                "INSERT INTO buckets (host, tokens, rate, updated) VALUES (?, ?, ?, ?)",
+                (host, *row[:3])
+            )
+        tokens, rate, updated, blocked_until = row
+        # Recargar los tokens acumulados desde la última petición
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * rate)
+        return tokens, rate, blocked_until
+
+    def reserve(self, host: str) -> float:
+        """
+        Reserva un turno para hacer una petición al host
+
+        Args:
+            host: Host de destino (www.vinted.es)
+
+        Returns:
+            Segundos que hay que esperar antes de hacer la petición
+        """
+        self._local.last_host = host
+        with self._lock:
+            successes = self._successes.get(host, 0)
+            self._successes[host] = 0
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, rate, blocked_until = self._bucket(conn, host, now)
+            # Subida aditiva por las respuestas correctas desde el último
+            # turno, salvo durante la pausa tras ser frenados
+            if successes and blocked_until <= now:
+                rate = min(self.max_rate, rate + self.increase * successes)
+            # Si no hay token disponible queda en negativo: la espera es lo
+            # que tarda en recargarse hasta volver a cero
+            tokens -= 1
+            wait = max(0.0, -tokens / rate, blocked_until - now)
+            conn.execute(
+                "UPDATE buckets SET tokens = ?, rate = ?, updated = ? WHERE host = ?",
+                (tokens, rate, now, host)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._blocked_until[host] = blocked_until
+        return wait
+
+    def wait(self, url: str) -> float:
+        """Espera (bloqueando) el turno para una petición a la URL"""
+        delay = self.reserve(urlparse(url).netloc)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, url: str) -> float:
+        """Espera el turno para una petición a la URL sin bloquear el bucle"""
+        delay = self.reserve(urlparse(url).netloc)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def report(self, url: str, status: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+        """
+        Ajusta el ritmo del host según el resultado de una petición
+
+        Args:
+            url: URL de la respuesta
+            status: Código HTTP
+            retry_after: Segundos de la cabecera Retry-After, si la hay
+        """
+        throttled = status in THROTTLE_STATUSES or is_challenge_url(url)
+        host = urlparse(url).netloc
+        if is_challenge_url(url):
+            # El desafío lo sirve otro host: se penaliza el último al que se
+            # pidió turno desde este hilo
+            host = getattr(self._local, "last_host", host)
+
+        now = time.time()
+        if not throttled:
+            # Se aplica en el siguiente reserve(); las de hosts a los que no
+            # se ha pedido turno (terceros) y las que llegan durante la pausa
+            # no cuentan
+            with self._lock:
+                if host in self._successes and self._blocked_until.get(host, 0.0) <= now:
+                    self._successes[host] += 1
+            return
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, rate, blocked_until = self._bucket(conn, host, now)
+            # Una sola bajada por pausa: las respuestas frenadas que llegan
+            # durante ella (peticiones en paralelo de la misma ráfaga) solo
+            # la alargan
+            decreased = blocked_until <= now
+            if decreased:
+                rate = max(self.min_rate, rate * self.decrease)
+            blocked_until = max(blocked_until, now + (retry_after or self.cooldown))
+            tokens = min(tokens, 0.0)
+            conn.execute(
+                "UPDATE buckets SET tokens = ?, rate = ?, updated = ?, blocked_until = ?,"
+                " throttled = throttled + 1 WHERE host = ?",
+                (tokens, rate, now, blocked_until, host)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            # Las respuestas correctas anteriores al frenazo ya no cuentan
+            if host in self._successes:
+                self._successes[host] = 0
+            self._blocked_until[host] = blocked_until
+        if decreased:
+            logger.warning(f"Frenados por {host} (HTTP {status}): ritmo reducido a {rate:.2f} peticiones/s")
+        else:
+            logger.debug(f"Frenados de nuevo por {host} (HTTP {status}) durante la pausa")
+
+    def on_response(self, response) -> None:
+        """
+        Handler de page.on("response") que informa al limitador
+
+        Solo cuentan los documentos y las peticiones XHR/fetch, no los
+        recursos estáticos del CDN.
+        """
+        try:
+            if response.request.resource_type not in ("document", "xhr", "fetch"):
+                return
+            retry_after = response.headers.get("retry-after")
+            self.report(
+                response.url,
+                response.status,
+                float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        except Exception as e:
+            logger.debug(f"Respuesta no registrada en el limitador: {e}")
+
+    def stats(self) -> Dict[str, Dict]:
+        """Devuelve el estado de cada host"""
+        rows = self._connect().execute(
+            "SELECT host, rate, blocked_until, throttled FROM buckets"
+        ).fetchall()
+        now = time.time()
+        return {
+            host: {
+                "rate": round(rate, 3),
+                "blocked_for": round(max(0.0, blocked_until - now), 1),
+                "throttled": throttled,
+            }
+            for host, rate, blocked_until, throttled in rows
+        }
@@ -0,0 +1,274 @@
+"""
+Parser offline de páginas de catálogo de Vinted
+Extrae los mismos diccionarios de producto que el scraper a partir de HTML
+guardado o descargado por HTTP, sin navegador. Usa el backend más rápido
+disponible: selectolax (Lexbor), lxml (con cssselect) o BeautifulSoup
+"""
+
+import argparse
+import json
+import logging
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from extraccion import (
+    PRODUCT_SELECTOR,
+    CARD_SELECTORS,
+    TEXT_FIELDS,
+    DEFAULT_BASE_URL,
+    build_product,
+    product_key,
+)
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html
+    import cssselect  # noqa: F401  (necesario para lxml cssselect())
+except ImportError:
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class _SelectolaxBackend:
+    """Backend basado en selectolax (motor Lexbor, en C)"""
+
+    name = "selectolax"
+
+    def parse(self, html: str):
+        return SelectolaxParser(html)
+
+    def select(self, node, selector: str) -> List:
+        return node.css(selector)
+
+    def select_one(self, node, selector: str):
+        return node.css_first(selector)
+
+    def text(self, node) -> str:
+        return node.text(deep=True)
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.attributes.get(name)
+
+
+class _LxmlBackend:
+    """Backend basado en lxml.html y cssselect"""
+
+    name = "lxml"
+
+    def parse(self, html: str):
+        return lxml.html.document_fromstring(html)
+
+    def select(self, node, selector: str) -> List:
+        return node.cssselect(selector)
+
+    def select_one(self, node, selector: str):
+        found = node.cssselect(selector)
+        return found[0] if found else None
+
+    def text(self, node) -> str:
+        return node.text_content()
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+
+class _SoupBackend:
+    """Backend basado en BeautifulSoup con html.parser (siempre disponible)"""
+
+    name = "bs4"
+
+    def parse(self, html: str):
+        return BeautifulSoup(html, "html.parser")
+
+    def select(self, node, selector: str) -> List:
+        return node.select(selector)
+
+    def select_one(self, node, selector: str):
+        return node.select_one(selector)
+
+    def text(self, node) -> str:
+        return node.get_text()
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+
+# Backends en orden de preferencia (de más a menos rápido)
+BACKENDS = {}
+if SelectolaxParser is not None:
+    BACKENDS["selectolax"] = _SelectolaxBackend
+if lxml is not None:
+    BACKENDS["lxml"] = _LxmlBackend
+BACKENDS["bs4"] = _SoupBackend
+
+
+class HTMLProductParser:
+    """Extrae productos de HTML de catálogo sin navegador"""
+
+    def __init__(self, backend: str = "auto", base_url: str = DEFAULT_BASE_URL):
+        """
+        Inicializa el parser
+
+        Args:
+            backend: "auto" (el más rápido instalado), "selectolax", "lxml" o "bs4"
+            base_url: Dominio usado para completar rutas relativas
+        """
+        if backend == "auto":
+            backend = next(iter(BACKENDS))
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend no disponible: {backend} (disponibles: {', '.join(BACKENDS)})")
+
+        self.backend = BACKENDS[backend]()
+        self.base_url = base_url
+
+    def _extract_card(self, card) -> Dict:
+        """Lee los campos de una tarjeta y construye el producto"""
+        backend = self.backend
+        raw = {}
+
+        for key in TEXT_FIELDS:
+            elem = backend.select_one(card, CARD_SELECTORS[key])
+            if elem is not None:
+                raw[key] = backend.text(elem)
+
+        link = backend.select_one(card, CARD_SELECTORS["link"])
+        if link is not None:
+            raw["href"] = backend.attr(link, "href")
+
+        img = backend.select_one(card, CARD_SELECTORS["image"])
+        if img is not None:
+            raw["image_src"] = backend.attr(img, "src") or backend.attr(img, "data-src")
+            raw["image_alt"] = backend.attr(img, "alt")
+
+        return build_product(raw, self.base_url)
+
+    def parse(self, html: str) -> List[Dict]:
+        """
+        Extrae los productos de un documento HTML
+
+        Args:
+            html: Página de catálogo completa o el HTML de una sola tarjeta
+                  (como data/item_html.txt)
+
+        Returns:
+            Lista de diccionarios con los datos de los productos
+        """
+        root = self.backend.parse(html)
+        cards = self.backend.select(root, PRODUCT_SELECTOR)
+
+        # Un fragmento guardado con el contenido de una tarjeta no incluye el
+        # contenedor .feed-grid__item: se trata el documento como una tarjeta
+        if not cards and self.backend.select_one(root, CARD_SELECTORS["link"]) is not None:
+            cards = [root]
+
+        return [self._extract_card(card) for card in cards]
+
+    def parse_file(self, path) -> List[Dict]:
+        """Extrae los productos de un archivo HTML guardado"""
+        return self.parse(Path(path).read_text(encoding="utf-8"))
+
+    def fetch(self, url: str, timeout: float = 30) -> List[Dict]:
+        """
+        Descarga una página por HTTP y extrae sus productos
+
+        Args:
+            url: URL de la página de catálogo
+            timeout: Segundos máximos de espera
+
+        Returns:
+            Lista de diccionarios con los datos de los productos
+        """
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            charset = response.headers.get_content_charset() or "utf-8"
+            html = response.read().decode(charset, errors="replace")
+        return self.parse(html)
+
+
+def _parse_file_worker(args) -> List[Dict]:
+    """Función de nivel de módulo para ProcessPoolExecutor"""
+    path, backend, base_url = args
+    try:
+        return HTMLProductParser(backend, base_url).parse_file(path)
+    except Exception as e:
+        logger.error(f"Error parseando {path}: {e}")
+        return []
+
+
+def parse_files(
+    paths: List,
+    backend: str = "auto",
+    base_url: str = DEFAULT_BASE_URL,
+    workers: Optional[int] = None
+) -> List[Dict]:
+    """
+    Extrae los productos de muchos archivos HTML en paralelo
+
+    Args:
+        paths: Rutas de los archivos
+        backend: Backend de parseo
+        base_url: Dominio usado para completar rutas relativas
+        workers: Procesos a usar (por defecto uno por núcleo; 1 para no
+                 crear procesos)
+
+    Returns:
+        Lista de productos sin duplicados (por ID de Vinted)
+    """
+    tasks = [(str(path), backend, base_url) for path in paths]
+
+    if workers == 1:
+        results = map(_parse_file_worker, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_parse_file_worker, tasks, chunksize=16))
+
+    products = []
+    seen = set()
+    for file_products in results:
+        for product in file_products:
+            key = product_key(product)
+            if key and key in seen:
+                continue
+            seen.add(key)
+            products.append(product)
+    return products
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Extrae productos de páginas de Vinted guardadas")
+    parser.add_argument("rutas", nargs="+", help="Archivos HTML o URLs (http/https)")
+    parser.add_argument("--backend", default="auto", choices=["auto", *BACKENDS])
+    parser.add_argument("--salida", help="Guardar los productos en este archivo JSON")
+    args = parser.parse_args()
+
+    html_parser = HTMLProductParser(args.backend)
+    urls = [r for r in args.rutas if r.startswith("http")]
+    files = [r for r in args.rutas if not r.startswith("http")]
+
+    products = parse_files(files, backend=args.backend, workers=1 if len(files) < 64 else None)
+    for url in urls:
+        products.extend(html_parser.fetch(url))
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(products, f, ensure_ascii=False, indent=2)
+        print(f"{len(products)} productos guardados en {args.salida}")
+    else:
+        print(json.dumps(products, ensure_ascii=False, indent=2))
+        print(f"\n{len(products)} productos (backend: {html_parser.backend.name})")
+
+
+if __name__ == "__main__":
+    main()
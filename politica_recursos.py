@@ -0,0 +1,146 @@
+"""
+Politica de bloqueo de recursos para los contextos de Playwright
+Evita descargar imagenes, fuentes, video y trackers de terceros que el
+scraper no necesita (la URL de la imagen se sigue leyendo del atributo src)
+"""
+
+import threading
+from typing import Dict, Iterable
+from urllib.parse import urlparse
+
+# Tipos de recurso de Playwright que no hacen falta para extraer datos
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+
+# Hosts de publicidad, analitica y seguimiento
+DEFAULT_BLOCKED_HOSTS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "amazon-adsystem.com",
+    "facebook.net",
+    "connect.facebook.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "hotjar.com",
+    "scorecardresearch.com",
+    "adnxs.com",
+    "rubiconproject.com",
+    "pubmatic.com",
+    "casalemedia.com",
+    "sentry.io",
+    "datadoghq-browser-agent.com",
+)
+
+# Tamaño medio estimado por tipo de recurso bloqueado (no se llega a
+# descargar, por lo que el ahorro en bytes es una estimación)
+ESTIMATED_BYTES = {
+    "image": 35_000,
+    "media": 500_000,
+    "font": 40_000,
+    "script": 60_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+    "other": 5_000,
+}
+
+
+class ResourcePolicy:
+    """Decide qué peticiones se bloquean y lleva la cuenta de lo ahorrado"""
+
+    def __init__(
+        self,
+        blocked_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+        blocked_hosts: Iterable[str] = DEFAULT_BLOCKED_HOSTS
+    ):
+        """
+        Inicializa la politica
+
+        Args:
+            blocked_types: Tipos de recurso de Playwright a bloquear
+            blocked_hosts: Dominios (y sus subdominios) a bloquear
+        """
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_hosts = tuple(blocked_hosts)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Pone a cero los contadores"""
+        with self._lock:
+            self.requests = 0
+            self.blocked = 0
+            self.blocked_by_type: Dict[str, int] = {}
+            self.bytes_saved = 0
+
+    def _is_blocked_host(self, host: str) -> bool:
+        """Indica si el host o alguno de sus dominios padre está bloqueado"""
+        return any(host == blocked or host.endswith("." + blocked) for blocked in self.blocked_hosts)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """
+        Decide si una petición se bloquea
+
+        Args:
+            resource_type: Tipo de recurso de Playwright (image, script...)
+            url: URL de la petición
+
+        Returns:
+            True si la petición debe abortarse
+        """
+        if resource_type in self.blocked_types:
+            return True
+        host = urlparse(url).hostname or ""
+        return self._is_blocked_host(host)
+
+    def check(self, resource_type: str, url: str) -> bool:
+        """
+        Decide si una petición se bloquea y la contabiliza
+
+        Args:
+            resource_type: Tipo de recurso de Playwright
+            url: URL de la petición
+
+        Returns:
+            True si la petición debe abortarse
+        """
+        block = self.should_block(resource_type, url)
+        with self._lock:
+            self.requests += 1
+            if block:
+                self.blocked += 1
+                self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+                self.bytes_saved += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES["other"])
+        return block
+
+    def handle_route(self, route) -> None:
+        """Handler para context.route con la API síncrona de Playwright"""
+        request = route.request
+        if self.check(request.resource_type, request.url):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_route_async(self, route) -> None:
+        """Handler para context.route con la API asíncrona de Playwright"""
+        request = route.request
+        if self.check(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def stats(self) -> Dict:
+        """Devuelve las estadísticas acumuladas"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "blocked": self.blocked,
+                "blocked_by_type": dict(self.blocked_by_type),
+                "bytes_saved_estimate": self.bytes_saved,
+            }
+
@@ -0,0 +1,182 @@
+"""
+Pool de navegadores Chromium reutilizables entre trabajos de scraping
+Cada trabajo recibe un contexto nuevo (cookies y caché aisladas) sobre un
+navegador ya arrancado, en lugar de lanzar Playwright y Chromium cada vez
+
+La API síncrona de Playwright está ligada al hilo que la inicia: un pool
+solo puede usarse desde el hilo que lo creó (en app.py, el hilo de trabajos)
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from playwright.sync_api import sync_playwright, Browser, BrowserContext
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledBrowser:
+    """Navegador del pool con sus contadores de uso"""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages = 0
+        self.active_contexts = 0
+
+    def on_page(self, _page) -> None:
+        """Cuenta cada página abierta en cualquiera de sus contextos"""
+        self.pages += 1
+
+
+class BrowserPool:
+    """Mantiene navegadores abiertos y reparte contextos nuevos"""
+
+    def __init__(
+        self,
+        size: int = 1,
+        max_pages_per_browser: int = 200,
+        max_memory_mb: Optional[int] = 1500,
+        headless: bool = True,
+        launch_options: Optional[Dict] = None
+    ):
+        """
+        Inicializa el pool (los navegadores se lanzan en start())
+
+        Args:
+            size: Número de navegadores abiertos
+            max_pages_per_browser: Páginas tras las que se recicla un navegador
+            max_memory_mb: Memoria total (RSS) de los procesos del navegador a
+                           partir de la cual se recicla (requiere psutil)
+            headless: Lanzar Chromium sin interfaz
+            launch_options: Opciones adicionales para chromium.launch
+        """
+        self.size = size
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.launch_options = dict(launch_options or {}, headless=headless)
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._thread_id: Optional[int] = None
+        self.launched = 0
+        self.recycled = 0
+
+    def start(self) -> "BrowserPool":
+        """Arranca Playwright y los navegadores del pool"""
+        if self._playwright is None:
+            self._thread_id = threading.get_ident()
+            self._playwright = sync_playwright().start()
+            while len(self._browsers) < self.size:
+                self._browsers.append(self._launch())
+            logger.info(f"Pool de navegadores iniciado ({self.size} navegadores)")
+        return self
+
+    def _launch(self) -> _PooledBrowser:
+        """Lanza un navegador nuevo"""
+        self.launched += 1
+        return _PooledBrowser(self._playwright.chromium.launch(**self.launch_options))
+
+    def _memory_mb(self) -> Optional[float]:
+        """Memoria RSS de los procesos hijos (driver y navegadores) en MB"""
+        if psutil is None:
+            return None
+        try:
+            children = psutil.Process().children(recursive=True)
+            return sum(child.memory_info().rss for child in children) / (1024 * 1024)
+        except psutil.Error:
+            return None
+
+    def _needs_recycle(self, pooled: _PooledBrowser) -> bool:
+        """Comprueba si el navegador ha superado sus límites de uso"""
+        if pooled.pages >= self.max_pages_per_browser:
+            logger.info(f"Navegador con {pooled.pages} páginas, se recicla")
+            return True
+        if self.max_memory_mb:
+            memory = self._memory_mb()
+            if memory is not None and memory > self.max_memory_mb:
+                logger.info(f"Navegadores usando {memory:.0f} MB, se recicla")
+                return True
+        return False
+
+    def _recycle(self, pooled: _PooledBrowser) -> _PooledBrowser:
+        """Cierra un navegador y lo sustituye por uno nuevo"""
+        try:
+            pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"Error cerrando navegador: {e}")
+        self.recycled += 1
+        fresh = self._launch()
+        self._browsers[self._browsers.index(pooled)] = fresh
+        return fresh
+
+    def _acquire(self) -> _PooledBrowser:
+        """Elige el navegador menos cargado, reciclándolo si hace falta"""
+        self.start()
+        if threading.get_ident() != self._thread_id:
+            raise RuntimeError("El pool de navegadores solo puede usarse desde el hilo que lo inició")
+
+        pooled = min(self._browsers, key=lambda b: (b.active_contexts, b.pages))
+        if not pooled.browser.is_connected():
+            logger.warning("Navegador desconectado, se relanza")
+            pooled = self._recycle(pooled)
+        elif pooled.active_contexts == 0 and self._needs_recycle(pooled):
+            pooled = self._recycle(pooled)
+        return pooled
+
+    @contextmanager
+    def context(self, **context_options) -> Iterator[BrowserContext]:
+        """
+        Entrega un contexto nuevo sobre un navegador del pool
+
+        Args:
+            **context_options: Opciones para browser.new_context
+
+        Yields:
+            Contexto de Playwright, que se cierra al salir del bloque
+        """
+        pooled = self._acquire()
+        context = pooled.browser.new_context(**context_options)
+        context.on("page", pooled.on_page)
+        pooled.active_contexts += 1
+        try:
+            yield context
+        finally:
+            pooled.active_contexts -= 1
+            try:
+                context.close()
+            except Exception as e:
+                logger.warning(f"Error cerrando contexto: {e}")
+
+    def stats(self) -> Dict:
+        """Devuelve el estado del pool"""
+        return {
+            "browsers": len(self._browsers),
+            "pages": [b.pages for b in self._browsers],
+            "launched": self.launched,
+            "recycled": self.recycled,
+            "memory_mb": self._memory_mb(),
+        }
+
+    def close(self) -> None:
+        """Cierra todos los navegadores y detiene Playwright"""
+        for pooled in self._browsers:
+            try:
+                pooled.browser.close()
+            except Exception:
+                pass
+        self._browsers = []
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+        logger.info("Pool de navegadores cerrado")
+
+    def __enter__(self) -> "BrowserPool":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,255 @@
+"""
+Registro normalizado de productos
+Los textos del grid ("12,50 €", "M · Muy bueno") se interpretan una sola vez
+al extraer el producto y se guardan junto a los campos numéricos (precio en
+céntimos, moneda, código de estado, talla normalizada), de modo que la
+aplicación web filtra y ordena comparando números en lugar de parsear textos
+"""
+
+import re
+import unicodedata
+from enum import IntEnum
+from typing import Dict, Optional, Tuple
+
+# Simbolos de las monedas habituales en Vinted
+CURRENCY_SYMBOLS = {
+    "EUR": "€",
+    "GBP": "£",
+    "PLN": "zł",
+    "CZK": "Kč",
+    "SEK": "kr",
+    "DKK": "kr",
+    "HUF": "Ft",
+    "RON": "lei",
+    "USD": "$",
+}
+
+# Símbolo -> moneda ("kr" es ambiguo: se toma la primera, SEK)
+SYMBOL_CURRENCIES = {}
+for _code, _symbol in CURRENCY_SYMBOLS.items():
+    SYMBOL_CURRENCIES.setdefault(_symbol, _code)
+
+# Importe con separadores de miles y decimales ("1.234,56", "12.5", "7")
+PRICE_NUMBER_PATTERN = re.compile(r"\d[\d.,\s  ]*")
+DECIMALS_PATTERN = re.compile(r"[.,](\d{1,2})$")
+
+# Separador entre talla y estado en el subtítulo de la tarjeta ("M · Muy bueno")
+SUBTITLE_SEPARATOR = "·"
+
+# Prefijos con los que Vinted muestra la talla en los distintos idiomas
+SIZE_PREFIX_PATTERN = re.compile(r"^(talla|size|taille|taglia|grosse)\s*:?\s*", re.IGNORECASE)
+ONE_SIZE_WORDS = ("unica", "one size", "unique", "einheitsgrosse")
+
+# Diacríticos que quedan separados tras la normalización NFKD
+COMBINING_MARKS = re.compile("[\u0300-\u036f]")
+
+
+def fold(text: str) -> str:
+    """Texto en minúsculas y sin acentos ("Muy Bueno" -> "muy bueno", "Größe" -> "grosse")"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", text.replace("ß", "ss")))
+
+
+class Condition(IntEnum):
+    """Estado del artículo, de mejor a peor (0 si no se conoce)"""
+
+    UNKNOWN = 0
+    NEW_WITH_TAGS = 1
+    NEW_WITHOUT_TAGS = 2
+    VERY_GOOD = 3
+    GOOD = 4
+    SATISFACTORY = 5
+
+    @classmethod
+    def parse(cls, text) -> "Condition":
+        """
+        Interpreta el estado tal y como lo muestra Vinted en cualquier idioma
+
+        Args:
+            text: Texto del estado ("Muy bueno", "New with tags", "Très bon état")
+
+        Returns:
+            Estado o Condition.UNKNOWN si no se reconoce
+        """
+        if not text:
+            return cls.UNKNOWN
+        folded = fold(str(text))
+        # El orden importa: "muy bueno" contiene "bueno", "sin etiquetas" va
+        # antes que el "nuevo" genérico
+        for condition, words in CONDITION_WORDS:
+            if any(word in folded for word in words):
+                return condition
+        return cls.UNKNOWN
+
+
+CONDITION_WORDS = (
+    (Condition.NEW_WITHOUT_TAGS, ("sin etiqueta", "without tag", "sans etiquette", "senza cartellino", "ohne etikett")),
+    (Condition.NEW_WITH_TAGS, ("con etiqueta", "with tag", "avec etiquette", "con cartellino", "mit etikett")),
+    (Condition.VERY_GOOD, ("muy bueno", "very good", "tres bon", "ottim", "sehr gut")),
+    (Condition.SATISFACTORY, ("satisfactori", "satisfactory", "satisfaisant", "discret", "zufriedenstellend")),
+    (Condition.GOOD, ("bueno", "good", "bon etat", "buon", "gut")),
+    (Condition.NEW_WITHOUT_TAGS, ("nuevo", "new", "neuf", "nuovo", "neu")),
+)
+
+# status_id de la API del catálogo
+CONDITION_STATUS_IDS = {
+    6: Condition.NEW_WITH_TAGS,
+    1: Condition.NEW_WITHOUT_TAGS,
+    2: Condition.VERY_GOOD,
+    3: Condition.GOOD,
+    4: Condition.SATISFACTORY,
+}
+
+
+def parse_price(text) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Interpreta un precio mostrado por Vinted
+
+    Args:
+        text: Precio como texto ("12,50 €", "£5.00", "1.234 Kč")
+
+    Returns:
+        Tupla (importe en céntimos, código de moneda); (None, None) si no
+        hay importe
+    """
+    if not text or text == "N/A":
+        return None, None
+    text = str(text)
+
+    match = PRICE_NUMBER_PATTERN.search(text)
+    if not match:
+        return None, None
+    digits = re.sub(r"[\s  ]", "", match.group(0)).rstrip(".,")
+
+    decimals = DECIMALS_PATTERN.search(digits)
+    if decimals:
+        whole, fraction = digits[:decimals.start()], decimals.group(1).ljust(2, "0")
+    else:
+        whole, fraction = digits, "00"
+    cents = int(re.sub(r"[.,]", "", whole) or 0) * 100 + int(fraction)
+
+    currency = None
+    rest = text[:match.start()] + " " + text[match.end():]
+    for code in CURRENCY_SYMBOLS:
+        if code in rest:
+            currency = code
+            break
+    else:
+        for symbol, code in SYMBOL_CURRENCIES.items():
+            if symbol in rest:
+                currency = code
+                break
+    return cents, currency
+
+
+def parse_size(text) -> Optional[str]:
+    """
+    Normaliza una talla para poder agruparla y filtrarla
+
+    Args:
+        text: Talla tal y como aparece ("Talla M", "m / 38 / 10", "Talla única")
+
+    Returns:
+        Talla normalizada ("M", "38", "ONE SIZE") o None si no hay talla
+    """
+    if not text or text == "N/A":
+        return None
+    label = SIZE_PREFIX_PATTERN.sub("", fold(str(text)).strip())
+    if any(word in label for word in ONE_SIZE_WORDS):
+        return "ONE SIZE"
+    # "M / 38 / 10": la primera equivalencia es la que muestra Vinted
+    label = label.split("/")[0].strip()
+    return label.upper() or None
+
+
+def split_subtitle(subtitle: str) -> Tuple[Optional[str], str]:
+    """
+    Separa la talla y el estado del subtítulo de la tarjeta
+
+    Args:
+        subtitle: Subtítulo ("M · Muy bueno" o solo "Muy bueno")
+
+    Returns:
+        Tupla (talla o None, estado)
+    """
+    if SUBTITLE_SEPARATOR not in subtitle:
+        return None, subtitle
+    parts = [part.strip() for part in subtitle.split(SUBTITLE_SEPARATOR) if part.strip()]
+    condition = next((part for part in parts if Condition.parse(part)), parts[-1] if parts else subtitle)
+    size = next((part for part in parts if part != condition), None)
+    return size, condition
+
+
+def normalize_product(product: Dict) -> Dict:
+    """
+    Añade (o recalcula) los campos normalizados de un producto
+
+    Se puede llamar varias veces: se usa al construir el producto y de nuevo
+    cuando el enriquecimiento completa la talla o el estado.
+
+    Args:
+        product: Diccionario de producto (se modifica)
+
+    Returns:
+        El mismo diccionario, con price_cents, currency, condition_code y
+        size_label
+    """
+    condition = product.get("condition") or "N/A"
+    size, condition = split_subtitle(condition)
+    product["condition"] = condition
+    if size and product.get("size", "N/A") == "N/A":
+        product["size"] = size
+
+    if product.get("price_cents") is None:
+        product["price_cents"], currency = parse_price(product.get("price"))
+        product["currency"] = product.get("currency") or currency or ("EUR" if product["price_cents"] is not None else None)
+    if not product.get("condition_code"):
+        product["condition_code"] = int(Condition.parse(condition))
+    product["size_label"] = parse_size(product.get("size"))
+    return product
+
+
+class Product:
+    """
+    Producto normalizado en memoria
+
+    Usa __slots__ para ocupar menos que un diccionario y guarda el precio
+    como entero en céntimos, así que comparar y ordenar no requiere parsear.
+    """
+
+    __slots__ = (
+        "item_id", "title", "price", "price_cents", "currency", "brand", "size",
+        "size_label", "condition", "condition_code", "product_url", "image_url",
+        "location", "seller", "description", "scraped_at",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Product":
+        """
+        Crea el producto a partir de su forma guardada
+
+        Los archivos anteriores a los campos normalizados se interpretan aquí,
+        una sola vez al cargarlos.
+        """
+        if "size_label" not in data or "condition_code" not in data:
+            data = normalize_product(dict(data))
+        product = cls(**data)
+        product.condition_code = Condition(product.condition_code or 0)
+        return product
+
+    @property
+    def price_value(self) -> Optional[float]:
+        """Precio en unidades de la moneda (12.5) o None si no se conoce"""
+        return self.price_cents / 100 if self.price_cents is not None else None
+
+    def to_dict(self) -> Dict:
+        """Forma guardada (y devuelta por la API) del producto"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["condition_code"] = int(self.condition_code or 0)
+        return data
@@ -0,0 +1,174 @@
+"""
+Checkpoints de trabajos de scraping
+Guarda por trabajo los productos extraídos y el cursor (profundidad de scroll
+o páginas ya recorridas) para que un reintento o un trabajo relanzado tras
+reiniciar el proceso continúe donde se quedó. El estado es un JSON pequeño
+que se reescribe entero; los productos van en un diario JSONL al que cada
+checkpoint solo añade los nuevos, así el coste no crece con lo ya extraído
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def write_json_atomic(path, data) -> None:
+    """
+    Escribe un JSON de forma atómica
+
+    Se escribe en un archivo temporal de la misma carpeta y se renombra sobre
+    el anterior, así un corte a mitad de escritura nunca deja el archivo a
+    medias.
+
+    Args:
+        path: Ruta del archivo
+        data: Datos serializables a JSON
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def job_id_para(url: str) -> str:
+    """ID estable de trabajo para una URL (la misma búsqueda reanuda su checkpoint)"""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """Almacén de checkpoints en archivos JSON, uno por trabajo"""
+
+    def __init__(self, directory="data/checkpoints"):
+        """
+        Inicializa el almacén
+
+        Args:
+            directory: Carpeta donde se guardan los checkpoints
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def _journal_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.jsonl"
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        """
+        Lee el checkpoint de un trabajo
+
+        Args:
+            job_id: ID del trabajo
+
+        Returns:
+            Estado guardado o None si no existe o no se puede leer
+        """
+        path = self._path(job_id)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Checkpoint {job_id} no válido, se ignora: {e}")
+            return None
+
+    def products(self, job_id: str, state: Dict) -> Iterator[Dict]:
+        """
+        Lee los productos guardados de un trabajo
+
+        Args:
+            job_id: ID del trabajo
+            state: Estado devuelto por load()
+
+        Yields:
+            Productos en el orden en que se extrajeron; se ignora lo añadido
+            al diario después del último estado guardado
+        """
+        # Checkpoints anteriores al diario: los productos van en el estado
+        yield from state.get("products", [])
+        yield from state.get("pending_sink", [])
+
+        size = state.get("journal_size", 0)
+        if not size:
+            return
+        try:
+            with open(self._journal_path(job_id), "rb") as f:
+                data = f.read(size)
+        except OSError as e:
+            logger.warning(f"Diario del checkpoint {job_id} no disponible: {e}")
+            return
+        for line in data.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+    def save(self, job_id: str, state: Dict, products: Iterable[Dict] = (), journal_size: int = 0) -> int:
+        """
+        Guarda el checkpoint de un trabajo
+
+        Los productos nuevos se añaden al diario (con fsync) y después se
+        escribe el estado de forma atómica con el tamaño del diario, así un
+        corte entre las dos escrituras deja el checkpoint anterior intacto.
+
+        Args:
+            job_id: ID del trabajo
+            state: Estado a guardar (url, product_count, cursor...)
+            products: Productos extraídos desde el checkpoint anterior
+            journal_size: Tamaño del diario en el checkpoint anterior (0 en
+                          un trabajo nuevo: se descarta el diario que hubiera)
+
+        Returns:
+            Tamaño del diario tras guardar, para el siguiente save()
+        """
+        journal = self._journal_path(job_id)
+        if not journal.exists():
+            journal_size = 0
+        with open(journal, "r+b" if journal_size else "wb") as f:
+            f.truncate(journal_size)
+            f.seek(journal_size)
+            for product in products:
+                f.write((json.dumps(product, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            journal_size = f.tell()
+
+        state = dict(state, job_id=job_id, journal_size=journal_size, updated_at=datetime.now().isoformat())
+        write_json_atomic(self._path(job_id), state)
+        return journal_size
+
+    def delete(self, job_id: str) -> None:
+        """Elimina el checkpoint de un trabajo terminado"""
+        for path in (self._path(job_id), self._journal_path(job_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def pending(self) -> List[Dict]:
+        """
+        Devuelve los checkpoints de trabajos sin terminar
+
+        Returns:
+            Lista de estados guardados, del más antiguo al más reciente
+        """
+        states = [self.load(path.stem) for path in self.directory.glob("*.json")]
+        return sorted((s for s in states if s), key=lambda s: s.get("updated_at", ""))
@@ -9,29 +9,272 @@ import time
 import random
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Callable
-from playwright.sync_api import sync_playwright, Page, Browser
+from urllib.parse import urlparse
+from typing import List, Dict, Callable, Iterable, Iterator, Optional, Tuple
+from playwright.sync_api import sync_playwright, Page, Browser, BrowserContext
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from extraccion import (
+    PRODUCT_SELECTOR,
+    CARD_SELECTORS,
+    TEXT_FIELDS,
+    DEFAULT_BASE_URL,
+    build_product,
+    product_key,
+)
+from catalogo_api import is_catalog_response, is_last_page, parse_catalog_response
+from politica_recursos import ResourcePolicy
+from pool_navegadores import BrowserPool
+from puntos_control import CheckpointStore, job_id_para
+from exportacion import JsonlSink
+from config_filtros import url_mas_recientes
+from limitador import RateLimiter
+from sesiones import SessionStore
+from almacenamiento import ProductStorage
+from enriquecimiento import DetailCache, run_enrichment
 import logging
+from contextlib import contextmanager
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Opciones de los contextos de navegador
+CONTEXT_OPTIONS = {
+    "viewport": {'width': 1920, 'height': 1080},
+    "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Botón de aceptar cookies
+COOKIE_BUTTON_SELECTOR = '[data-testid="cookie-accept"], .cookie-notice__button'
+
+# Atributos con los que se marcan en la página las tarjetas ya procesadas.
+# El valor es el href de la tarjeta, así un nodo reciclado por el grid
+# virtualizado con otro artículo vuelve a considerarse nuevo.
+SEEN_ATTRIBUTE = "data-vs-seen"
+PENDING_ATTRIBUTE = "data-vs-pending"
+
+# Devuelve las tarjetas no procesadas y las marca como vistas
+_UNSEEN_CARDS_JS = """
+const unseenCards = (productSelector, linkSelector, seenAttribute) =>
+    Array.from(document.querySelectorAll(productSelector)).filter(card => {
+        const link = card.querySelector(linkSelector);
+        const key = link ? (link.getAttribute('href') || '') : '';
+        if (card.getAttribute(seenAttribute) === key) {
+            return false;
+        }
+        card.setAttribute(seenAttribute, key);
+        return true;
+    });
+"""
+
+# Lee las tarjetas nuevas en el navegador y devuelve diccionarios planos,
+# evitando una ida y vuelta por el canal de Playwright por cada campo
+EXTRACT_CARDS_JS = """
+([productSelector, selectors, seenAttribute]) => {
+""" + _UNSEEN_CARDS_JS + """
+    const text = (card, selector) => {
+        const el = card.querySelector(selector);
+        return el ? el.innerText : null;
+    };
+    return unseenCards(productSelector, selectors.link, seenAttribute).map(card => {
+        const link = card.querySelector(selectors.link);
+        const img = card.querySelector(selectors.image);
+        return {
+            title: text(card, selectors.title),
+            condition: text(card, selectors.condition),
+            price: text(card, selectors.price),
+            location: text(card, selectors.location),
+            href: link ? link.getAttribute('href') : null,
+            image_src: img ? (img.getAttribute('src') || img.getAttribute('data-src')) : null,
+            image_alt: img ? img.getAttribute('alt') : null,
+        };
+    });
+}
+"""
+
+# Marca las tarjetas nuevas como pendientes para la extracción por elemento
+MARK_UNSEEN_CARDS_JS = """
+([productSelector, linkSelector, seenAttribute, pendingAttribute]) => {
+""" + _UNSEEN_CARDS_JS + """
+    document.querySelectorAll(`[${pendingAttribute}]`)
+        .forEach(card => card.removeAttribute(pendingAttribute));
+    const cards = unseenCards(productSelector, linkSelector, seenAttribute);
+    cards.forEach(card => card.setAttribute(pendingAttribute, ''));
+    return cards.length;
+}
+"""
+
+# Instala (una sola vez por página) un MutationObserver que cuenta los nodos
+# añadidos dentro de tarjetas del grid; devuelve el contador actual
+INSTALL_FEED_OBSERVER_JS = """
+(productSelector) => {
+    if (!window.__vsFeedObserver) {
+        window.__vsCardsAdded = 0;
+        window.__vsFeedObserver = new MutationObserver(mutations => {
+            for (const mutation of mutations) {
+                for (const node of mutation.addedNodes) {
+                    if (node.nodeType !== Node.ELEMENT_NODE) {
+                        continue;
+                    }
+                    if (node.closest(productSelector) || node.querySelector(productSelector)) {
+                        window.__vsCardsAdded += 1;
+                    }
+                }
+            }
+        });
+        window.__vsFeedObserver.observe(document.body, {childList: true, subtree: true});
+    }
+    return window.__vsCardsAdded;
+}
+"""
+
 
 class VintedScraper:
     """Scraper para extraer productos de Vinted.es"""
 
-    def __init__(self, max_products: int = 100, progress_callback: Callable = None):
+    def __init__(
+        self,
+        max_products: int = 100,
+        progress_callback: Callable = None,
+        extraction_mode: str = "batch",
+        wait_mode: str = "adaptive",
+        min_delay: float = 0.5,
+        max_wait: float = 8.0,
+        max_idle_scrolls: int = 3,
+        engine: str = "dom",
+        block_resources: bool = True,
+        resource_policy: Optional[ResourcePolicy] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        job_id: Optional[str] = None,
+        checkpoint_every: int = 25,
+        sink: Optional[JsonlSink] = None,
+        keep_products: bool = True,
+        enrich: bool = False,
+        enrich_concurrency: int = 4,
+        detail_cache: Optional[DetailCache] = None,
+        known_ids: Optional[Iterable] = None,
+        stop_after_known: int = 20,
+        rate_limiter: Optional[RateLimiter] = None,
+        session_store: Optional[SessionStore] = None,
+        storage: Optional[ProductStorage] = None,
+        storage_batch: int = 100
+    ):
         """
         Inicializa el scraper
 
         Args:
             max_products: Número máximo de productos a extraer
             progress_callback: Función callback para reportar progreso
+            extraction_mode: "batch" (un page.evaluate por scroll) o
+                             "element" (consultas por elemento)
+            wait_mode: "adaptive" (espera a que el grid añada tarjetas) o
+                       "fixed" (espera fija de 2-4 s por scroll)
+            min_delay: Espera mínima entre scrolls en modo adaptativo (se
+                       aplica con un jitter de hasta el doble)
+            max_wait: Segundos máximos de espera por scroll en modo adaptativo
+            max_idle_scrolls: Scrolls seguidos sin tarjetas nuevas antes de
+                              dar el feed por terminado en modo adaptativo
+            engine: "dom" (lee las tarjetas del grid) o "api" (lee el JSON
+                    del catálogo que descarga la página, con el DOM como
+                    respaldo para los productos que no lleguen por la API)
+            block_resources: Bloquear imágenes, fuentes, vídeo y trackers
+            resource_policy: Política de bloqueo personalizada (por defecto
+                             ResourcePolicy() si block_resources es True)
+            browser_pool: Pool de navegadores compartido; si no se indica se
+                          lanza un Chromium propio en cada intento
+            checkpoint_store: Almacén de checkpoints; si se indica, scrape()
+                              reanuda el trabajo guardado para la URL y va
+                              guardando el progreso
+            job_id: ID del trabajo en el almacén (por defecto derivado de la URL)
+            checkpoint_every: Productos nuevos entre checkpoints
+            sink: Destino en streaming; cada producto nuevo se escribe en
+                  cuanto se extrae (el llamador lo cierra con close())
+            keep_products: Guardar también los productos en self.products;
+                           con False (requiere sink) la memoria no crece con
+                           el número de productos
+            enrich: Visitar la página de detalle de cada producto para
+                    completar marca, talla, ubicación, descripción y vendedor
+                    (con un sink, los productos se escriben ya enriquecidos)
+            enrich_concurrency: Páginas de detalle abiertas a la vez
+            detail_cache: Caché de detalles (por defecto DetailCache())
+            known_ids: Modo incremental: IDs ya guardados en ejecuciones
+                       anteriores. Se fuerza el orden "más recientes primero",
+                       los productos conocidos no se añaden y el scroll (o la
+                       paginación) se detiene tras stop_after_known seguidos
+            stop_after_known: Productos conocidos seguidos que indican que ya
+                              se ha alcanzado lo extraído la vez anterior
+            rate_limiter: Limitador de peticiones compartido; cada navegación
+                          y cada scroll esperan su turno y las respuestas
+                          429/403 reducen el ritmo del host
+            session_store: Sesiones guardadas por dominio; con una sesión
+                           vigente se omiten la espera inicial y el aviso de
+                           cookies
+            storage: Almacenamiento (p. ej. SQLite) donde se hace upsert de
+                     los productos por ID a medida que se extraen
+            storage_batch: Productos por escritura en el almacenamiento
         """
+        if extraction_mode not in ("batch", "element"):
+            raise ValueError(f"Modo de extracción no válido: {extraction_mode}")
+        if wait_mode not in ("adaptive", "fixed"):
+            raise ValueError(f"Modo de espera no válido: {wait_mode}")
+        if engine not in ("dom", "api"):
+            raise ValueError(f"Motor de extracción no válido: {engine}")
+        if not keep_products and sink is None:
+            raise ValueError("keep_products=False requiere un sink")
+
         self.max_products = max_products
         self.progress_callback = progress_callback
+        self.extraction_mode = extraction_mode
+        self.wait_mode = wait_mode
+        self.min_delay = min_delay
+        self.max_wait = max_wait
+        self.max_idle_scrolls = max_idle_scrolls
+        self.engine = engine
+        self.base_url = DEFAULT_BASE_URL
+        if resource_policy is None and block_resources:
+            resource_policy = ResourcePolicy()
+        self.resource_policy = resource_policy
+        self.browser_pool = browser_pool
         self.products: List[Dict] = []
+        self.product_count = 0
+        self.sink = sink
+        self.keep_products = keep_products
+        self._last_item_id = None
+        self.enrich = enrich
+        self.enrich_concurrency = enrich_concurrency
+        if enrich and detail_cache is None:
+            detail_cache = DetailCache()
+        self.detail_cache = detail_cache
+        # Productos que esperan al enriquecimiento para escribirse en el sink
+        self._pending_sink: List[Dict] = []
+        self.known_ids = set(known_ids) if known_ids is not None else None
+        self.stop_after_known = stop_after_known
+        self._known_streak = 0
+        self.rate_limiter = rate_limiter
+        self.session_store = session_store
+        self.storage = storage
+        self.storage_batch = storage_batch
+        self._pending_storage: List[Dict] = []
+        # Índice de deduplicación: IDs de Vinted (o URLs sin ID) ya extraídos
+        self._seen_ids: set = set()
+        # Productos recibidos por la API del catálogo pendientes de añadir
+        self._api_products: List[Dict] = []
+        self._feed_exhausted = False
+        self.checkpoint_store = checkpoint_store
+        self.job_id = job_id
+        self.checkpoint_every = checkpoint_every
+        # Posición alcanzada en la URL actual: {"scroll_height": ...} en
+        # modo scroll o {"pages_done": [...]} en modo por páginas
+        self._cursor: Dict = {}
+        self._checkpointed = 0
+        # Productos aún no añadidos al diario del checkpoint y tamaño del diario
+        self._unjournaled: List[Dict] = []
+        self._journal_size = 0
+        self._job_id = None
+        self._url = None
+        # Metadata del último save_to_json
+        self.metadata: Dict = {}
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
 
@@ -46,10 +289,17 @@ class VintedScraper:
             self.progress_callback(current, total, message)
         logger.info(f"Progreso: {current}/{total} - {message}")
 
+    def _build_product(self, raw: Dict) -> Dict:
+        """Construye el diccionario del producto con el dominio de la URL scrapeada"""
+        return build_product(raw, self.base_url)
+
     def _extract_product_data(self, product_element) -> Dict:
         """
         Extrae datos de un elemento de producto usando selectores específicos de Vinted
 
+        Hace una consulta por campo sobre el canal de Playwright; para
+        extraer muchas tarjetas es preferible _extract_products_batch.
+
         Args:
             product_element: Elemento HTML del producto
 
@@ -57,86 +307,370 @@ class VintedScraper:
             Diccionario con los datos del producto
         """
         try:
-            # Extraer título (data-testid="*-description-title")
-            title = "N/A"
-            title_elem = product_element.query_selector('p[data-testid*="description-title"]')
-            if title_elem:
-                title = title_elem.inner_text().strip()
-
-            # Extraer condición/estado (data-testid="*-description-subtitle")
-            condition = "N/A"
-            condition_elem = product_element.query_selector('p[data-testid*="description-subtitle"]')
-            if condition_elem:
-                condition = condition_elem.inner_text().strip()
-
-            # Extraer precio (data-testid="*-price-text")
-            price = "N/A"
-            price_elem = product_element.query_selector('p[data-testid*="price-text"]')
-            if price_elem:
-                price = price_elem.inner_text().strip()
-
-            # Extraer URL del producto (data-testid="*-overlay-link")
-            product_url = ""
-            link_elem = product_element.query_selector('a[data-testid*="overlay-link"]')
-            if link_elem:
-                href = link_elem.get_attribute('href')
-                if href:
-                    product_url = href if href.startswith('http') else f"https://www.vinted.es{href}"
+            raw = {}
 
-            # Extraer URL de la imagen (data-testid="*-image--img")
-            image_url = "N/A"
-            img_elem = product_element.query_selector('img[data-testid*="image--img"]')
-            if img_elem:
-                src = img_elem.get_attribute('src') or img_elem.get_attribute('data-src')
-                if src:
-                    image_url = src
+            # Título, condición, precio y ubicación (textos)
+            for key in TEXT_FIELDS:
+                elem = product_element.query_selector(CARD_SELECTORS[key])
+                if elem:
+                    raw[key] = elem.inner_text()
 
-            # Marca y talla: Vinted no siempre muestra estos datos en el grid
-            # Intentar extraer del texto alt de la imagen
-            brand = "N/A"
-            size = "N/A"
+            # URL del producto (data-testid="*-overlay-link")
+            link_elem = product_element.query_selector(CARD_SELECTORS["link"])
+            if link_elem:
+                raw["href"] = link_elem.get_attribute('href')
 
+            # Imagen (data-testid="*-image--img")
+            img_elem = product_element.query_selector(CARD_SELECTORS["image"])
             if img_elem:
-                alt_text = img_elem.get_attribute('alt')
-                if alt_text:
-                    # El alt puede contener info adicional
-                    # Ejemplo: "Producto marca, talla M, estado: Nuevo, 10€"
-                    parts = alt_text.split(',')
-                    if len(parts) > 2:
-                        # Intentar extraer talla
-                        for part in parts:
-                            if 'talla' in part.lower() or 'size' in part.lower():
-                                size = part.strip()
-                                break
-
-            # Ubicación del vendedor (buscar en metadatos del item)
-            location = "N/A"
-            location_elem = product_element.query_selector('[class*="location"], [class*="user-location"]')
-            if location_elem:
-                location = location_elem.inner_text().strip()
-
-            # Si no encontramos ubicación, buscar en el contenedor completo
-            if location == "N/A":
-                all_text = product_element.inner_text()
-                # Buscar patrones comunes de ubicación (ciudades)
-                # Esto es opcional y puede mejorarse
-
-            return {
-                "title": title,
-                "price": price,
-                "brand": brand,
-                "size": size,
-                "condition": condition,
-                "product_url": product_url,
-                "image_url": image_url,
-                "location": location,
-                "scraped_at": datetime.now().isoformat()
-            }
+                raw["image_src"] = img_elem.get_attribute('src') or img_elem.get_attribute('data-src')
+                raw["image_alt"] = img_elem.get_attribute('alt')
+
+            return self._build_product(raw)
 
         except Exception as e:
             logger.error(f"Error extrayendo datos del producto: {e}")
             return None
 
+    def _query_unseen_elements(self, page: Page) -> List:
+        """
+        Obtiene los elementos de las tarjetas que aún no se han procesado
+
+        Args:
+            page: Página de Playwright
+
+        Returns:
+            Lista de elementos de producto nuevos
+        """
+        pending = page.evaluate(
+            MARK_UNSEEN_CARDS_JS,
+            [PRODUCT_SELECTOR, CARD_SELECTORS["link"], SEEN_ATTRIBUTE, PENDING_ATTRIBUTE]
+        )
+        if not pending:
+            return []
+        return page.query_selector_all(f"[{PENDING_ATTRIBUTE}]")
+
+    def _extract_products_batch(self, page: Page) -> List[Dict]:
+        """
+        Extrae las tarjetas nuevas del grid en una sola llamada a page.evaluate
+
+        Args:
+            page: Página de Playwright
+
+        Returns:
+            Lista de diccionarios con los datos de los productos
+        """
+        try:
+            raw_items = page.evaluate(EXTRACT_CARDS_JS, [PRODUCT_SELECTOR, CARD_SELECTORS, SEEN_ATTRIBUTE])
+        except Exception as e:
+            logger.error(f"Error extrayendo productos en lote: {e}")
+            return []
+
+        return [self._build_product(raw) for raw in raw_items]
+
+    def _add_product(self, product_data: Dict, restored: bool = False) -> bool:
+        """
+        Añade un producto si no se había extraído antes
+
+        Args:
+            product_data: Diccionario con los datos del producto
+            restored: Viene de un checkpoint (ya está en su diario y, salvo
+                      con enrich, en el almacenamiento). Se vuelve a enviar
+                      al sink, que descarta los que ya tiene si reanuda su .part
+
+        Returns:
+            True si se añadió, False si era un duplicado
+        """
+        key = product_key(product_data)
+        if key:
+            if key in self._seen_ids:
+                return False
+            self._seen_ids.add(key)
+
+        self.product_count += 1
+        self._last_item_id = product_data.get("item_id")
+        if self.keep_products:
+            self.products.append(product_data)
+        if self.checkpoint_store and not restored:
+            self._unjournaled.append(product_data)
+        if self.sink:
+            if self.enrich:
+                self._pending_sink.append(product_data)
+            else:
+                self.sink.write(product_data)
+        # Los restaurados de un checkpoint ya se guardaron, salvo si esperaban
+        # al enriquecimiento
+        if self.storage is not None and (not restored or self.enrich):
+            self._pending_storage.append(product_data)
+            self._store_products()
+        return True
+
+    def _store_products(self, force: bool = False) -> None:
+        """
+        Escribe en el almacenamiento los productos pendientes (upsert por ID)
+
+        Args:
+            force: Escribirlos aunque no se haya completado el lote (con
+                   enrich solo se fuerzan al final, ya enriquecidos)
+        """
+        if self.storage is None or not self._pending_storage:
+            return
+        if not force and (self.enrich or len(self._pending_storage) < self.storage_batch):
+            return
+        try:
+            self.storage.upsert(self._pending_storage)
+            self._pending_storage = []
+        except Exception as e:
+            logger.warning(f"No se pudieron guardar {len(self._pending_storage)} productos en el almacenamiento: {e}")
+
+    def _flush_pending_sink(self) -> None:
+        """Escribe en el sink los productos retenidos para el enriquecimiento"""
+        if self.sink:
+            for product_data in self._pending_sink:
+                self.sink.write(product_data)
+        self._pending_sink = []
+
+    def _enrichment_targets(self) -> List[Dict]:
+        """Productos de esta ejecución sobre los que aplicar el enriquecimiento"""
+        return self.products if self.keep_products else self._pending_sink
+
+    def _enrich_products(self) -> None:
+        """Completa los productos con su página de detalle (si enrich está activo)"""
+        if not self.enrich:
+            return
+        try:
+            run_enrichment(
+                self._enrichment_targets(),
+                browser_pool=self.browser_pool,
+                concurrency=self.enrich_concurrency,
+                rate_limiter=self.rate_limiter,
+                cache=self.detail_cache,
+                block_resources=self.resource_policy is not None,
+                progress_callback=self.progress_callback
+            )
+        except Exception as e:
+            logger.warning(f"Error en el enriquecimiento, se guardan los datos del grid: {e}")
+        self._flush_pending_sink()
+
+    def _restore_checkpoint(self, url: str) -> None:
+        """
+        Carga el checkpoint del trabajo, si existe, antes de empezar
+
+        Args:
+            url: URL del trabajo
+        """
+        self._url = url
+        self._cursor = {}
+        self._job_id = None
+        self._unjournaled = []
+        self._journal_size = 0
+        if not self.checkpoint_store:
+            return
+
+        self._job_id = self.job_id or job_id_para(url)
+        state = self.checkpoint_store.load(self._job_id)
+        if not state or state.get("url") != url:
+            return
+
+        # Con enrich los productos del checkpoint aún no se habían escrito
+        legacy = "journal_size" not in state
+        for product_data in self.checkpoint_store.products(self._job_id, state):
+            if self._add_product(product_data, restored=True) and legacy:
+                # Checkpoint sin diario: se pasan al diario en el siguiente
+                self._unjournaled.append(product_data)
+        self._journal_size = state.get("journal_size", 0)
+        self.product_count = max(self.product_count, state.get("product_count", 0))
+        self._cursor = state.get("cursor") or {}
+        self._checkpointed = self.product_count
+        logger.info(f"Reanudando trabajo {self._job_id}: {self.product_count} productos, cursor {self._cursor}")
+
+    def _save_checkpoint(self, force: bool = False) -> None:
+        """
+        Guarda el progreso del trabajo cada checkpoint_every productos nuevos
+
+        Args:
+            force: Guardar aunque no se haya llegado al intervalo
+        """
+        if not self.checkpoint_store or not self._job_id:
+            return
+        if not force and self.product_count - self._checkpointed < self.checkpoint_every:
+            return
+
+        try:
+            # El checkpoint no debe adelantarse a lo que ya está en disco
+            if self.sink:
+                self.sink.flush(sync=True)
+            if not self.enrich:
+                self._store_products(force=True)
+            # Solo se escriben los productos nuevos (al diario) y el estado
+            self._journal_size = self.checkpoint_store.save(self._job_id, {
+                "url": self._url,
+                "max_products": self.max_products,
+                "incremental": self.known_ids is not None,
+                "enrich": self.enrich,
+                "product_count": self.product_count,
+                "cursor": self._cursor,
+                "last_item_id": self._last_item_id,
+            }, products=self._unjournaled, journal_size=self._journal_size)
+            self._unjournaled = []
+            self._checkpointed = self.product_count
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el checkpoint {self._job_id}: {e}")
+
+    def _finish_checkpoint(self) -> None:
+        """Elimina el checkpoint de un trabajo completado"""
+        if self.checkpoint_store and self._job_id:
+            self.checkpoint_store.delete(self._job_id)
+
+    def _on_catalog_response(self, response) -> None:
+        """
+        Recoge los items de las respuestas JSON del catálogo (motor "api")
+
+        Args:
+            response: Respuesta de Playwright
+        """
+        if not is_catalog_response(response.url) or not response.ok:
+            return
+
+        try:
+            payload = response.json()
+        except Exception as e:
+            logger.warning(f"Respuesta del catálogo no válida: {e}")
+            return
+
+        self._handle_catalog_payload(payload)
+
+    def _handle_catalog_payload(self, payload: Dict) -> None:
+        """Encola los productos de una respuesta del catálogo"""
+        self._api_products.extend(parse_catalog_response(payload, self.base_url))
+        if is_last_page(payload):
+            self._feed_exhausted = True
+
+    def _throttle(self, url: Optional[str] = None) -> None:
+        """Espera el turno del limitador compartido antes de una petición a Vinted"""
+        if self.rate_limiter:
+            self.rate_limiter.wait(url or self.base_url)
+
+    def _remaining_delay(self, started: float) -> float:
+        """Segundos que faltan para cumplir la espera mínima aleatoria entre scrolls"""
+        return random.uniform(self.min_delay, self.min_delay * 2) - (time.monotonic() - started)
+
+    def _wait_for_new_cards(self, page: Page, cards_added: int) -> Tuple[int, bool]:
+        """
+        Espera a que el grid añada tarjetas después de un scroll
+
+        Args:
+            page: Página de Playwright
+            cards_added: Valor del contador del MutationObserver antes del scroll
+
+        Returns:
+            Tupla (nuevo valor del contador, True si llegaron tarjetas a tiempo)
+        """
+        started = time.monotonic()
+        try:
+            page.wait_for_function(
+                "n => window.__vsCardsAdded > n",
+                arg=cards_added,
+                timeout=self.max_wait * 1000
+            )
+            loaded = True
+        except PlaywrightTimeoutError:
+            loaded = False
+
+        # Mantener una espera mínima aleatoria entre scrolls
+        remaining = self._remaining_delay(started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+        return page.evaluate("window.__vsCardsAdded"), loaded
+
+    def _extract_visible_products(self, page: Page, target_products: int) -> int:
+        """
+        Extrae las tarjetas nuevas de la página
+
+        Args:
+            page: Página de Playwright
+            target_products: Número objetivo de productos a cargar
+
+        Returns:
+            Número de productos añadidos
+        """
+        # Con el motor "api" se usan los items del JSON del catálogo; el DOM
+        # solo se consulta si no ha llegado ninguna respuesta nueva
+        if self.engine == "api" and self._api_products:
+            new_products, self._api_products = self._api_products, []
+        # Extraer solo las tarjetas que no se habían procesado
+        elif self.extraction_mode == "batch":
+            new_products = self._extract_products_batch(page)
+        else:
+            new_products = (
+                self._extract_product_data(elem)
+                for elem in self._query_unseen_elements(page)
+            )
+
+        return self._add_new_products(new_products, target_products)
+
+    def _add_new_products(self, new_products: Iterable[Dict], target_products: int) -> int:
+        """
+        Añade los productos nuevos hasta alcanzar el objetivo
+
+        Args:
+            new_products: Productos extraídos en este paso
+            target_products: Número objetivo de productos a cargar
+
+        Returns:
+            Número de productos añadidos
+        """
+        added = 0
+        for product_data in new_products:
+            if self.product_count >= target_products:
+                break
+
+            if self.known_ids is not None and product_data:
+                if product_key(product_data) in self.known_ids:
+                    self._known_streak += 1
+                    if self._known_streak >= self.stop_after_known:
+                        logger.info(f"{self._known_streak} productos conocidos seguidos: no hay más novedades")
+                        self._feed_exhausted = True
+                        break
+                    continue
+                self._known_streak = 0
+
+            if product_data and self._add_product(product_data):
+                added += 1
+                self._report_progress(
+                    self.product_count,
+                    target_products,
+                    f"Extraído: {product_data['title'][:50]}"
+                )
+
+        if added:
+            self._save_checkpoint()
+        return added
+
+    def _fast_forward(self, page: Page, target_height: int) -> None:
+        """
+        Recupera la profundidad de scroll de un checkpoint sin extraer productos
+
+        Args:
+            page: Página de Playwright
+            target_height: scrollHeight alcanzado antes del corte
+        """
+        logger.info(f"Avanzando hasta la posición guardada ({target_height}px)...")
+        height = page.evaluate("document.body.scrollHeight")
+        while height < target_height:
+            self._throttle()
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            try:
+                page.wait_for_function(
+                    "h => document.body.scrollHeight > h",
+                    arg=height,
+                    timeout=self.max_wait * 1000
+                )
+            except PlaywrightTimeoutError:
+                break
+            height = page.evaluate("document.body.scrollHeight")
+
     def _scroll_and_load(self, page: Page, target_products: int) -> None:
         """
         Hace scroll para cargar más productos
@@ -145,45 +679,96 @@ class VintedScraper:
             page: Página de Playwright
             target_products: Número objetivo de productos a cargar
         """
+        adaptive = self.wait_mode == "adaptive"
         last_height = page.evaluate("document.body.scrollHeight")
         scroll_attempts = 0
-        max_scroll_attempts = 50
 
-        while len(self.products) < target_products and scroll_attempts < max_scroll_attempts:
-            # Scroll hacia abajo
+        if adaptive:
+            max_scroll_attempts = self.max_idle_scrolls
+            cards_added = page.evaluate(INSTALL_FEED_OBSERVER_JS, PRODUCT_SELECTOR)
+            # Tarjetas ya presentes antes del primer scroll
+            self._extract_visible_products(page, target_products)
+        else:
+            max_scroll_attempts = 50
+
+        while (self.product_count < target_products
+               and scroll_attempts < max_scroll_attempts
+               and not self._feed_exhausted):
+            # Scroll hacia abajo (cada scroll pide una página más del feed)
+            self._throttle()
             page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
 
             # Esperar a que se carguen nuevos productos
-            self._random_delay(2, 4)
+            loaded = False
+            if adaptive:
+                cards_added, loaded = self._wait_for_new_cards(page, cards_added)
+            else:
+                self._random_delay(2, 4)
 
             # Calcular nueva altura
             new_height = page.evaluate("document.body.scrollHeight")
 
-            # Extraer productos visibles
-            product_elements = page.query_selector_all('.feed-grid__item, [data-testid="item-box"]')
-
-            for elem in product_elements[len(self.products):]:
-                if len(self.products) >= target_products:
-                    break
-
-                product_data = self._extract_product_data(elem)
-                if product_data and product_data not in self.products:
-                    self.products.append(product_data)
-                    self._report_progress(
-                        len(self.products),
-                        target_products,
-                        f"Extraído: {product_data['title'][:50]}"
-                    )
+            added = self._extract_visible_products(page, target_products)
+            # Todo lo que hay por encima de esta altura ya se ha extraído
+            self._cursor["scroll_height"] = max(new_height, self._cursor.get("scroll_height", 0))
 
             # Verificar si se llegó al final
-            if new_height == last_height:
+            if new_height == last_height and not loaded and not added:
                 scroll_attempts += 1
                 logger.info(f"Sin nuevos productos. Intento {scroll_attempts}/{max_scroll_attempts}")
+                if adaptive:
+                    # Subir una pantalla para que el scroll siguiente vuelva
+                    # a disparar la carga perezosa del feed
+                    page.evaluate("window.scrollBy(0, -window.innerHeight)")
             else:
                 scroll_attempts = 0
 
             last_height = new_height
 
+    def _log_resource_stats(self) -> None:
+        """Informa de las peticiones y bytes ahorrados por la política de recursos"""
+        if not self.resource_policy:
+            return
+        stats = self.resource_policy.stats()
+        logger.info(
+            f"Recursos bloqueados: {stats['blocked']}/{stats['requests']} peticiones, "
+            f"~{stats['bytes_saved_estimate'] / 1024:.0f} KB ahorrados {stats['blocked_by_type']}"
+        )
+
+    def _load_session(self, url: str) -> Optional[Dict]:
+        """Sesión guardada (storage_state) del dominio de la URL, si hay una vigente"""
+        return self.session_store.load(url) if self.session_store else None
+
+    @contextmanager
+    def _browser_context(self, storage_state: Optional[Dict] = None) -> Iterator[BrowserContext]:
+        """
+        Abre un contexto de navegador, del pool si hay uno configurado
+
+        Args:
+            storage_state: Sesión (cookies y localStorage) con la que abrirlo
+
+        Yields:
+            Contexto de Playwright, que se cierra (junto con el navegador
+            propio, si no se usa pool) al salir del bloque
+        """
+        options = dict(CONTEXT_OPTIONS)
+        if storage_state:
+            options["storage_state"] = storage_state
+
+        if self.browser_pool:
+            with self.browser_pool.context(**options) as context:
+                yield context
+            return
+
+        with sync_playwright() as p:
+            # Lanzar navegador
+            browser: Browser = p.chromium.launch(headless=True)
+            try:
+                yield browser.new_context(**options)
+            finally:
+                # Cerrar navegador
+                browser.close()
+
     def scrape(self, url: str = "https://www.vinted.es/catalog", retries: int = 3) -> List[Dict]:
         """
         Ejecuta el scraping de Vinted
@@ -195,48 +780,85 @@ class VintedScraper:
         Returns:
             Lista de productos extraídos
         """
+        # El checkpoint va con la URL pedida (de ella sale el job_id), no con
+        # la ordenada por novedades del modo incremental
+        self._restore_checkpoint(url)
+        if self.known_ids is not None:
+            url = url_mas_recientes(url)
+            self._known_streak = 0
+        parsed_url = urlparse(url)
+        self.base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        if self.resource_policy:
+            self.resource_policy.reset()
+
         for attempt in range(retries):
+            # Se asigna antes del try: el manejo de errores la consulta
+            session = None
             try:
                 logger.info(f"Iniciando scraping (intento {attempt + 1}/{retries})...")
-                self._report_progress(0, self.max_products, "Iniciando navegador...")
-
-                with sync_playwright() as p:
-                    # Lanzar navegador
-                    browser: Browser = p.chromium.launch(headless=True)
-                    context = browser.new_context(
-                        viewport={'width': 1920, 'height': 1080},
-                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    )
+                self._report_progress(self.product_count, self.max_products, "Iniciando navegador...")
+                self._api_products = []
+                self._feed_exhausted = False
+                session = self._load_session(url)
+
+                with self._browser_context(session) as context:
+                    if self.resource_policy:
+                        context.route("**/*", self.resource_policy.handle_route)
                     page: Page = context.new_page()
+                    if self.engine == "api":
+                        page.on("response", self._on_catalog_response)
+                    if self.rate_limiter:
+                        page.on("response", self.rate_limiter.on_response)
 
                     # Navegar a la página
-                    self._report_progress(0, self.max_products, "Cargando página...")
-                    page.goto(url, wait_until='networkidle', timeout=60000)
-
-                    # Esperar a que carguen los productos
-                    self._random_delay(3, 5)
-
-                    # Cerrar popups/cookies si existen
-                    try:
-                        cookie_button = page.query_selector('[data-testid="cookie-accept"], .cookie-notice__button')
-                        if cookie_button:
-                            cookie_button.click()
-                            self._random_delay(1, 2)
-                    except:
-                        pass
+                    self._report_progress(self.product_count, self.max_products, "Cargando página...")
+                    self._throttle(url)
+                    if session:
+                        # Sesión guardada con las cookies ya aceptadas: basta
+                        # con esperar a que aparezca el grid
+                        page.goto(url, wait_until='domcontentloaded', timeout=60000)
+                        page.wait_for_selector(PRODUCT_SELECTOR, timeout=self.max_wait * 1000)
+                    else:
+                        page.goto(url, wait_until='networkidle', timeout=60000)
+
+                        # Esperar a que carguen los productos
+                        self._random_delay(3, 5)
+
+                        # Cerrar popups/cookies si existen
+                        try:
+                            cookie_button = page.query_selector(COOKIE_BUTTON_SELECTOR)
+                            if cookie_button:
+                                cookie_button.click()
+                                self._random_delay(1, 2)
+                        except:
+                            pass
+
+                    # Volver a la profundidad alcanzada en el intento anterior
+                    # o antes del reinicio
+                    if self._cursor.get("scroll_height"):
+                        self._fast_forward(page, self._cursor["scroll_height"])
 
                     # Hacer scroll y extraer productos
-                    self._report_progress(0, self.max_products, "Extrayendo productos...")
+                    self._report_progress(self.product_count, self.max_products, "Extrayendo productos...")
                     self._scroll_and_load(page, self.max_products)
 
-                    # Cerrar navegador
-                    browser.close()
+                    # Guardar (o renovar) la sesión para los siguientes trabajos
+                    if self.session_store:
+                        self.session_store.save(url, context.storage_state())
 
-                logger.info(f"Scraping completado. {len(self.products)} productos extraídos.")
+                self._enrich_products()
+                self._store_products(force=True)
+                logger.info(f"Scraping completado. {self.product_count} productos extraídos.")
+                self._log_resource_stats()
+                self._finish_checkpoint()
                 return self.products
 
             except Exception as e:
                 logger.error(f"Error en intento {attempt + 1}: {e}")
+                self._save_checkpoint(force=True)
+                if session:
+                    # El siguiente intento hace la visita completa
+                    self.session_store.invalidate(url)
                 if attempt == retries - 1:
                     logger.error("Todos los reintentos fallaron")
                     raise
@@ -244,24 +866,28 @@ class VintedScraper:
 
         return self.products
 
-    def save_to_json(self, filename: str = "productos.json") -> str:
+    def save_to_json(self, filename: str = "productos.json", extra_metadata: Optional[Dict] = None) -> str:
         """
         Guarda los productos en formato JSON
 
         Args:
             filename: Nombre del archivo
+            extra_metadata: Campos adicionales para la sección metadata
 
         Returns:
             Ruta del archivo guardado
         """
         filepath = self.data_dir / filename
 
+        self.metadata = {
+            # Sin keep_products los productos solo están en el sink
+            "total_products": len(self.products) if self.keep_products else self.product_count,
+            "scraped_at": datetime.now().isoformat(),
+            "source": "vinted.es",
+            **(extra_metadata or {})
+        }
         data = {
-            "metadata": {
-                "total_products": len(self.products),
-                "scraped_at": datetime.now().isoformat(),
-                "source": "vinted.es"
-            },
+            "metadata": self.metadata,
             "products": self.products
         }
 
@@ -290,7 +916,7 @@ class VintedScraper:
         fieldnames = self.products[0].keys()
 
         with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
             writer.writeheader()
             writer.writerows(self.products)
 
@@ -0,0 +1,567 @@
+"""
+Vinted.es Web Scraper asíncrono
+Versión de VintedScraper sobre playwright.async_api que recorre varias URLs
+de catálogo a la vez desde un único navegador y un único bucle de eventos
+"""
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from catalogo_api import is_catalog_response
+from extraccion import EMPTY_CATALOG_SELECTOR
+from enriquecimiento import enrich_products
+from config_filtros import url_pagina, url_mas_recientes
+from politica_recursos import ResourcePolicy
+from scraper import (
+    VintedScraper,
+    logger,
+    CONTEXT_OPTIONS,
+    COOKIE_BUTTON_SELECTOR,
+    PRODUCT_SELECTOR,
+    CARD_SELECTORS,
+    SEEN_ATTRIBUTE,
+    EXTRACT_CARDS_JS,
+    INSTALL_FEED_OBSERVER_JS,
+)
+
+
+class AsyncVintedScraper(VintedScraper):
+    """
+    Scraper asíncrono para Vinted.es
+
+    Produce los mismos diccionarios de producto que VintedScraper. Solo
+    admite la extracción en lote (extraction_mode="batch").
+    """
+
+    def __init__(
+        self,
+        max_products: int = 100,
+        concurrency: int = 4,
+        per_domain_concurrency: Optional[int] = None,
+        browser: Optional[Browser] = None,
+        pagination: str = "scroll",
+        per_page: Optional[int] = 96,
+        page_concurrency: int = 3,
+        max_pages: Optional[int] = None,
+        **kwargs
+    ):
+        """
+        Inicializa el scraper
+
+        Args:
+            max_products: Número máximo de productos a extraer por URL
+            concurrency: Páginas simultáneas en scrape_many
+            per_domain_concurrency: Páginas simultáneas por dominio
+                                    (vinted.es, vinted.fr...) en scrape_many
+            browser: Navegador asíncrono compartido; si no se indica cada
+                     scrape() lanza el suyo
+            pagination: "scroll" (scroll infinito) o "pages" (pide las
+                        páginas del catálogo por ?page=N en paralelo)
+            per_page: Productos por página en modo "pages" (None para el
+                      valor por defecto de Vinted)
+            page_concurrency: Páginas del catálogo simultáneas por URL en
+                              modo "pages"
+            max_pages: Límite de páginas por URL en modo "pages"
+            **kwargs: Resto de opciones de VintedScraper
+        """
+        if kwargs.get("extraction_mode", "batch") != "batch":
+            raise ValueError("AsyncVintedScraper solo admite extraction_mode='batch'")
+        if kwargs.get("browser_pool") is not None:
+            raise ValueError("AsyncVintedScraper no usa browser_pool; indica browser")
+        if pagination not in ("scroll", "pages"):
+            raise ValueError(f"pagination no válido: {pagination}")
+
+        super().__init__(max_products=max_products, **kwargs)
+        self.concurrency = concurrency
+        self.per_domain_concurrency = per_domain_concurrency or concurrency
+        self.browser = browser
+        self.pagination = pagination
+        self.per_page = per_page
+        self.page_concurrency = page_concurrency
+        self.max_pages = max_pages
+        self._options = dict(
+            kwargs,
+            max_products=max_products,
+            pagination=pagination,
+            per_page=per_page,
+            page_concurrency=page_concurrency,
+            max_pages=max_pages
+        )
+
+    async def _random_delay(self, min_seconds: float = 1.0, max_seconds: float = 3.0):
+        """Añade un delay aleatorio sin bloquear el bucle de eventos"""
+        await asyncio.sleep(random.uniform(min_seconds, max_seconds))
+
+    async def _on_catalog_response(self, response) -> None:
+        """Recoge los items de las respuestas JSON del catálogo (motor "api")"""
+        if not is_catalog_response(response.url) or not response.ok:
+            return
+
+        try:
+            payload = await response.json()
+        except Exception as e:
+            logger.warning(f"Respuesta del catálogo no válida: {e}")
+            return
+
+        self._handle_catalog_payload(payload)
+
+    async def _extract_products_batch(self, page: Page) -> List[Dict]:
+        """Extrae las tarjetas nuevas del grid en una sola llamada a page.evaluate"""
+        try:
+            raw_items = await page.evaluate(EXTRACT_CARDS_JS, [PRODUCT_SELECTOR, CARD_SELECTORS, SEEN_ATTRIBUTE])
+        except Exception as e:
+            logger.error(f"Error extrayendo productos en lote: {e}")
+            return []
+
+        return [self._build_product(raw) for raw in raw_items]
+
+    async def _throttle(self, url: Optional[str] = None) -> None:
+        """Espera el turno del limitador compartido sin bloquear el bucle de eventos"""
+        if self.rate_limiter:
+            await self.rate_limiter.wait_async(url or self.base_url)
+
+    async def _wait_for_new_cards(self, page: Page, cards_added: int) -> Tuple[int, bool]:
+        """Espera a que el grid añada tarjetas después de un scroll"""
+        started = time.monotonic()
+        try:
+            await page.wait_for_function(
+                "n => window.__vsCardsAdded > n",
+                arg=cards_added,
+                timeout=self.max_wait * 1000
+            )
+            loaded = True
+        except PlaywrightTimeoutError:
+            loaded = False
+
+        # Mantener una espera mínima aleatoria entre scrolls
+        remaining = self._remaining_delay(started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+        return await page.evaluate("window.__vsCardsAdded"), loaded
+
+    async def _extract_visible_products(self, page: Page, target_products: int) -> int:
+        """Extrae las tarjetas nuevas de la página y devuelve cuántas se añadieron"""
+        if self.engine == "api" and self._api_products:
+            new_products, self._api_products = self._api_products, []
+        else:
+            new_products = await self._extract_products_batch(page)
+
+        return self._add_new_products(new_products, target_products)
+
+    async def _fast_forward(self, page: Page, target_height: int) -> None:
+        """Recupera la profundidad de scroll de un checkpoint sin extraer productos"""
+        logger.info(f"Avanzando hasta la posición guardada ({target_height}px)...")
+        height = await page.evaluate("document.body.scrollHeight")
+        while height < target_height:
+            await self._throttle()
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            try:
+                await page.wait_for_function(
+                    "h => document.body.scrollHeight > h",
+                    arg=height,
+                    timeout=self.max_wait * 1000
+                )
+            except PlaywrightTimeoutError:
+                break
+            height = await page.evaluate("document.body.scrollHeight")
+
+    async def _enrich_products(self) -> None:
+        """Completa los productos con su página de detalle (si enrich está activo)"""
+        if not self.enrich:
+            return
+        try:
+            await enrich_products(
+                self._enrichment_targets(),
+                concurrency=self.enrich_concurrency,
+                cache=self.detail_cache,
+                browser=self.browser,
+                rate_limiter=self.rate_limiter,
+                block_resources=self.resource_policy is not None,
+                progress_callback=self.progress_callback
+            )
+        except Exception as e:
+            logger.warning(f"Error en el enriquecimiento, se guardan los datos del grid: {e}")
+        self._flush_pending_sink()
+
+    async def _scroll_and_load(self, page: Page, target_products: int) -> None:
+        """Hace scroll para cargar más productos (misma lógica que VintedScraper)"""
+        adaptive = self.wait_mode == "adaptive"
+        last_height = await page.evaluate("document.body.scrollHeight")
+        scroll_attempts = 0
+
+        if adaptive:
+            max_scroll_attempts = self.max_idle_scrolls
+            cards_added = await page.evaluate(INSTALL_FEED_OBSERVER_JS, PRODUCT_SELECTOR)
+            await self._extract_visible_products(page, target_products)
+        else:
+            max_scroll_attempts = 50
+
+        while (self.product_count < target_products
+               and scroll_attempts < max_scroll_attempts
+               and not self._feed_exhausted):
+            await self._throttle()
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+
+            loaded = False
+            if adaptive:
+                cards_added, loaded = await self._wait_for_new_cards(page, cards_added)
+            else:
+                await self._random_delay(2, 4)
+
+            new_height = await page.evaluate("document.body.scrollHeight")
+            added = await self._extract_visible_products(page, target_products)
+            self._cursor["scroll_height"] = max(new_height, self._cursor.get("scroll_height", 0))
+
+            if new_height == last_height and not loaded and not added:
+                scroll_attempts += 1
+                logger.info(f"Sin nuevos productos. Intento {scroll_attempts}/{max_scroll_attempts}")
+                if adaptive:
+                    await page.evaluate("window.scrollBy(0, -window.innerHeight)")
+            else:
+                scroll_attempts = 0
+
+            last_height = new_height
+
+    @asynccontextmanager
+    async def _browser_context(self, storage_state: Optional[Dict] = None) -> AsyncIterator[BrowserContext]:
+        """Abre un contexto sobre el navegador compartido o sobre uno propio"""
+        options = dict(CONTEXT_OPTIONS)
+        if storage_state:
+            options["storage_state"] = storage_state
+
+        if self.browser:
+            context = await self.browser.new_context(**options)
+            try:
+                yield context
+            finally:
+                await context.close()
+            return
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                yield await browser.new_context(**options)
+            finally:
+                await browser.close()
+
+    async def scrape(self, url: str = "https://www.vinted.es/catalog", retries: int = 3) -> List[Dict]:
+        """
+        Ejecuta el scraping de una URL
+
+        Args:
+            url: URL de la página a scrapear
+            retries: Número de reintentos en caso de error
+
+        Returns:
+            Lista de productos extraídos
+        """
+        # El checkpoint va con la URL pedida (de ella sale el job_id), no con
+        # la ordenada por novedades del modo incremental
+        self._restore_checkpoint(url)
+        if self.known_ids is not None:
+            url = url_mas_recientes(url)
+            self._known_streak = 0
+        parsed_url = urlparse(url)
+        self.base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        if self.resource_policy:
+            self.resource_policy.reset()
+
+        if self.pagination == "pages":
+            return await self._scrape_pages(url, retries)
+
+        for attempt in range(retries):
+            # Se asigna antes del try: el manejo de errores la consulta
+            session = None
+            try:
+                logger.info(f"Iniciando scraping de {url} (intento {attempt + 1}/{retries})...")
+                self._report_progress(self.product_count, self.max_products, "Abriendo página...")
+                self._api_products = []
+                self._feed_exhausted = False
+                session = self._load_session(url)
+
+                async with self._browser_context(session) as context:
+                    if self.resource_policy:
+                        await context.route("**/*", self.resource_policy.handle_route_async)
+                    page = await context.new_page()
+                    if self.engine == "api":
+                        page.on("response", self._on_catalog_response)
+                    if self.rate_limiter:
+                        page.on("response", self.rate_limiter.on_response)
+
+                    await self._throttle(url)
+                    if session:
+                        # Sesión guardada: directos al grid
+                        await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+                        await page.wait_for_selector(PRODUCT_SELECTOR, timeout=self.max_wait * 1000)
+                    else:
+                        await page.goto(url, wait_until='networkidle', timeout=60000)
+                        await self._random_delay(3, 5)
+
+                        # Cerrar popups/cookies si existen
+                        try:
+                            cookie_button = await page.query_selector(COOKIE_BUTTON_SELECTOR)
+                            if cookie_button:
+                                await cookie_button.click()
+                                await self._random_delay(1, 2)
+                        except Exception:
+                            pass
+
+                    if self._cursor.get("scroll_height"):
+                        await self._fast_forward(page, self._cursor["scroll_height"])
+
+                    await self._scroll_and_load(page, self.max_products)
+
+                    if self.session_store:
+                        self.session_store.save(url, await context.storage_state())
+
+                await self._enrich_products()
+                self._store_products(force=True)
+                logger.info(f"Scraping de {url} completado. {self.product_count} productos extraídos.")
+                self._log_resource_stats()
+                self._finish_checkpoint()
+                return self.products
+
+            except Exception as e:
+                logger.error(f"Error en intento {attempt + 1} ({url}): {e}")
+                self._save_checkpoint(force=True)
+                if session:
+                    self.session_store.invalidate(url)
+                if attempt == retries - 1:
+                    logger.error("Todos los reintentos fallaron")
+                    raise
+                await self._random_delay(5, 10)
+
+        return self.products
+
+    async def _fetch_catalog_page(self, page: Page, url: str, number: int, retries: int) -> Optional[List[Dict]]:
+        """
+        Carga una página numerada del catálogo y extrae sus tarjetas
+
+        Args:
+            page: Pestaña del worker que la carga
+            url: URL del catálogo
+            number: Número de página
+            retries: Número de reintentos
+
+        Returns:
+            Productos de la página ([] si la página muestra el aviso de
+            catálogo vacío) o None si no se pudo cargar
+        """
+        page_url = url_pagina(url, number, self.per_page)
+        for attempt in range(retries):
+            try:
+                await self._throttle(page_url)
+                response = await page.goto(page_url, wait_until='domcontentloaded', timeout=60000)
+                if response is not None and not response.ok:
+                    raise RuntimeError(f"HTTP {response.status}")
+                try:
+                    await page.wait_for_selector(PRODUCT_SELECTOR, timeout=self.max_wait * 1000)
+                except PlaywrightTimeoutError:
+                    # Sin tarjetas a tiempo: solo es el final del catálogo si
+                    # la página lo indica; si no (lenta, limitada, desafío) se
+                    # reintenta
+                    if await page.query_selector(EMPTY_CATALOG_SELECTOR):
+                        return []
+                    raise
+                return await self._extract_products_batch(page)
+            except Exception as e:
+                logger.warning(f"Error cargando la página {number} (intento {attempt + 1}/{retries}): {e}")
+                await self._random_delay(2, 5)
+
+        logger.error(f"No se pudo cargar la página {number} de {url}")
+        return None
+
+    async def _scrape_pages(self, url: str, retries: int) -> List[Dict]:
+        """
+        Recorre el catálogo por número de página en lugar de con scroll
+
+        Varios workers (page_concurrency) piden las páginas 1, 2, 3... en
+        paralelo, cada uno con su pestaña. En cuanto una página llega vacía o
+        solo con productos ya vistos (fin del catálogo) no se piden páginas
+        posteriores; las que ya estaban en curso terminan normalmente.
+
+        Si alguna página no se pudo cargar tras sus reintentos, el trabajo
+        falla conservando el checkpoint: al reanudarlo se piden solo las
+        páginas que faltan.
+
+        Args:
+            url: URL del catálogo
+            retries: Número de reintentos por página
+
+        Returns:
+            Lista de productos extraídos
+        """
+        self._feed_exhausted = False
+        # Páginas ya recorridas en un intento anterior (checkpoint)
+        pages_done = set(self._cursor.get("pages_done", []))
+        self._cursor["pages_done"] = sorted(pages_done)
+        next_page = 1
+        last_page = min(self.max_pages or float("inf"), self._cursor.get("last_page", float("inf")))
+        failed_pages = set()
+
+        def take_page() -> Optional[int]:
+            nonlocal next_page
+            while next_page in pages_done:
+                next_page += 1
+            if (next_page > last_page
+                    or self.product_count >= self.max_products
+                    or self._feed_exhausted):
+                return None
+            number = next_page
+            next_page += 1
+            return number
+
+        async def worker(context: BrowserContext) -> None:
+            nonlocal last_page
+            page = await context.new_page()
+            if self.rate_limiter:
+                page.on("response", self.rate_limiter.on_response)
+            # No hace falta cerrar el aviso de cookies: no se hace scroll
+            while (number := take_page()) is not None:
+                products = await self._fetch_catalog_page(page, url, number, retries)
+                if products is None:
+                    failed_pages.add(number)
+                    continue
+
+                added = self._add_new_products(products, self.max_products)
+                logger.info(f"Página {number}: {len(products)} tarjetas, {added} nuevas")
+                if not added and self.product_count < self.max_products:
+                    last_page = min(last_page, number - 1)
+                    self._cursor["last_page"] = last_page
+                    logger.info(f"Página {number} vacía o ya vista, fin del catálogo")
+
+                pages_done.add(number)
+                self._cursor["pages_done"] = sorted(pages_done)
+                self._save_checkpoint(force=True)
+                await self._random_delay(self.min_delay, self.min_delay * 2)
+
+        workers = min(self.page_concurrency, self.max_pages or self.page_concurrency)
+        logger.info(f"Scraping por páginas de {url} ({workers} páginas simultáneas)...")
+        self._report_progress(self.product_count, self.max_products, "Abriendo páginas...")
+
+        async with self._browser_context(self._load_session(url)) as context:
+            if self.resource_policy:
+                await context.route("**/*", self.resource_policy.handle_route_async)
+            await asyncio.gather(*(worker(context) for _ in range(workers)))
+            if self.session_store:
+                self.session_store.save(url, await context.storage_state())
+
+        # Las páginas que faltan no están en pages_done: el checkpoint las
+        # vuelve a pedir al reanudar
+        failed_pages = sorted(page for page in failed_pages if page <= last_page)
+        if failed_pages:
+            self._save_checkpoint(force=True)
+            raise RuntimeError(f"No se pudieron cargar las páginas {failed_pages} de {url}")
+
+        await self._enrich_products()
+        self._store_products(force=True)
+        logger.info(f"Scraping de {url} completado. {self.product_count} productos extraídos.")
+        self._log_resource_stats()
+        self._finish_checkpoint()
+        return self.products
+
+    def _child(self, browser: Browser) -> "AsyncVintedScraper":
+        """Crea un scraper para una URL con las mismas opciones que este"""
+        options = dict(self._options)
+        # Cada URL guarda su propio checkpoint; la salida en streaming y el
+        # almacenamiento los escribe este scraper al unir los resultados
+        options.pop("job_id", None)
+        options.update(sink=None, keep_products=True, storage=None)
+        # Una sola caché de detalles para todas las URLs: cada una por
+        # separado guardaría solo sus entradas
+        options["detail_cache"] = self.detail_cache
+        if self.resource_policy is not None:
+            # Cada página lleva sus propios contadores
+            options["resource_policy"] = ResourcePolicy(
+                self.resource_policy.blocked_types,
+                self.resource_policy.blocked_hosts
+            )
+        return AsyncVintedScraper(browser=browser, **options)
+
+    async def scrape_many(self, urls: List[str], retries: int = 3) -> Dict[str, List[Dict]]:
+        """
+        Scrapea varias URLs a la vez en un mismo navegador
+
+        Cada URL se procesa en su propio contexto, con como mucho
+        `concurrency` páginas abiertas simultáneamente y
+        `per_domain_concurrency` por dominio. Los productos de todas las URLs
+        se acumulan sin duplicados en self.products (y en el sink, si hay). En modo "pages" cada URL
+        abre además hasta `page_concurrency` pestañas en su contexto.
+
+        Args:
+            urls: URLs de catálogo a scrapear
+            retries: Número de reintentos por URL
+
+        Returns:
+            Diccionario URL -> lista de productos extraídos de esa URL
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        domain_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        async def run(child: AsyncVintedScraper, url: str) -> Tuple[str, List[Dict]]:
+            domain = urlparse(url).netloc
+            domain_semaphore = domain_semaphores.setdefault(
+                domain, asyncio.Semaphore(self.per_domain_concurrency)
+            )
+            # Primero el límite por dominio para no ocupar huecos globales esperando
+            async with domain_semaphore, semaphore:
+                try:
+                    products = await child.scrape(url, retries=retries)
+                except Exception as e:
+                    logger.error(f"Error scrapeando {url}: {e}")
+                    products = list(child.products)
+
+            # Unir en cuanto termina cada URL para que el sink vaya recibiendo
+            # los productos sin esperar al resto
+            for product in products:
+                self._add_product(product)
+            # Los hijos ya los han enriquecido
+            self._flush_pending_sink()
+            self._store_products(force=True)
+            return url, products
+
+        async def run_all(browser: Browser) -> List[Tuple[str, List[Dict]]]:
+            return await asyncio.gather(*(run(self._child(browser), url) for url in urls))
+
+        if self.browser:
+            results = await run_all(self.browser)
+        else:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True)
+                try:
+                    results = await run_all(browser)
+                finally:
+                    await browser.close()
+
+        logger.info(f"{len(urls)} URLs completadas. {self.product_count} productos únicos.")
+        return dict(results)
+
+
+async def _main():
+    """Función principal para pruebas"""
+    from config_filtros import URLS_EJEMPLO
+
+    def progress_callback(current, total, message):
+        print(f"[{current}/{total}] {message}")
+
+    scraper = AsyncVintedScraper(max_products=20, concurrency=3, progress_callback=progress_callback)
+    results = await scraper.scrape_many(list(URLS_EJEMPLO.values()))
+
+    for url, products in results.items():
+        print(f"{len(products):4d} productos - {url}")
+
+    if scraper.products:
+        scraper.save_to_json()
+        scraper.save_to_csv()
+        print(f"\n✓ Total de productos únicos: {len(scraper.products)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
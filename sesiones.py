@@ -0,0 +1,105 @@
+"""
+Sesiones de navegador reutilizables por dominio de Vinted
+Guarda el storage_state de Playwright (cookies y localStorage) tras una
+visita con el aviso de cookies ya aceptado, para que los trabajos siguientes
+abran el contexto con esa sesión y vayan directos a la extracción
+"""
+
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from config_filtros import VINTED_BASE_URLS
+from puntos_control import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Dominio -> código de país (www.vinted.es -> es)
+DOMINIOS = {urlparse(url).netloc: pais for pais, url in VINTED_BASE_URLS.items()}
+
+# Cookies sin las que la sesión no sirve: aceptación del aviso de cookies
+# (OneTrust), sesión de Vinted y anti-bots. Si alguna ha expirado se repite la
+# visita completa; las demás (analítica, seguimiento) simplemente se quitan
+SESSION_COOKIE_PATTERN = re.compile(
+    r"^(OptanonAlertBoxClosed|OptanonConsent|_vinted_\w+_session|anon_id"
+    r"|access_token_web|refresh_token_web|datadome)$"
+)
+
+
+class SessionStore:
+    """Almacén de storage_state por dominio con caducidad"""
+
+    def __init__(self, directory="data/sesiones", max_age_hours: float = 12):
+        """
+        Inicializa el almacén
+
+        Args:
+            directory: Carpeta donde se guardan las sesiones
+            max_age_hours: Horas tras las que una sesión se descarta y se
+                           vuelve a hacer la visita completa
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age_hours * 3600
+
+    def _path(self, url: str) -> Path:
+        netloc = urlparse(url).netloc
+        return self.directory / f"{DOMINIOS.get(netloc, netloc)}.json"
+
+    def load(self, url: str) -> Optional[Dict]:
+        """
+        Devuelve la sesión guardada para el dominio de la URL
+
+        Args:
+            url: Cualquier URL del dominio
+
+        Returns:
+            storage_state para new_context (sin las cookies expiradas), o
+            None si no hay sesión, ha caducado o ha expirado alguna de las
+            cookies de SESSION_COOKIE_PATTERN
+        """
+        path = self._path(url)
+        if not path.exists() or time.time() - path.stat().st_mtime > self.max_age:
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.warning(f"Sesión {path.name} no válida, se descarta: {e}")
+            return None
+
+        now = time.time()
+        cookies = []
+        for cookie in state.get("cookies", []):
+            if not 0 < cookie.get("expires", -1) < now:
+                cookies.append(cookie)
+            elif SESSION_COOKIE_PATTERN.match(cookie.get("name", "")):
+                logger.info(f"Sesión {path.name} con la cookie {cookie['name']} expirada, se renueva")
+                return None
+        state["cookies"] = cookies
+        return state
+
+    def save(self, url: str, state: Dict) -> None:
+        """
+        Guarda la sesión del dominio de la URL
+
+        Args:
+            url: Cualquier URL del dominio
+            state: Resultado de context.storage_state()
+        """
+        try:
+            write_json_atomic(self._path(url), state)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la sesión de {url}: {e}")
+
+    def invalidate(self, url: str) -> None:
+        """Descarta la sesión del dominio (por ejemplo tras un error con ella)"""
+        try:
+            self._path(url).unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,170 @@
+"""
+Pruebas de la paginación de /api/products en los dos almacenes
+(ProductStore en memoria y SQLiteProductStorage)
+Ejecutar con: python -m pytest -q test_almacenamiento.py
+"""
+
+import pytest
+
+from almacen_productos import ProductStore
+from almacenamiento import SQLiteProductStorage, decode_cursor, encode_cursor
+
+BRANDS = ["Zara", "Mango", "H&M", "N/A", "Levi's"]
+CONDITIONS = ["Nuevo con etiquetas", "Muy bueno", "Bueno", "Satisfactorio"]
+
+
+def make_products(count=60):
+    """Productos con empates de precio, marca y fecha y algunos sin precio"""
+    products = []
+    for i in range(1, count + 1):
+        products.append({
+            "item_id": i,
+            "title": f"Camiseta {i}",
+            "price": "N/A" if i % 7 == 0 else f"{(i * 37) % 15},50 €",
+            "brand": BRANDS[i % len(BRANDS)],
+            "size": "M" if i % 2 else "L",
+            "condition": CONDITIONS[i % len(CONDITIONS)],
+            "product_url": f"https://www.vinted.es/items/{i}-camiseta",
+            "image_url": "N/A",
+            "location": "Valencia",
+            "seller": "N/A",
+            "description": "N/A",
+            "scraped_at": f"2024-05-0{1 + i % 3}T10:00:00",
+        })
+    return products
+
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def storage(request, tmp_path):
+    products = make_products()
+    if request.param == "memoria":
+        return ProductStore(products)
+    storage = SQLiteProductStorage(tmp_path / "productos.sqlite")
+    storage.upsert(products)
+    return storage
+
+
+def item_ids(result):
+    return [product["item_id"] for product in result["products"]]
+
+
+def paginate(storage, limit, **options):
+    """Recorre todas las páginas siguiendo next_cursor"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        result = storage.query(limit=limit, cursor=cursor, **options)
+        ids.extend(item_ids(result))
+        pages += 1
+        cursor = result["next_cursor"]
+        if cursor is None:
+            return ids, pages
+        assert pages <= len(storage)
+
+
+def test_cursor_ida_y_vuelta():
+    cursor = encode_cursor("price", "asc", [1250, 42, 7])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "price", "asc") == [1250, 42, 7]
+
+
+def test_cursor_de_otro_orden():
+    cursor = encode_cursor("price", "asc", [None, 1, 1])
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "price", "desc")
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "date", "asc")
+
+
+@pytest.mark.parametrize("cursor", ["no-es-un-cursor", "", encode_cursor("date", "desc", [1, 2])])
+def test_cursor_no_valido(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "date", "desc")
+
+
+def test_query_cursor_no_valido(storage):
+    with pytest.raises(ValueError):
+        storage.query(limit=5, cursor="no-es-un-cursor")
+
+
+@pytest.mark.parametrize("sort_by", ["price", "brand", "date"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [1, 7, 25])
+def test_paginas_con_cursor_igual_que_sin_paginar(storage, sort_by, sort_order, limit):
+    full = item_ids(storage.query(sort_by=sort_by, sort_order=sort_order))
+    ids, pages = paginate(storage, limit, sort_by=sort_by, sort_order=sort_order)
+    assert ids == full
+    assert len(ids) == len(storage)
+    assert pages == -(-len(full) // limit)
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_orden_por_precio(storage, sort_order):
+    products = storage.query(sort_by="price", sort_order=sort_order)["products"]
+    priced = [p for p in products if p["price_cents"] is not None]
+    # Los productos sin precio van al final en los dos sentidos
+    assert products[len(priced):] == [p for p in products if p["price_cents"] is None]
+
+    expected = sorted(priced, key=lambda p: (p["price_cents"], p["item_id"]), reverse=sort_order == "desc")
+    assert [p["item_id"] for p in priced] == [p["item_id"] for p in expected]
+
+
+def test_paginas_con_filtros(storage):
+    filters = {"condition": "Muy bueno", "min_price": 3, "max_price": 12}
+    full = storage.query(sort_by="price", sort_order="asc", **filters)
+    ids, _ = paginate(storage, 4, sort_by="price", sort_order="asc", **filters)
+    assert ids == item_ids(full)
+    assert full["total"] == len(ids)
+
+
+def test_offset_sin_cursor(storage):
+    full = item_ids(storage.query(sort_by="date", sort_order="desc"))
+    result = storage.query(sort_by="date", sort_order="desc", limit=10, offset=20)
+    assert item_ids(result) == full[20:30]
+    assert result["total"] == len(full)
+
+
+def test_ultima_pagina_sin_cursor(storage):
+    result = storage.query(limit=len(storage))
+    assert len(result["products"]) == len(storage)
+    assert result["next_cursor"] is None
+
+
+BRANDLESS = [
+    {"item_id": 1, "title": "Libro", "brand": "N/A", "price": "5 €", "product_url": "https://www.vinted.es/items/1"},
+    {"item_id": 2, "title": "Camisa azul", "brand": "N/A", "price": "7 €", "product_url": "https://www.vinted.es/items/2"},
+    {"item_id": 3, "title": "N/A", "brand": "Nike", "price": "9 €", "product_url": "https://www.vinted.es/items/3"},
+]
+
+
+@pytest.mark.parametrize("search", ["a", "n", "libro", "camisa az", "nike", "n/a"])
+def test_busqueda_igual_en_los_dos_almacenes_sin_marca(tmp_path, search):
+    storage = SQLiteProductStorage(tmp_path / "productos.sqlite")
+    storage.upsert(BRANDLESS)
+    memory = ProductStore(BRANDLESS)
+    # El marcador "N/A" no es texto del producto en ninguno de los dos
+    expected = item_ids(memory.query(search=search, sort_by="price", sort_order="asc"))
+    assert item_ids(storage.query(search=search, sort_by="price", sort_order="asc")) == expected
+
+
+def test_upsert_conserva_lo_enriquecido_en_los_dos_almacenes(tmp_path):
+    grid = {
+        "item_id": 1, "title": "Camisa", "price": "5 €", "brand": "N/A", "size": "N/A",
+        "condition": "Muy bueno", "product_url": "https://www.vinted.es/items/1",
+        "location": "N/A", "seller": "N/A", "description": "N/A",
+    }
+    enriched = dict(grid, brand="Zara", size="Talla M", location="Valencia", seller="ana", description="Lino")
+    # Se vuelve a ver en el grid con otro precio y sin los campos de detalle
+    again = dict(grid, price="4 €")
+
+    storage = SQLiteProductStorage(tmp_path / "productos.sqlite")
+    memory = ProductStore()
+    for backend in (storage, memory):
+        backend.upsert([enriched])
+        backend.upsert([again])
+
+    fields = ("brand", "size", "size_label", "location", "seller", "description", "price_cents")
+    stored = storage.query()["products"][0]
+    kept = memory.query()["products"][0]
+    assert {name: kept[name] for name in fields} == {name: stored[name] for name in fields}
+    assert kept["brand"] == "Zara" and kept["size_label"] == "M" and kept["price_cents"] == 400
+    assert memory.select(brand="zara") == [0]
@@ -0,0 +1,53 @@
+"""
+Pruebas de los filtros de /api/products
+Ejecutar con: python -m pytest -q test_app.py
+"""
+
+import os
+
+import pytest
+
+from almacen_productos import ProductStore
+
+PRODUCTS = [
+    {"item_id": i, "title": f"Camisa {i}", "price": f"{i},00 €", "product_url": f"https://www.vinted.es/items/{i}"}
+    for i in range(1, 11)
+]
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    # La aplicación crea sus archivos en data/ al importarse
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    return app
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    store = ProductStore(PRODUCTS)
+    monkeypatch.setattr(app_module, "load_products", lambda: (store, {"total_products": len(store)}))
+    return app_module.app.test_client()
+
+
+def prices(client, query):
+    products = client.get(f"/api/products?sort_by=price&sort_order=asc&{query}").get_json()["products"]
+    return [p["price_cents"] // 100 for p in products]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("min_price=3&max_price=5", [3, 4, 5]),
+    ("min_price=8", [8, 9, 10]),
+    ("max_price=2", [1, 2]),
+    # Un límite no válido se ignora sin afectar al otro
+    ("min_price=8&max_price=abc", [8, 9, 10]),
+    ("min_price=abc&max_price=2", [1, 2]),
+    ("min_price=nan&max_price=inf", list(range(1, 11))),
+    ("min_price=&max_price=", list(range(1, 11))),
+])
+def test_filtro_de_precio(client, query, expected):
+    assert prices(client, query) == expected
@@ -0,0 +1,31 @@
+"""
+Pruebas de la caché de detalles de producto
+Ejecutar con: python -m pytest -q test_enriquecimiento.py
+"""
+
+from enriquecimiento import DetailCache
+
+
+def test_caches_del_mismo_archivo_no_se_pisan(tmp_path):
+    path = tmp_path / "detalles.json"
+    first, second = DetailCache(path), DetailCache(path)
+    first.put(1, {"brand": "Zara"})
+    second.put(2, {"brand": "Mango"})
+    first.save()
+    second.save()
+
+    cache = DetailCache(path)
+    assert cache.get(1) == {"brand": "Zara"}
+    assert cache.get(2) == {"brand": "Mango"}
+
+
+def test_gana_el_detalle_mas_reciente(tmp_path):
+    path = tmp_path / "detalles.json"
+    old, new = DetailCache(path), DetailCache(path)
+    new.put(1, {"brand": "Zara"})
+    new.save()
+    old.put(1, {"brand": "N/A"})
+    old._entries["1"]["fetched_at"] -= 60
+    old.save()
+
+    assert DetailCache(path).get(1) == {"brand": "Zara"}
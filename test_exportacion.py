@@ -0,0 +1,73 @@
+"""
+Pruebas del sink JSONL al reanudar un trabajo interrumpido
+Ejecutar con: python -m pytest -q test_exportacion.py
+"""
+
+import pytest
+
+from exportacion import JsonlSink, iter_jsonl
+from puntos_control import CheckpointStore
+from scraper import VintedScraper
+
+URL = "https://www.vinted.es/catalog?search_text=camisa"
+
+
+def product(item_id):
+    return {"item_id": item_id, "title": f"Camisa {item_id}", "product_url": f"https://www.vinted.es/items/{item_id}"}
+
+
+def ids(path):
+    return [p["item_id"] for p in iter_jsonl(path)]
+
+
+def test_reanudar_no_duplica(tmp_path):
+    path = tmp_path / "productos.jsonl"
+    sink = JsonlSink(path, csv_path=tmp_path / "productos.csv")
+    for i in (1, 2):
+        sink.write(product(i))
+    sink.abort()
+    # Línea cortada por la caída
+    with open(tmp_path / "productos.jsonl.part", "a", encoding="utf-8") as f:
+        f.write('{"item_id": 3, "tit')
+
+    with JsonlSink(path, csv_path=tmp_path / "productos.csv", resume=True) as sink:
+        for i in (1, 2, 3, 4):
+            sink.write(product(i))
+    assert ids(path) == [1, 2, 3, 4]
+    assert sink.count == 4
+    assert len((tmp_path / "productos.csv").read_text(encoding="utf-8").splitlines()) == 5
+
+
+def scraper(tmp_path, sink):
+    return VintedScraper(
+        checkpoint_store=CheckpointStore(tmp_path / "checkpoints"),
+        checkpoint_every=2,
+        sink=sink,
+        keep_products=False,
+        block_resources=False
+    )
+
+
+@pytest.mark.parametrize("resume", [True, False])
+def test_trabajo_reanudado_conserva_la_salida(tmp_path, resume):
+    path = tmp_path / "productos.jsonl"
+    sink = JsonlSink(path)
+    first = scraper(tmp_path, sink)
+    first._restore_checkpoint(URL)
+    for i in (1, 2, 3, 4, 5):
+        first._add_product(product(i))
+        first._save_checkpoint()
+    # Caída: el .part y el checkpoint (hasta el producto 4) quedan en disco
+    sink.abort()
+
+    with JsonlSink(path, resume=resume) as sink:
+        second = scraper(tmp_path, sink)
+        second._restore_checkpoint(URL)
+        assert second.product_count == 4
+        for i in (5, 6):
+            second._add_product(product(i))
+        second.save_to_json(tmp_path / "productos.json")
+
+    # Sin reanudar el .part, lo restaurado del checkpoint se vuelve a escribir
+    assert sorted(ids(path)) == [1, 2, 3, 4, 5, 6]
+    assert second.metadata["total_products"] == 6
@@ -0,0 +1,175 @@
+"""
+Pruebas de los índices de filtros y de búsqueda comparados con un filtrado
+directo de las filas
+Ejecutar con: python -m pytest -q test_indices.py
+"""
+
+import random
+from array import array
+
+import pytest
+
+from almacen_productos import ProductStore
+from indice_facetas import DENSE_RATIO, FacetIndex, PriceIndex, bitmap_rows, to_bitmap
+from indice_texto import TokenIndex, tokenize
+from productos import Condition, fold
+
+MISSING = -1
+
+
+def test_bitmap_ida_y_vuelta():
+    rows = [0, 3, 8, 63, 64, 1000]
+    assert bitmap_rows(to_bitmap(rows)) == rows
+    assert to_bitmap([]) == 0
+    assert bitmap_rows(0) == []
+
+
+def random_codes(rnd, size):
+    # Un código muy frecuente (bitmap) y varios raros (arrays)
+    return array("I", (0 if rnd.random() < 0.6 else rnd.randrange(1, 40) for _ in range(size)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_facet_index(seed):
+    rnd = random.Random(seed)
+    codes = random_codes(rnd, 500)
+    index = FacetIndex(codes)
+    # El código frecuente va como bitmap y los raros como array
+    assert index.is_dense([0])
+    assert not index.is_dense([1])
+    assert index.count([1]) * DENSE_RATIO < len(codes)
+
+    def check():
+        for query in ([0], [1], [1, 2, 3], [0, 5], [99]):
+            expected = [row for row, code in enumerate(codes) if code in query]
+            assert index.count(query) == len(expected)
+            assert index.rows(query) == expected
+            assert bitmap_rows(index.bitmap(query)) == expected
+
+    check()
+    # Filas nuevas y cambios de código, como en ProductStore.upsert
+    for _ in range(100):
+        if rnd.random() < 0.5:
+            code = rnd.randrange(0, 45)
+            index.add(len(codes), code)
+            codes.append(code)
+        else:
+            row, code = rnd.randrange(len(codes)), rnd.randrange(0, 45)
+            index.move(row, codes[row], code)
+            codes[row] = code
+    check()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_price_index(seed):
+    rnd = random.Random(seed)
+    prices = array("q", (MISSING if rnd.random() < 0.1 else rnd.randrange(0, 5000, 50) for _ in range(300)))
+    index = PriceIndex(prices, MISSING)
+
+    def check():
+        for low, high in ((0, 5000), (1000, 2000), (1234, 1234), (2500, 2500), (4000, 100), (-10, -5)):
+            expected = [row for row, price in enumerate(prices) if price == MISSING or low <= price <= high]
+            assert index.count(low, high) == len(expected)
+            assert index.rows(low, high) == expected
+
+    check()
+    # Cambios de precio: se quita la fila y se vuelve a añadir
+    for _ in range(50):
+        row, price = rnd.randrange(len(prices)), rnd.randrange(0, 5000, 50)
+        index.remove(row, prices[row])
+        index.add(row, price)
+        prices[row] = price
+    check()
+
+
+TITLES = ["Camisón Zara", "Camiseta básica", "Vaqueros Levi's 501", "Camisa de lino", "Zapatillas"]
+
+
+def test_tokenize():
+    assert tokenize("Camisón Zara", None, "N/A") == {"camison", "zara"}
+
+
+def test_token_index():
+    index = TokenIndex()
+    for row, title in enumerate(TITLES):
+        index.add(row, title)
+
+    def expected(query):
+        words = tokenize(query)
+        return [
+            row for row, title in enumerate(TITLES)
+            if all(any(token.startswith(word) for token in tokenize(title)) for word in words)
+        ]
+
+    for query in ("camis", "CAMISÓN", "zara camis", "levi 501", "lino", "xyz", "ca za"):
+        assert index.search(query) == expected(query)
+    assert index.search("  ¿? ") is None
+
+    index.replace(0, ["Camisón Zara"], ["Pijama Zara"])
+    index.sort_vocabulary()
+    assert index.search("camison") == []
+    assert index.search("pijama zara") == [0]
+
+
+def naive_select(products, search="", brand="", size="", condition="", min_price=None, max_price=None):
+    """Filtro de referencia, fila a fila"""
+    rows = []
+    for row, product in enumerate(products):
+        if search:
+            words = tokenize(search)
+            tokens = tokenize(product["title"], product["brand"])
+            if not all(any(token.startswith(word) for token in tokens) for word in words):
+                continue
+        if brand and fold(brand) not in fold(product["brand"] or ""):
+            continue
+        if size and product["size_label"] != size:
+            continue
+        if condition and Condition.parse(product["condition"]) != Condition.parse(condition):
+            continue
+        price = product["price_cents"]
+        if price is not None:
+            if min_price is not None and price < min_price * 100:
+                continue
+            if max_price is not None and price > max_price * 100:
+                continue
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture(scope="module")
+def store():
+    rnd = random.Random(1)
+    brands = ["Zara"] * 10 + ["Mango"] * 5 + ["Levi's", "Nike", "Adidas", "N/A"]
+    conditions = ["Muy bueno"] * 6 + ["Bueno", "Nuevo con etiquetas", "Satisfactorio"]
+    products = [
+        {
+            "item_id": i + 1,
+            "title": f"{rnd.choice(['Camiseta', 'Camisa', 'Vaqueros', 'Jersey'])} {rnd.choice(['azul', 'roja'])}",
+            "price": "N/A" if i % 11 == 0 else f"{rnd.randrange(1, 60)},00 €",
+            "brand": rnd.choice(brands),
+            "size": rnd.choice(["S", "M", "L", "Talla M"]),
+            "condition": rnd.choice(conditions),
+            "product_url": f"https://www.vinted.es/items/{i + 1}",
+            "scraped_at": "2024-05-01T10:00:00",
+        }
+        for i in range(400)
+    ]
+    store = ProductStore(products)
+    return store, [store.row(row) for row in range(len(store))]
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"brand": "zara"},
+    {"brand": "levi"},
+    {"brand": "zara", "condition": "Muy bueno"},
+    {"brand": "zara", "condition": "Muy bueno", "size": "M"},
+    {"size": "M", "min_price": 10, "max_price": 30},
+    {"search": "camis azul"},
+    {"search": "camis", "brand": "mango", "max_price": 20},
+    {"condition": "Nuevo con etiquetas", "brand": "nike"},
+    {"brand": "no-existe"},
+])
+def test_select_igual_que_filtro_directo(store, filters):
+    store, products = store
+    assert store.select(**filters) == naive_select(products, **filters)
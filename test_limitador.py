@@ -0,0 +1,151 @@
+"""
+Pruebas del limitador adaptativo (subida aditiva, bajada multiplicativa y pausa)
+Ejecutar con: python -m pytest -q test_limitador.py
+"""
+
+import pytest
+
+import limitador
+from limitador import RateLimiter
+
+HOST = "www.vinted.es"
+URL = f"https://{HOST}/catalog"
+
+
+class Clock:
+    """Reloj manual para no depender de time.time()"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(limitador.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def limiter(tmp_path, clock):
+    return RateLimiter(
+        tmp_path / "limitador.sqlite",
+        rate=1.0, min_rate=0.1, max_rate=2.0, burst=2.0,
+        increase=0.25, decrease=0.5, cooldown=30.0
+    )
+
+
+def rate(limiter, host=HOST):
+    return limiter.stats()[host]["rate"]
+
+
+def test_rafaga_y_espera(limiter, clock):
+    assert limiter.reserve(HOST) == 0
+    assert limiter.reserve(HOST) == 0
+    # Sin tokens: espera lo que tarda en recargarse uno
+    assert limiter.reserve(HOST) == pytest.approx(1.0)
+    assert limiter.reserve(HOST) == pytest.approx(2.0)
+    clock.now += 10
+    assert limiter.reserve(HOST) == 0
+
+
+def test_subida_aditiva(limiter):
+    limiter.reserve(HOST)
+    for _ in range(2):
+        limiter.report(URL, 200)
+    # Las respuestas correctas se aplican en el siguiente turno
+    assert rate(limiter) == 1.0
+    limiter.reserve(HOST)
+    assert rate(limiter) == 1.5
+
+
+def test_subida_hasta_el_maximo(limiter):
+    limiter.reserve(HOST)
+    for _ in range(20):
+        limiter.report(URL, 200)
+    limiter.reserve(HOST)
+    assert rate(limiter) == 2.0
+
+
+def test_respuestas_de_hosts_sin_turno_no_cuentan(limiter):
+    limiter.reserve(HOST)
+    limiter.report("https://images1.vinted.net/foto.jpg", 200)
+    assert "images1.vinted.net" not in limiter.stats()
+    limiter.reserve(HOST)
+    assert rate(limiter) == 1.0
+
+
+@pytest.mark.parametrize("status", [429, 403])
+def test_bajada_multiplicativa_y_pausa(limiter, status):
+    limiter.reserve(HOST)
+    limiter.report(URL, status)
+    stats = limiter.stats()[HOST]
+    assert stats["rate"] == 0.5
+    assert stats["blocked_for"] == 30.0
+    assert stats["throttled"] == 1
+    assert limiter.reserve(HOST) >= 30.0
+
+
+def test_retry_after(limiter):
+    limiter.reserve(HOST)
+    limiter.report(URL, 429, retry_after=120)
+    assert limiter.stats()[HOST]["blocked_for"] == 120.0
+
+
+def test_una_bajada_por_pausa(limiter, clock):
+    limiter.reserve(HOST)
+    # Una ráfaga de respuestas frenadas en la misma pausa baja el ritmo una vez
+    for _ in range(10):
+        limiter.report(URL, 429)
+        clock.now += 1
+    stats = limiter.stats()[HOST]
+    assert stats["rate"] == 0.5
+    assert stats["throttled"] == 10
+    # ...pero cada una alarga la pausa
+    assert stats["blocked_for"] == 29.0
+
+
+def test_ritmo_minimo(limiter, clock):
+    limiter.reserve(HOST)
+    for _ in range(10):
+        limiter.report(URL, 429)
+        clock.now += 31
+    assert rate(limiter) == 0.1
+
+
+def test_sin_subida_durante_la_pausa(limiter, clock):
+    limiter.reserve(HOST)
+    limiter.report(URL, 200)
+    # El frenazo descarta las respuestas correctas pendientes
+    limiter.report(URL, 429)
+    limiter.reserve(HOST)
+    assert rate(limiter) == 0.5
+
+    limiter.report(URL, 200)
+    limiter.reserve(HOST)
+    assert rate(limiter) == 0.5
+
+    # Pasada la pausa vuelve a subir
+    clock.now += 31
+    limiter.reserve(HOST)
+    limiter.report(URL, 200)
+    limiter.reserve(HOST)
+    assert rate(limiter) == 0.75
+
+
+def test_desafio_penaliza_el_ultimo_host(limiter):
+    limiter.reserve(HOST)
+    limiter.report("https://geo.captcha-delivery.com/captcha/?initialCid=x", 200)
+    assert rate(limiter) == 0.5
+    assert "geo.captcha-delivery.com" not in limiter.stats()
+
+
+def test_estado_compartido_entre_instancias(limiter, tmp_path):
+    limiter.reserve(HOST)
+    limiter.report(URL, 429)
+    other = RateLimiter(tmp_path / "limitador.sqlite")
+    assert other.stats()[HOST]["rate"] == 0.5
+    assert other.reserve(HOST) >= 29.0
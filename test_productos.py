@@ -0,0 +1,50 @@
+"""
+Pruebas de la normalización de productos (precio y estado)
+Ejecutar con: python -m pytest -q test_productos.py
+"""
+
+import pytest
+
+from productos import Condition, parse_price
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12,50 €", (1250, "EUR")),
+    ("£5.00", (500, "GBP")),
+    ("€ 3,5", (350, "EUR")),
+    ("7 zł", (700, "PLN")),
+    ("1.234 Kč", (123400, "CZK")),
+    ("1 234,56 €", (123456, "EUR")),
+    ("12.5", (1250, None)),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+@pytest.mark.parametrize("text", [None, "", "N/A", "gratis"])
+def test_parse_price_sin_importe(text):
+    assert parse_price(text) == (None, None)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Muy bueno", Condition.VERY_GOOD),
+    ("Bueno", Condition.GOOD),
+    ("Satisfactorio", Condition.SATISFACTORY),
+    ("Nuevo con etiquetas", Condition.NEW_WITH_TAGS),
+    ("Nuevo sin etiquetas", Condition.NEW_WITHOUT_TAGS),
+    ("Nuevo", Condition.NEW_WITHOUT_TAGS),
+    ("New with tags", Condition.NEW_WITH_TAGS),
+    ("Très bon état", Condition.VERY_GOOD),
+    ("Sehr gut", Condition.VERY_GOOD),
+])
+def test_condition_parse(text, expected):
+    assert Condition.parse(text) is expected
+
+
+@pytest.mark.parametrize("text", [None, "", "xyz"])
+def test_condition_parse_desconocido(text):
+    assert Condition.parse(text) is Condition.UNKNOWN
+
+
+def test_condition_orden_de_mejor_a_peor():
+    assert Condition.NEW_WITH_TAGS < Condition.VERY_GOOD < Condition.SATISFACTORY
@@ -0,0 +1,54 @@
+"""
+Pruebas del almacén de checkpoints (estado y diario de productos)
+Ejecutar con: python -m pytest -q test_puntos_control.py
+"""
+
+import json
+
+from puntos_control import CheckpointStore
+
+
+def product(item_id):
+    return {"item_id": item_id, "title": f"Producto {item_id}"}
+
+
+def test_diario_incremental(tmp_path):
+    store = CheckpointStore(tmp_path)
+    size = store.save("job", {"url": "u", "product_count": 2}, [product(1), product(2)])
+    state_size = (tmp_path / "job.json").stat().st_size
+    size = store.save("job", {"url": "u", "product_count": 3}, [product(3)], journal_size=size)
+
+    state = store.load("job")
+    assert state["journal_size"] == size
+    assert [p["item_id"] for p in store.products("job", state)] == [1, 2, 3]
+    # El estado no crece con los productos (solo cambian los contadores)
+    assert abs((tmp_path / "job.json").stat().st_size - state_size) < 10
+
+
+def test_diario_ignora_lo_posterior_al_estado(tmp_path):
+    store = CheckpointStore(tmp_path)
+    size = store.save("job", {"url": "u"}, [product(1)])
+    # Corte tras escribir el diario y antes del estado
+    with open(tmp_path / "job.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(product(2)) + "\n")
+
+    state = store.load("job")
+    assert [p["item_id"] for p in store.products("job", state)] == [1]
+    size = store.save("job", {"url": "u"}, [product(3)], journal_size=size)
+    assert [p["item_id"] for p in store.products("job", store.load("job"))] == [1, 3]
+
+
+def test_trabajo_nuevo_descarta_el_diario(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.save("job", {"url": "u"}, [product(1)])
+    store.save("job", {"url": "v"}, [product(2)])
+    assert [p["item_id"] for p in store.products("job", store.load("job"))] == [2]
+
+
+def test_delete_y_pending(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.save("job", {"url": "u"}, [product(1)])
+    assert [state["url"] for state in store.pending()] == ["u"]
+    store.delete("job")
+    assert store.load("job") is None
+    assert not (tmp_path / "job.jsonl").exists()
@@ -0,0 +1,44 @@
+"""
+Pruebas de la reutilización de sesiones guardadas
+Ejecutar con: python -m pytest -q test_sesiones.py
+"""
+
+import time
+
+from sesiones import SessionStore
+
+URL = "https://www.vinted.es/catalog"
+
+
+def cookie(name, expires):
+    return {"name": name, "value": "x", "domain": ".vinted.es", "path": "/", "expires": expires}
+
+
+def test_cookies_de_seguimiento_expiradas_se_quitan(tmp_path):
+    store = SessionStore(tmp_path)
+    now = time.time()
+    store.save(URL, {"cookies": [
+        cookie("OptanonAlertBoxClosed", now + 3600),
+        cookie("_vinted_es_session", -1),
+        cookie("_ga_ABC", now - 60),
+    ], "origins": []})
+
+    state = store.load(URL)
+    assert [c["name"] for c in state["cookies"]] == ["OptanonAlertBoxClosed", "_vinted_es_session"]
+
+
+def test_cookie_de_sesion_expirada_descarta_la_sesion(tmp_path):
+    store = SessionStore(tmp_path)
+    now = time.time()
+    store.save(URL, {"cookies": [
+        cookie("OptanonAlertBoxClosed", now + 3600),
+        cookie("datadome", now - 60),
+    ], "origins": []})
+    assert store.load(URL) is None
+
+
+def test_sesion_caducada(tmp_path):
+    store = SessionStore(tmp_path, max_age_hours=0)
+    store.save(URL, {"cookies": [], "origins": []})
+    time.sleep(0.01)
+    assert store.load(URL) is None